@@ -1,14 +1,18 @@
 import os
-from mistralai import Mistral
 import discord
-from datetime import datetime, timedelta
+from datetime import datetime
 import logging
-from database import Database
-from typing import Dict, Any
+from database import CHAT_HISTORY_TURNS, DEFAULT_TIMEZONE, EXPERIENCE_LEVELS, Database
+from typing import Dict, Any, List
 from zoneinfo import ZoneInfo
 import json
+from llm import LLMCaller, create_backend
+from answer_cache import ANSWER_CACHE_SIZE, AnswerCache, is_general_question
+import progression
+from exercises import canonical_name
+import tracing
+import timezones
 
-MISTRAL_MODEL = "mistral-large-latest"
 SYSTEM_PROMPT = """You are a knowledgeable and motivating fitness coach. Help users achieve their gym goals by:
 1. Setting realistic fitness milestones based on their goals
 2. Tracking workout progress and celebrating consistency
@@ -22,7 +26,7 @@ Keep your responses under 2000 characters. Be concise but impactful - focus on t
 COMMANDS_HELP = """
 Here are all the available commands:
 • Just type a message normally to chat with me about your workout progress
-• `!start_workout` - Start an interactive workout session
+• `!start_workout` - Start an interactive workout session (`!start_workout quick` to log several exercises per message)
 • `!end_workout` - End your current workout session
 • `!streak` - Check your current workout streak and progress
 • `!progress [days]` - View your workout log (default: last 7 days)
@@ -65,6 +69,20 @@ Remember:
 
 Ready for a workout? Type `!start_workout` to begin an interactive workout session! 🎯"""
 
+# Discord's message limit, with room to spare
+MAX_REMINDER_LENGTH = 1500
+
+REMINDER_TEXT_PROMPT = """You are a supportive fitness coach writing tomorrow's check-in reminder for one user.
+It is sent as a Discord DM if they haven't told you about their workout by their reminder time.
+Use the profile below to make it personal: mention their goal, their streak or a recent workout, and the next milestone if there is one.
+Keep it under 400 characters, warm and specific, and end by inviting them to reply with how their workout went or to type `!start_workout`.
+Reply with the message text only."""
+
+# General questions are answered without the user's profile so the answer can be cached and shared
+FAQ_PROMPT = SYSTEM_PROMPT + """
+
+Answer the question as general fitness guidance that would suit anyone asking it. Don't assume anything about the person's goals, history or schedule."""
+
 COMPLETION_ANALYZER_PROMPT = """You are a fitness progress analyzer. 
 Your task is to determine if a user's message indicates they completed their workout or if it was a planned rest day.
 Consider that rest days, when planned and communicated, count as completed.
@@ -144,14 +162,108 @@ Consider:
 
 Respond with EXACTLY one word: 'decrease', 'maintain', or 'increase'"""
 
+BATCH_EVALUATION_PROMPT = """You are a fitness performance analyzer.
+Evaluate each exercise from today's workout. One exercise per line, as name | target | actual | previous max:
+{exercises}
+
+For each exercise, decide if the performance indicates:
+1. Need to decrease weight/intensity (if below 70% completion or showing poor form)
+2. Good to maintain current level (if 70-90% completion with good form)
+3. Ready to increase weight/intensity (if >90% completion with good form)
+
+Consider form, reported effort and previous performances. Safety first - when in doubt, maintain current level.
+
+Respond with ONLY a JSON object mapping each exercise name to exactly one word: 'decrease', 'maintain', or 'increase'.
+Example: {{"Barbell Bench Press": "increase", "Push-ups": "maintain"}}"""
+
+EVALUATIONS = ("decrease", "maintain", "increase")
+
 # Setup logging
 logger = logging.getLogger("discord")
 
+
+def user_timezone(user_data: Dict[str, Any]) -> ZoneInfo:
+    """The user's timezone; migrations keep it valid, so a bad value is only logged, not repaired here"""
+    try:
+        return ZoneInfo(user_data.get("timezone") or DEFAULT_TIMEZONE)
+    except Exception as e:
+        logger.error("Invalid timezone %s for user %s: %s", user_data.get("timezone"), user_data.get("_id"), e)
+        return ZoneInfo(DEFAULT_TIMEZONE)
+
+
+def build_chat_messages(user_data: Dict[str, Any], content: str) -> List[Dict[str, str]]:
+    """Assemble the chat prompt: coaching context, the last 10 turns, then the new message"""
+    messages = [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "system", "content": f"User's fitness goal: {user_data['fitness_goal']}"},
+        {"role": "system", "content": f"Milestones: {user_data['milestones']}"},
+        {"role": "system", "content": f"Current streak: {user_data['current_streak']} days"},
+        {"role": "system", "content": f"Longest streak: {user_data['longest_streak']} days"},
+        {"role": "system", "content": f"Last check-in: {user_data['last_check_in']}"}
+    ]
+    
+    # Add conversation history
+    history = user_data["conversation_history"][-CHAT_HISTORY_TURNS:]
+    for entry in history:
+        if entry["role"] in ["user", "assistant"]:
+            messages.append({"role": entry["role"], "content": entry["content"]})
+    
+    messages.append({"role": "user", "content": content})
+    return messages
+
+
+def parse_workout_plan(response_text: str) -> Dict[str, Any]:
+    """Parse the workout generator's JSON answer and fill in any missing fields.
+
+    Raises json.JSONDecodeError if the answer isn't JSON, ValueError if it isn't an object.
+    """
+    # Remove any markdown code block markers if present
+    response_text = response_text.replace('```json', '').replace('```', '').strip()
+    workout_plan = json.loads(response_text)
+    
+    # Ensure the workout plan has the required fields
+    if not isinstance(workout_plan, dict):
+        raise ValueError("Workout plan must be a dictionary")
+    if "exercises" not in workout_plan:
+        workout_plan["exercises"] = []
+    if "warmup" not in workout_plan:
+        workout_plan["warmup"] = "5 minutes light cardio and dynamic stretching"
+    if "cooldown" not in workout_plan:
+        workout_plan["cooldown"] = "5 minutes stretching"
+    
+    # Validate each exercise has required fields
+    for exercise in workout_plan["exercises"]:
+        if "name" not in exercise:
+            exercise["name"] = "Bodyweight Exercise"
+        # Catalog names keep one history per exercise however the model words it
+        exercise["name"] = canonical_name(str(exercise["name"]))
+        if "sets" not in exercise:
+            exercise["sets"] = 3
+        if "reps" not in exercise:
+            exercise["reps"] = "10"
+        if "weight" not in exercise:
+            exercise["weight"] = "bodyweight"
+        if "form_cues" not in exercise:
+            exercise["form_cues"] = "Focus on proper form and controlled movements"
+    return workout_plan
+
+
 class MistralAgent:
     def __init__(self):
-        MISTRAL_API_KEY = os.getenv("MISTRAL_API_KEY")
-        self.client = Mistral(api_key=MISTRAL_API_KEY)
+        self.backend = create_backend()
         self.db = Database()
+        # Add a short LLM-written note after the locally computed workout summary
+        self.summary_flourish = os.getenv("WORKOUT_SUMMARY_FLOURISH", "1").lower() in ("1", "true", "yes")
+        self.llm = LLMCaller(hedging=os.getenv("MISTRAL_HEDGING", "").lower() in ("1", "true", "yes"))
+        # Set ANSWER_CACHE_SIZE=0 to send every general question to the LLM
+        self.answer_cache = AnswerCache() if ANSWER_CACHE_SIZE > 0 else None
+
+    async def complete(self, purpose: str, messages):
+        """Run a chat completion for a call site on its routed model tier, bounded by its deadline"""
+        return await self.llm.call(
+            purpose,
+            lambda model: self.backend.complete_async(model, messages)
+        )
 
     def update_streak(self, user_id, completed=True):
         """Update user's streak and check for milestone achievements"""
@@ -173,40 +285,28 @@ class MistralAgent:
             self.db.update_user_data(user_id, {"current_streak": 0})
         return None
 
-    def should_send_reminder(self, user_id):
-        """Check if we should send a reminder to the user"""
-        logger.info(f"Should send reminder?")
-        user_data = self.db.get_user_data(user_id)
+    def should_send_reminder(self, user_id, user_data=None):
+        """Check if we should send a reminder to the user, using `user_data` when already loaded.
+
+        Returns the claimed date (YYYY-MM-DD) when a reminder is due, so a failed send can release it.
+        """
+        if user_data is None:
+            user_data = self.db.get_user_data(user_id)
         if not user_data or not user_data["onboarded"]:
-            return False
+            return None
         
         last_check_in = datetime.strptime(user_data["last_check_in"], "%Y-%m-%d")
         last_reminder = datetime.strptime(user_data.get("last_reminder_sent", "2000-01-01"), "%Y-%m-%d")
         reminder_time = datetime.strptime(user_data["reminder_time"], "%H:%M").time()
         
-        # Get user's timezone with proper validation
-        timezone_str = user_data.get("timezone")
-        if not timezone_str:
-            # If no timezone set, use default and update user data
-            timezone_str = "America/Los_Angeles"
-            self.db.update_user_data(user_id, {"timezone": timezone_str})
-            logger.info(f"No timezone found for user {user_id}, setting default: {timezone_str}")
-        
-        try:
-            user_tz = ZoneInfo(timezone_str)
-        except Exception as e:
-            # If timezone is invalid, fallback to default
-            logger.error(f"Invalid timezone {timezone_str} for user {user_id}: {e}")
-            timezone_str = "America/Los_Angeles"
-            user_tz = ZoneInfo(timezone_str)
-            self.db.update_user_data(user_id, {"timezone": timezone_str})
+        user_tz = user_timezone(user_data)
         
         # Get current time in user's timezone
         current_time = datetime.now(user_tz)
         current_date = current_time.date()
         
-        logger.info(f"last_check_in: {last_check_in}; reminder_time: {reminder_time}; current_time:{current_time} (timezone: {user_data['timezone']})")
-        logger.info(f"last_reminder: {last_reminder.date()}; current_date: {current_date}")
+        logger.debug("last_check_in: %s; reminder_time: %s; current_time:%s (timezone: %s)", last_check_in, reminder_time, current_time, user_tz)
+        logger.debug("last_reminder: %s; current_date: %s", last_reminder.date(), current_date)
         
         # Only send reminder if:
         # 1. It's past the reminder time
@@ -215,19 +315,49 @@ class MistralAgent:
         if (current_time.time() > reminder_time and 
             last_check_in.date() < current_date and 
             last_reminder.date() < current_date):
-            # Update last reminder date
-            self.db.update_user_data(user_id, {"last_reminder_sent": current_date.strftime("%Y-%m-%d")})
-            return True
-        return False
-
-    async def send_reminder(self, user_id, channel):
-        """Send a reminder message to the user"""
-        logger.info(f"Sending reminder for user: {user_id} to channel: {channel}")
-        user_data = self.db.get_user_data(user_id)
-        fitness_goal = user_data["fitness_goal"]
-        reminder = REMINDER_MESSAGE.format(fitness_goal=fitness_goal)
+            # Claim today's reminder atomically so concurrent replicas can't both send it
+            date = current_date.strftime("%Y-%m-%d")
+            if self.db.claim_reminder(user_id, date):
+                return date
+        return None
+
+    async def send_reminder(self, user_data, channel):
+        """Send the user's pregenerated reminder for today, or the template if there is none"""
+        logger.debug("Sending reminder for user: %s to channel: %s", user_data["_id"], channel)
+        today = datetime.now(user_timezone(user_data)).strftime("%Y-%m-%d")
+        pregenerated = user_data.get("reminder_message") or {}
+        if pregenerated.get("date") == today and pregenerated.get("text"):
+            reminder = pregenerated["text"]
+        else:
+            reminder = REMINDER_MESSAGE.format(fitness_goal=user_data["fitness_goal"])
         await channel.send(reminder)
 
+    async def generate_reminder_text(self, user_data) -> str:
+        """Write a personalized reminder from the user's goal, streak, milestones and recent workouts"""
+        profile = {
+            "goal": user_data.get("fitness_goal"),
+            "milestones": user_data.get("milestones"),
+            "current_streak": user_data.get("current_streak", 0),
+            "longest_streak": user_data.get("longest_streak", 0),
+            "last_check_in": user_data.get("last_check_in"),
+            "recent_workouts": [
+                {
+                    "date": session.get("date"),
+                    "exercises": [f"{e['exercise']}: {e['actual']} ({e['evaluation']})" for e in session.get("exercises", [])],
+                }
+                for session in user_data.get("workout_sessions", [])[-3:]
+            ],
+        }
+        messages = [
+            {"role": "system", "content": REMINDER_TEXT_PROMPT},
+            {"role": "user", "content": json.dumps(profile, separators=(",", ":"), default=str)}
+        ]
+
+        response = await self.complete("reminder_text", messages)
+
+        return response.choices[0].message.content.strip()[:MAX_REMINDER_LENGTH]
+
+    @tracing.traced("agent.run")
     async def run(self, message: discord.Message):
         user_id = message.author.id
         
@@ -243,22 +373,7 @@ class MistralAgent:
             })
             return ONBOARDING_PROMPT  # Early return for new users
 
-        # Get user's timezone with proper validation
-        timezone_str = user_data.get("timezone")
-        if not timezone_str:
-            # If no timezone set, use default and update user data
-            timezone_str = "America/Los_Angeles"
-            self.db.update_user_data(user_id, {"timezone": timezone_str})
-            logger.info(f"No timezone found for user {user_id}, setting default: {timezone_str}")
-        
-        try:
-            user_tz = ZoneInfo(timezone_str)
-        except Exception as e:
-            # If timezone is invalid, fallback to default
-            logger.error(f"Invalid timezone {timezone_str} for user {user_id}: {e}")
-            timezone_str = "America/Los_Angeles"
-            user_tz = ZoneInfo(timezone_str)
-            self.db.update_user_data(user_id, {"timezone": timezone_str})
+        user_tz = user_timezone(user_data)
         
         current_time = datetime.now(user_tz)
         current_date_str = current_time.strftime("%Y-%m-%d")
@@ -273,8 +388,12 @@ class MistralAgent:
         
         # Handle onboarding response
         if not user_data["onboarded"]:
-            # Extract time and timezone from the message
-            time_zone_extraction_prompt = """You are a time and timezone parser. Extract both the time and timezone from this message.
+            # Extract time and timezone from the message. A lone time and an explicit zone ("8pm EST", "UTC+5:30")
+            # are read locally; several times, or a place name that might be a false match, are left to the LLM
+            time_str = timezones.find_time(message.content)
+            timezone_str = timezones.explicit_timezone(message.content, current_time)
+            if time_str is None or timezone_str is None:
+                time_zone_extraction_prompt = """You are a time and timezone parser. Extract both the time and timezone from this message.
 For time: Convert to 24-hour format (HH:MM). If no time found, use "20:00".
 For timezone: Look for common abbreviations (PST, EST, etc.) or full names. If no timezone found, use "America/Los_Angeles".
 Respond in exactly this format:
@@ -284,34 +403,34 @@ Examples:
 "9pm works for me, I'm in Pacific time" -> "21:00|America/Los_Angeles"
 "8 in the morning, CST" -> "08:00|America/Chicago"
 """
-            messages = [
-                {"role": "system", "content": time_zone_extraction_prompt},
-                {"role": "user", "content": message.content}
-            ]
-            
-            extraction_response = await self.client.chat.complete_async(
-                model=MISTRAL_MODEL,
-                messages=messages,
-            )
-            
-            try:
-                time_str, timezone_str = extraction_response.choices[0].message.content.strip().split('|')
-                # Validate the time format
-                datetime.strptime(time_str, "%H:%M")
-                # Validate timezone
-                ZoneInfo(timezone_str)
+                timezone_hint = timezone_str or timezones.find_timezone(message.content, current_time)
+                if timezone_hint:
+                    time_zone_extraction_prompt += f"A keyword match suggests {timezone_hint}; use it only if the message really says the user is there.\n"
+                messages = [
+                    {"role": "system", "content": time_zone_extraction_prompt},
+                    {"role": "user", "content": message.content}
+                ]
                 
-                self.db.update_user_data(user_id, {
-                    "reminder_time": time_str,
-                    "timezone": timezone_str
-                })
-                logger.info(f"Set reminder time to {time_str} and timezone to {timezone_str}")
-            except Exception as e:
-                logger.error(f"Invalid format from LLM: {extraction_response.choices[0].message.content}, using defaults")
-                self.db.update_user_data(user_id, {
-                    "reminder_time": "20:00",
-                    "timezone": "America/Los_Angeles"
-                })
+                extraction_response = await self.complete("time_extraction", messages)
+                
+                try:
+                    llm_time, llm_timezone = extraction_response.choices[0].message.content.strip().split('|')
+                    # Validate the time format
+                    datetime.strptime(llm_time, "%H:%M")
+                    # Validate timezone
+                    ZoneInfo(llm_timezone)
+                    time_str = time_str or llm_time
+                    timezone_str = timezone_str or llm_timezone
+                except Exception:
+                    logger.error("Invalid format from LLM: %s, using defaults", extraction_response.choices[0].message.content)
+            
+            time_str = time_str or "20:00"
+            timezone_str = timezone_str or DEFAULT_TIMEZONE
+            self.db.update_user_data(user_id, {
+                "reminder_time": time_str,
+                "timezone": timezone_str
+            })
+            logger.info("Set reminder time to %s and timezone to %s", time_str, timezone_str)
             
             # Extract experience level and limitations using LLM
             experience_prompt = """You are a fitness profile analyzer. Extract the user's experience level and any limitations/injuries from their message.
@@ -327,20 +446,18 @@ Examples:
                 {"role": "user", "content": message.content}
             ]
             
-            experience_response = await self.client.chat.complete_async(
-                model=MISTRAL_MODEL,
-                messages=messages,
-            )
+            experience_response = await self.complete("profile_extraction", messages)
             
             try:
                 experience_level, limitations = experience_response.choices[0].message.content.strip().split('|')
+                experience_level = experience_level.strip().lower()
                 self.db.update_user_data(user_id, {
-                    "experience_level": experience_level.strip(),
+                    "experience_level": experience_level if experience_level in EXPERIENCE_LEVELS else "beginner",
                     "limitations": limitations.strip() if limitations.strip().lower() != "none" else ""
                 })
-                logger.info(f"Set experience level to {experience_level} and limitations to {limitations}")
-            except Exception as e:
-                logger.error(f"Invalid format from LLM: {experience_response.choices[0].message.content}, using defaults")
+                logger.info("Set experience level to %s and limitations to %s", experience_level, limitations)
+            except Exception:
+                logger.error("Invalid format from LLM: %s, using defaults", experience_response.choices[0].message.content)
                 self.db.update_user_data(user_id, {
                     "experience_level": "beginner",
                     "limitations": ""
@@ -359,10 +476,7 @@ Examples:
                 {"role": "user", "content": milestone_prompt}
             ]
             
-            milestone_response = await self.client.chat.complete_async(
-                model=MISTRAL_MODEL,
-                messages=messages,
-            )
+            milestone_response = await self.complete("milestones", messages)
             
             milestones = milestone_response.choices[0].message.content
             self.db.update_user_data(user_id, {"milestones": milestones})
@@ -386,28 +500,7 @@ Examples:
             return response
         
         # For subsequent conversations
-        messages = [
-            {"role": "system", "content": SYSTEM_PROMPT},
-            {"role": "system", "content": f"User's fitness goal: {user_data['fitness_goal']}"},
-            {"role": "system", "content": f"Milestones: {user_data['milestones']}"},
-            {"role": "system", "content": f"Current streak: {user_data['current_streak']} days"},
-            {"role": "system", "content": f"Longest streak: {user_data['longest_streak']} days"},
-            {"role": "system", "content": f"Last check-in: {user_data['last_check_in']}"}
-        ]
-        
-        # Add conversation history
-        history = user_data["conversation_history"][-10:]
-        for entry in history:
-            if entry["role"] in ["user", "assistant"]:
-                messages.append({"role": entry["role"], "content": entry["content"]})
-        
-        messages.append({"role": "user", "content": message.content})
-        
-        # Initialize progress_log if it doesn't exist
-        if "progress_log" not in user_data:
-            logger.info(f"Initializing progress_log for user {user_id}")
-            self.db.update_user_data(user_id, {"progress_log": {}})
-            user_data["progress_log"] = {}
+        messages = build_chat_messages(user_data, message.content)
         
         # Get last check-in date in user's timezone
         last_check_in = datetime.strptime(user_data["last_check_in"], "%Y-%m-%d").replace(tzinfo=user_tz)
@@ -418,13 +511,23 @@ Examples:
         is_new_day = current_date > last_check_in_date
         progress_already_logged = current_date_str in user_data.get("progress_log", {})
         
-        logger.info(f"Last check-in: {last_check_in}, Current time: {current_time} (timezone: {user_tz})")
-        logger.info(f"Last check-in date: {last_check_in_date}, Current date: {current_date}")
-        logger.info(f"Is new day: {is_new_day}, Progress already logged: {progress_already_logged}")
+        logger.debug("Last check-in: %s, Current time: %s (timezone: %s)", last_check_in, current_time, user_tz)
+        logger.debug("Last check-in date: %s, Current date: %s", last_check_in_date, current_date)
+        logger.debug("Is new day: %s, Progress already logged: %s", is_new_day, progress_already_logged)
         
+        # Once today's progress is in, FAQ-style questions can be answered from the shared cache
+        if progress_already_logged and self.answer_cache is not None and is_general_question(message.content):
+            response_message = await self.answer_general_question(message.content)
+            self.db.update_conversation_history(user_id, {
+                "role": "assistant",
+                "content": response_message,
+                "date": current_date_str
+            })
+            return response_message
+
         # Process progress update if it's a new day or first check-in of the day
         if not progress_already_logged:
-            logger.info("Processing progress update")
+            logger.debug("Processing progress update")
             # Use LLM to determine if the message indicates completion
             completion_check_messages = [
                 {"role": "system", "content": COMPLETION_ANALYZER_PROMPT},
@@ -432,13 +535,10 @@ Examples:
                 {"role": "user", "content": message.content}
             ]
             
-            completion_response = await self.client.chat.complete_async(
-                model=MISTRAL_MODEL,
-                messages=completion_check_messages,
-            )
+            completion_response = await self.complete("completion_check", completion_check_messages)
             
             completion_result = completion_response.choices[0].message.content.strip().lower()
-            logger.info(f"Completion result: {completion_result}")
+            logger.debug("Completion result: %s", completion_result)
             
             # Update progress log first
             progress_entry = {
@@ -446,7 +546,7 @@ Examples:
                 "completed": completion_result == 'completed',
                 "timestamp": current_time.isoformat()
             }
-            logger.info(f"Updating progress log for {current_date_str} with entry: {progress_entry}")
+            logger.debug("Updating progress log for %s with entry: %s", current_date_str, progress_entry)
             self.db.update_progress_log(user_id, current_date_str, progress_entry)
             
             # Update last check-in date
@@ -461,25 +561,15 @@ Examples:
                 self.update_streak(user_id, completed=False)
             
             messages.append({"role": "system", "content": "This is a new day. Respond to their progress update with encouragement and feedback."})
-            logger.info(f"Updated progress log for {current_date_str}")
-            
-            # Verify the update was successful
-            updated_user_data = self.db.get_user_data(user_id)
-            if current_date_str in updated_user_data.get("progress_log", {}):
-                logger.info("Progress log update verified successfully")
-            else:
-                logger.error("Progress log update could not be verified")
+            logger.debug("Updated progress log for %s", current_date_str)
         else:
             if not is_new_day:
-                logger.info("Not processing progress - not a new day")
+                logger.debug("Not processing progress - not a new day")
             elif progress_already_logged:
-                logger.info("Not processing progress - already logged today")
+                logger.debug("Not processing progress - already logged today")
             messages.append({"role": "system", "content": "This is not a new day or progress was already logged. Respond conversationally and provide guidance or motivation as needed."})
         
-        response = await self.client.chat.complete_async(
-            model=MISTRAL_MODEL,
-            messages=messages,
-        )
+        response = await self.complete("chat", messages)
         
         response_message = response.choices[0].message.content
         
@@ -496,6 +586,18 @@ Examples:
         
         return response_message
 
+    async def answer_general_question(self, question: str) -> str:
+        """Answer a question that doesn't depend on the user, reusing the answer to a near-identical earlier one"""
+        answer = self.answer_cache.get(question)
+        if answer is None:
+            response = await self.complete("faq", [
+                {"role": "system", "content": FAQ_PROMPT},
+                {"role": "user", "content": question}
+            ])
+            answer = response.choices[0].message.content
+            self.answer_cache.put(question, answer)
+        return answer
+
     async def reset_user(self, user_id: int) -> str:
         """Reset a user's data and restart their onboarding process."""
         # First check if user exists in database
@@ -516,10 +618,10 @@ Examples:
         
         return "✨ Your fitness tracking data has been reset! Let's start fresh.\n\n" + ONBOARDING_PROMPT
 
+    @tracing.traced("agent.generate_workout")
     async def generate_workout(self, user_id: int) -> Dict[str, Any]:
         """Generate a personalized workout plan"""
         user_data = self.db.get_user_data(user_id)
-        logger.info(f"User data: {user_data}")
 
         # Get exercise history for progressive overload
         exercise_history = user_data.get("exercise_history", {})
@@ -527,11 +629,9 @@ Examples:
         experience_level = user_data.get("experience_level", "beginner").lower()
         limitations = user_data.get("limitations", "")
 
-        # Validate experience level
-        if experience_level not in ["beginner", "intermediate", "advanced"]:
-            logger.warning(f"Invalid experience level '{experience_level}', defaulting to beginner")
+        # Levels are validated when stored; this only guards documents not yet migrated
+        if experience_level not in EXPERIENCE_LEVELS:
             experience_level = "beginner"
-            self.db.update_user_data(user_id, {"experience_level": experience_level})
 
         example_format = {
             "warmup": "5 minutes light treadmill, arm circles, leg swings, etc.",
@@ -550,7 +650,7 @@ Examples:
         workout_generator_prompt = f"""You are an expert fitness trainer. Generate a 1-hour workout plan based on:
 1. User's goal: {str(goal)}
 2. Experience level: {str(experience_level)}
-3. Previous performance: {str(exercise_history)}
+3. Previous performance: {progression.history_summary(exercise_history, rollups=user_data.get("exercise_rollups"))}
 4. Any limitations: {str(limitations) if limitations else "none"}
 
 Format the response as a JSON-like structure with exercises, sets, reps, and weights.
@@ -561,7 +661,7 @@ Include a mix of:
 - 5 min cooldown
 
 For beginners or those with limitations, focus on bodyweight exercises and proper form.
-For intermediate/advanced, include progressive overload based on their history.
+For intermediate/advanced, include progressive overload based on their history, using the "next target" weights where given.
 
 Each exercise should include clear instructions and form cues.
 Use "bodyweight" for weight when appropriate.
@@ -577,48 +677,18 @@ Make sure your responses are less than 1000 words in length.
         ]
 
         try:
-            response = await self.client.chat.complete_async(
-                model=MISTRAL_MODEL,
-                messages=messages,
-            )
-            logger.info(f"workout_response: {response}")
-            
-            # Clean up the response to ensure it's valid JSON
-            response_text = response.choices[0].message.content
-            # Remove any markdown code block markers if present
-            response_text = response_text.replace('```json', '').replace('```', '').strip()
-            workout_plan = json.loads(response_text)
+            response = await self.complete("workout_generation", messages)
+            logger.debug("workout_response: %s", response)
             
-            # Ensure the workout plan has the required fields
-            if not isinstance(workout_plan, dict):
-                raise ValueError("Workout plan must be a dictionary")
-            if "exercises" not in workout_plan:
-                workout_plan["exercises"] = []
-            if "warmup" not in workout_plan:
-                workout_plan["warmup"] = "5 minutes light cardio and dynamic stretching"
-            if "cooldown" not in workout_plan:
-                workout_plan["cooldown"] = "5 minutes stretching"
+            workout_plan = parse_workout_plan(response.choices[0].message.content)
             
-            # Validate each exercise has required fields
-            for exercise in workout_plan["exercises"]:
-                if "name" not in exercise:
-                    exercise["name"] = "Bodyweight Exercise"
-                if "sets" not in exercise:
-                    exercise["sets"] = 3
-                if "reps" not in exercise:
-                    exercise["reps"] = "10"
-                if "weight" not in exercise:
-                    exercise["weight"] = "bodyweight"
-                if "form_cues" not in exercise:
-                    exercise["form_cues"] = "Focus on proper form and controlled movements"
-            
-            logger.info(f"Starting workout session")
+            logger.debug("Starting workout session")
             self.db.start_workout_session(user_id, workout_plan)
-            logger.info(f"Workout plan: {workout_plan}")
+            logger.debug("Workout plan: %s", workout_plan)
             return workout_plan
             
         except json.JSONDecodeError as e:
-            logger.error(f"Failed to parse workout plan: {e}")
+            logger.error("Failed to parse workout plan: %s", e)
             # Return a basic workout plan as fallback
             fallback_plan = {
                 "warmup": "5 minutes light cardio and dynamic stretching",
@@ -648,47 +718,143 @@ Make sure your responses are less than 1000 words in length.
     ) -> str:
         """Evaluate exercise performance and determine progression"""
         user_data = self.db.get_user_data(user_id)
-        exercise_name = planned_exercise["name"]
-        
-        # Get previous performance
+        exercise_name = canonical_name(planned_exercise["name"])
         exercise_history = user_data.get("exercise_history", {}).get(exercise_name, [])
-        previous_max = max([ex.get("weight", 0) for ex in exercise_history]) if exercise_history else 0
-        
-        messages = [
-            {"role": "system", "content": EXERCISE_EVALUATION_PROMPT.format(
-                target_performance=f"{planned_exercise['sets']}x{planned_exercise['reps']} @{planned_exercise['weight']}",
-                actual_performance=actual_performance,
-                previous_max=previous_max
-            )}
-        ]
-        
-        response = await self.client.chat.complete_async(
-            model=MISTRAL_MODEL,
-            messages=messages,
-        )
         
-        evaluation = response.choices[0].message.content.strip().lower()
+        # Most reports can be judged from the numbers alone
+        decision = progression.evaluate(planned_exercise, actual_performance, exercise_history)
+        if decision:
+            evaluation = decision["evaluation"]
+            logger.debug("Evaluated %s locally: %s", exercise_name, decision)
+        else:
+            messages = [
+                {"role": "system", "content": EXERCISE_EVALUATION_PROMPT.format(
+                    target_performance=f"{planned_exercise['sets']}x{planned_exercise['reps']} @{planned_exercise['weight']}",
+                    actual_performance=actual_performance,
+                    previous_max=self._previous_max(user_data, planned_exercise)
+                )}
+            ]
+            
+            response = await self.complete("exercise_evaluation", messages)
+            
+            evaluation = response.choices[0].message.content.strip().lower()
         
         # Update exercise history
         self.db.update_exercise_history(user_id, exercise_name, {
             "planned": planned_exercise,
             "actual": actual_performance,
-            "evaluation": evaluation
+            "evaluation": evaluation,
+            "next_weight": decision["next_weight"] if decision else None
         })
         
         return evaluation
 
-    async def generate_workout_summary(self, session_results: Dict[str, Any]) -> str:
-        """Generate a summary of the workout session"""
+    def _previous_max(self, user_data: Dict[str, Any], planned_exercise: Dict[str, Any]) -> str:
+        """Best weight previously recorded for an exercise, in the unit of the planned weight"""
+        _, unit = progression.parse_weight(planned_exercise.get("weight"))
+        name = canonical_name(planned_exercise["name"])
+        return progression.previous_max(
+            user_data.get("exercise_history", {}).get(name, []),
+            unit if unit in progression.WEIGHT_STEPS else "lb",
+            user_data.get("exercise_rollups", {}).get(name)
+        )
+
+    @tracing.traced("agent.evaluate_workout_batch")
+    async def evaluate_workout_batch(
+        self, user_id: int, planned_exercises: List[Dict[str, Any]], logged: Dict[str, Dict[str, Any]]
+    ) -> Dict[str, str]:
+        """Evaluate several logged exercises, with at most one LLM call.
+
+        `logged` maps planned exercise names to parsed performances (see workout_log.parse_workout_log).
+        Exercises the progression engine can judge locally never reach the LLM; the rest share a
+        single call. Returns a verdict per logged exercise; anything the model leaves out is treated
+        as 'maintain'. Local decisions are added to `logged` under "decision". Does not write to the
+        database - the caller stores the results in one update.
+        """
+        user_data = self.db.get_user_data(user_id)
+        planned_by_name = {exercise["name"]: exercise for exercise in planned_exercises}
+
+        evaluations = {}
+        lines = []
+        for name, performance in logged.items():
+            planned = planned_by_name[name]
+            exercise_history = user_data.get("exercise_history", {}).get(canonical_name(name), [])
+            decision = progression.evaluate(planned, performance["actual"], exercise_history)
+            if decision:
+                performance["decision"] = decision
+                evaluations[name] = decision["evaluation"]
+                continue
+            lines.append(
+                f"{name} | {planned['sets']}x{planned['reps']} @{planned['weight']} | "
+                f"{performance['actual']} | {self._previous_max(user_data, planned)}"
+            )
+
+        if not lines:
+            return evaluations
+
+        messages = [
+            {"role": "system", "content": BATCH_EVALUATION_PROMPT.format(exercises="\n".join(lines))}
+        ]
+
+        response = await self.complete("batch_evaluation", messages)
+
+        response_text = response.choices[0].message.content
+        response_text = response_text.replace('```json', '').replace('```', '').strip()
+        try:
+            verdicts = json.loads(response_text)
+            if not isinstance(verdicts, dict):
+                raise ValueError("Batch evaluation must be a dictionary")
+        except (json.JSONDecodeError, ValueError) as e:
+            logger.error("Failed to parse batch evaluation: %s", e)
+            verdicts = {}
+
+        for name in logged:
+            if name in evaluations:
+                continue
+            evaluation = str(verdicts.get(name, "maintain")).strip().lower()
+            evaluations[name] = evaluation if evaluation in EVALUATIONS else "maintain"
+        return evaluations
+
+    def format_workout_summary(self, stats: Dict[str, Any]) -> str:
+        """Render the locally computed workout stats for Discord"""
+        verdict_icons = {"increase": "⬆️ increase", "maintain": "➡️ maintain", "decrease": "⬇️ decrease"}
+
+        output = "📊 **Workout Stats**\n"
+        if stats["sets_planned"]:
+            output += f"• Sets: {stats['sets_done']}/{stats['sets_planned']} completed\n"
+        if stats["total_volume"]:
+            output += f"• Total volume: {stats['total_volume']}\n"
+        for exercise in stats["exercises"]:
+            if exercise.get("pr"):
+                output += f"• 🏆 New PR on {exercise['name']} (est. 1RM {exercise['pr']})\n"
+
+        if stats["exercises"]:
+            output += "\n💪 **Next time**:\n"
+            for exercise in stats["exercises"]:
+                verdict = verdict_icons.get(exercise["evaluation"], exercise["evaluation"])
+                output += f"• {exercise['name']}: {verdict}\n"
+
+        streak = stats["current_streak"]
+        if stats["checked_in_today"]:
+            output += f"\n🔥 Streak: {streak} days"
+        else:
+            output += f"\n🔥 Streak: {streak} days - tell me how today went to make it {streak + 1}!"
+        return output
+
+    async def generate_workout_summary(self, stats: Dict[str, Any]) -> str:
+        """Generate a short encouraging note about a workout from its precomputed stats"""
+        compact = {
+            "sets": f"{stats['sets_done']}/{stats['sets_planned']}",
+            "volume": stats["total_volume"],
+            "prs": stats["prs"],
+            "verdicts": {exercise["name"]: exercise["evaluation"] for exercise in stats["exercises"]},
+            "streak": stats["current_streak"],
+        }
         messages = [
-            {"role": "system", "content": "You are a supportive fitness coach. Create a brief but encouraging summary of the workout session, highlighting key achievements and areas for improvement. Keep your response under 500 characters to be concise yet motivating."},
-            {"role": "user", "content": str(session_results)}
+            {"role": "system", "content": "You are a supportive fitness coach. The user just finished a workout; the stats are already shown to them. Write one or two short, encouraging sentences highlighting a key achievement or one thing to focus on next time. Keep it under 200 characters."},
+            {"role": "user", "content": json.dumps(compact, separators=(",", ":"))}
         ]
         
-        response = await self.client.chat.complete_async(
-            model=MISTRAL_MODEL,
-            messages=messages,
-        )
+        response = await self.complete("workout_summary", messages)
         
         return response.choices[0].message.content
-
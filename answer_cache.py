@@ -0,0 +1,144 @@
+import logging
+import os
+import re
+import time
+import zlib
+from typing import List, Optional
+
+import numpy as np
+
+import metrics
+
+# Setup logging
+logger = logging.getLogger("discord")
+
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "512"))
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", str(7 * 24 * 3600)))
+# Cosine similarity of TF-IDF vectors needed to reuse an answer; high, since a near miss gives a wrong answer
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.85"))
+HASH_DIMENSIONS = 2 ** 12
+
+TOKEN_PATTERN = re.compile(r"[a-z']+")
+QUESTION_PATTERN = re.compile(r"^(how|what|why|when|which|is|are|can|does|do|should|whats|what's)\b|\?\s*$", re.IGNORECASE)
+# Anything about the user's own situation gets the full, personalized chat path
+PERSONAL_PATTERN = re.compile(
+    r"\b(my|me|mine|myself|i'm|im|i've|i'd|i was|i did|i feel|i have|i had|today|tonight|yesterday|"
+    r"tomorrow|this week|last week|streak|goal)\b|\d",
+    re.IGNORECASE
+)
+STOP_WORDS = frozenset(
+    "a an the i you do does did is are was be to of in on for with and or how what why when which can should "
+    "it its it's that this my your at as by from there any some".split()
+)
+
+
+def is_general_question(text: str) -> bool:
+    """A short fitness question whose answer doesn't depend on who asked"""
+    return len(text) <= 200 and bool(QUESTION_PATTERN.search(text.strip())) and not PERSONAL_PATTERN.search(text)
+
+
+def terms(text: str) -> List[str]:
+    """Content words with plurals and -ing/-ly endings trimmed, plus adjacent pairs"""
+    words = []
+    for word in TOKEN_PATTERN.findall(text.lower()):
+        if word in STOP_WORDS:
+            continue
+        for suffix in ("ing", "ly", "s"):
+            if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+                word = word[:-len(suffix)]
+                break
+        words.append(word)
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+def term_counts(text: str) -> np.ndarray:
+    vector = np.zeros(HASH_DIMENSIONS, dtype=np.float32)
+    for term in terms(text):
+        vector[zlib.crc32(term.encode()) % HASH_DIMENSIONS] += 1
+    return vector
+
+
+class AnswerCache:
+    """Recent answers to general questions, looked up by TF-IDF similarity of the question.
+
+    Questions are hashed into fixed-size term-count rows; IDF weights come from
+    the document frequencies of the cached questions themselves. Entries expire
+    after `ttl` seconds and the least recently used one makes room when full.
+    """
+
+    def __init__(self, capacity: int = ANSWER_CACHE_SIZE, ttl: float = ANSWER_CACHE_TTL, threshold: float = ANSWER_CACHE_THRESHOLD):
+        self.capacity = capacity
+        self.ttl = ttl
+        self.threshold = threshold
+        self.counts = np.zeros((capacity, HASH_DIMENSIONS), dtype=np.float32)
+        self.document_frequency = np.zeros(HASH_DIMENSIONS, dtype=np.float32)
+        self.used = np.zeros(capacity, dtype=bool)
+        self.created = np.zeros(capacity)
+        self.last_hit = np.zeros(capacity)
+        self.answers: List[Optional[str]] = [None] * capacity
+        # IDF and row norms only change when entries come or go, so they are kept between lookups
+        self.idf: Optional[np.ndarray] = None
+        self.norms: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return int(self.used.sum())
+
+    def _weights(self):
+        if self.idf is None:
+            self.idf = (np.log((1 + len(self)) / (1 + self.document_frequency)) + 1).astype(np.float32)
+            self.norms = np.sqrt(np.square(self.counts) @ np.square(self.idf))
+        return self.idf, self.norms
+
+    def _evict(self, slot: int) -> None:
+        self.document_frequency -= self.counts[slot] > 0
+        self.counts[slot] = 0
+        self.used[slot] = False
+        self.answers[slot] = None
+        self.idf = self.norms = None
+
+    def _expire(self, now: float) -> None:
+        for slot in np.flatnonzero(self.used & (self.created < now - self.ttl)):
+            self._evict(slot)
+        metrics.ANSWER_CACHE_ENTRIES.set(len(self))
+
+    def get(self, question: str) -> Optional[str]:
+        """The cached answer to the most similar fresh question, if it is similar enough"""
+        now = time.monotonic()
+        self._expire(now)
+        query = term_counts(question)
+        if not len(self) or not query.any():
+            metrics.ANSWER_CACHE_LOOKUPS.labels("miss").inc()
+            return None
+        idf, norms = self._weights()
+        # Questions are a handful of terms, so only the query's columns take part in the dot product
+        columns = np.flatnonzero(query)
+        query_weighted = query[columns] * idf[columns]
+        dots = self.counts[:, columns] @ (query_weighted * idf[columns])
+        norms = norms * np.linalg.norm(query_weighted)
+        similarity = np.where(self.used & (norms > 0), dots / np.maximum(norms, 1e-9), 0.0)
+        best = int(similarity.argmax())
+        if similarity[best] < self.threshold:
+            metrics.ANSWER_CACHE_LOOKUPS.labels("miss").inc()
+            return None
+        self.last_hit[best] = now
+        metrics.ANSWER_CACHE_LOOKUPS.labels("hit").inc()
+        logger.debug("Answer cache hit (similarity %.2f) for %r", similarity[best], question)
+        return self.answers[best]
+
+    def put(self, question: str, answer: str) -> None:
+        counts = term_counts(question)
+        if not self.capacity or not counts.any():
+            return
+        now = time.monotonic()
+        self._expire(now)
+        free = np.flatnonzero(~self.used)
+        slot = int(free[0]) if len(free) else int(self.last_hit.argmin())
+        if self.used[slot]:
+            self._evict(slot)
+        self.counts[slot] = counts
+        self.document_frequency += counts > 0
+        self.used[slot] = True
+        self.created[slot] = self.last_hit[slot] = now
+        self.answers[slot] = answer
+        self.idf = self.norms = None
+        metrics.ANSWER_CACHE_ENTRIES.set(len(self))
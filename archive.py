@@ -0,0 +1,117 @@
+import argparse
+import collections
+import json
+import logging
+import os
+import time
+import zlib
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from database import CHAT_HISTORY_TURNS, Database
+
+# Setup logging
+logger = logging.getLogger("discord")
+
+# Turns older than this move to the archive, except the last CHAT_HISTORY_TURNS the chat reads (0 keeps everything)
+ARCHIVE_DAYS = int(os.getenv("ARCHIVE_DAYS", "30"))
+COMPRESSION_LEVEL = 6
+
+
+def compress_turns(turns: List[Dict[str, Any]]) -> bytes:
+    return zlib.compress(json.dumps(turns, separators=(",", ":")).encode(), COMPRESSION_LEVEL)
+
+
+def decompress_turns(data: bytes) -> List[Dict[str, Any]]:
+    return json.loads(zlib.decompress(data))
+
+
+def archive_user(db: Database, user: Dict[str, Any], cutoff: str) -> int:
+    """Move one user's turns dated before `cutoff` into their monthly archive blocks; returns the number moved.
+
+    The last CHAT_HISTORY_TURNS turns always stay in the user document, so a user
+    coming back after a quiet month still has the chat context. Turns are moved
+    and trimmed by date, so the cutoff is pulled back to the oldest kept turn.
+    Each block remembers the last date it holds, so re-running after a crash
+    between the archive write and the trim never stores a turn twice.
+    """
+    history = user.get("conversation_history") or []
+    if len(history) <= CHAT_HISTORY_TURNS:
+        return 0
+    cutoff = min(cutoff, history[-CHAT_HISTORY_TURNS].get("date", cutoff))
+    by_period = collections.defaultdict(list)
+    for turn in history:
+        if turn.get("date", cutoff) < cutoff:
+            by_period[turn["date"][:7]].append(turn)
+    if not by_period:
+        return 0
+
+    existing = {block["period"]: block for block in db.get_conversation_archives(user["_id"])}
+    moved = 0
+    for period, turns in by_period.items():
+        block = existing.get(period)
+        archived = decompress_turns(block["data"]) if block else []
+        through = block["through"] if block else ""
+        new = [turn for turn in turns if turn["date"] > through]
+        if not new:
+            continue
+        archived.extend(new)
+        db.save_conversation_archive(user["_id"], period, compress_turns(archived), len(archived), new[-1]["date"])
+        moved += len(new)
+    db.trim_conversation_history(user["_id"], cutoff)
+    return moved
+
+
+def archive_conversations(db: Database, archive_days: int = ARCHIVE_DAYS, batch_size: int = 100) -> Dict[str, Any]:
+    """Archive every user's conversation turns older than `archive_days`"""
+    if archive_days <= 0:
+        return {}
+    cutoff = (datetime.now() - timedelta(days=archive_days)).strftime("%Y-%m-%d")
+    counts = collections.Counter()
+    started = time.monotonic()
+    for user in db.get_archive_candidates(cutoff, batch_size):
+        try:
+            counts["turns"] += archive_user(db, user, cutoff)
+            counts["users"] += 1
+        except Exception as e:
+            counts["failed"] += 1
+            logger.error("Failed to archive conversation for user %s: %s", user["_id"], e)
+    logger.info("Archived conversation turns before %s in %.1fs: %s", cutoff, time.monotonic() - started, dict(counts))
+    return dict(counts)
+
+
+def load_archived_turns(db: Database, user_id: int, period: Optional[str] = None) -> List[Dict[str, Any]]:
+    """A user's archived turns, oldest first; `period` ("YYYY-MM") limits it to one month"""
+    turns = []
+    for block in db.get_conversation_archives(user_id, period):
+        turns.extend(decompress_turns(block["data"]))
+    return turns
+
+
+def load_conversation(db: Database, user_id: int) -> List[Dict[str, Any]]:
+    """A user's whole conversation: archived turns followed by the ones still in the user document"""
+    user_data = db.get_user_data(user_id) or {}
+    return load_archived_turns(db, user_id) + user_data.get("conversation_history", [])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Archive old conversation turns, or print a user's conversation")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    run_parser = subparsers.add_parser("run", help="move turns older than --days into compressed monthly blocks")
+    run_parser.add_argument("--days", type=int, default=ARCHIVE_DAYS, help="turns to keep in the user document, in days")
+    show_parser = subparsers.add_parser("show", help="print a user's conversation as JSON lines, archive included")
+    show_parser.add_argument("user_id", type=int)
+    show_parser.add_argument("--period", help="only this archived month (YYYY-MM)")
+    args = parser.parse_args()
+
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO)
+    db = Database()
+    if args.command == "run":
+        print(archive_conversations(db, args.days))
+    else:
+        turns = load_archived_turns(db, args.user_id, args.period) if args.period else load_conversation(db, args.user_id)
+        for turn in turns:
+            print(json.dumps(turn))
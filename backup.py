@@ -0,0 +1,191 @@
+import argparse
+import gzip
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+from bson import json_util
+from pymongo import ReplaceOne
+
+from database import Database
+
+# Setup logging
+logger = logging.getLogger("discord")
+
+# Collections holding user data, and the field that holds the user's id in each
+EXPORT_COLLECTIONS: Dict[str, str] = {"users": "_id", "conversation_archive": "user_id"}
+
+
+def checkpoint_path(path: str) -> str:
+    return f"{path}.checkpoint"
+
+
+def read_checkpoint(path: str, kind: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(checkpoint_path(path)) as f:
+            checkpoint = json_util.loads(f.read())
+    except FileNotFoundError:
+        return None
+    return checkpoint if checkpoint.get("kind") == kind else None
+
+
+def write_checkpoint(path: str, checkpoint: Dict[str, Any]) -> None:
+    # Write-then-rename so a crash never leaves a half-written checkpoint
+    tmp = f"{checkpoint_path(path)}.tmp"
+    with open(tmp, "w") as f:
+        f.write(json_util.dumps(checkpoint))
+    os.replace(tmp, checkpoint_path(path))
+
+
+def clear_checkpoint(path: str) -> None:
+    if os.path.exists(checkpoint_path(path)):
+        os.remove(checkpoint_path(path))
+
+
+class Progress:
+    """Counts documents per collection and logs throughput every `interval` seconds"""
+
+    def __init__(self, action: str, interval: float = 10):
+        self.action = action
+        self.interval = interval
+        self.counts: Dict[str, int] = {}
+        self.started = self.logged = time.monotonic()
+
+    def add(self, collection: str, n: int) -> None:
+        self.counts[collection] = self.counts.get(collection, 0) + n
+        if time.monotonic() - self.logged >= self.interval:
+            self.logged = time.monotonic()
+            self.log()
+
+    def log(self) -> None:
+        elapsed = time.monotonic() - self.started
+        total = sum(self.counts.values())
+        logger.info("%s %s documents in %.1fs (%.0f/s): %s", self.action, total, elapsed, total / max(elapsed, 1e-9), self.counts)
+
+    def result(self) -> Dict[str, Any]:
+        self.log()
+        return {**self.counts, "seconds": round(time.monotonic() - self.started, 1)}
+
+
+def export_data(db: Database, path: str, user_ids: Optional[List[int]] = None, batch_size: int = 1000, resume: bool = False) -> Dict[str, Any]:
+    """Stream EXPORT_COLLECTIONS to gzip-compressed NDJSON at `path`, one `{"collection", "document"}` per line.
+
+    Documents are read in _id order with a bounded cursor and each batch is
+    appended as its own gzip member, followed by a checkpoint of the file size
+    and last _id. With `resume`, the file is cut back to the checkpointed size
+    and the export continues after the last _id, so an interrupted backup
+    picks up where it stopped.
+    """
+    checkpoint = read_checkpoint(path, "export") if resume else None
+    if resume and checkpoint is None:
+        logger.warning("No checkpoint for %s, starting from scratch", path)
+    progress = Progress("Exported")
+
+    with open(path, "r+b" if checkpoint else "wb") as out:
+        if checkpoint:
+            out.truncate(checkpoint["offset"])
+            out.seek(checkpoint["offset"])
+            logger.info("Resuming export of %s at %s after _id %s", path, checkpoint["collection"], checkpoint["last_id"])
+        collections = list(EXPORT_COLLECTIONS)
+        if checkpoint:
+            collections = collections[collections.index(checkpoint["collection"]):]
+
+        for name in collections:
+            query: Dict[str, Any] = {}
+            if user_ids:
+                query[EXPORT_COLLECTIONS[name]] = {"$in": user_ids}
+            if checkpoint and checkpoint["collection"] == name and checkpoint["last_id"] is not None:
+                query["_id"] = {"$gt": checkpoint["last_id"]}
+
+            lines: List[str] = []
+            last_id = None
+
+            def flush():
+                out.write(gzip.compress("".join(lines).encode()))
+                out.flush()
+                os.fsync(out.fileno())
+                write_checkpoint(path, {"kind": "export", "collection": name, "last_id": last_id, "offset": out.tell()})
+                progress.add(name, len(lines))
+                lines.clear()
+
+            for document in db.db[name].find(query, batch_size=batch_size).sort("_id", 1):
+                lines.append(json_util.dumps({"collection": name, "document": document}) + "\n")
+                last_id = document["_id"]
+                if len(lines) >= batch_size:
+                    flush()
+            if lines:
+                flush()
+            # Mark the collection done so a resume moves on to the next one
+            checkpoint = None
+            next_index = collections.index(name) + 1
+            if next_index < len(collections):
+                write_checkpoint(path, {"kind": "export", "collection": collections[next_index], "last_id": None, "offset": out.tell()})
+
+    clear_checkpoint(path)
+    return progress.result()
+
+
+def read_lines(path: str) -> Iterable[Dict[str, Any]]:
+    with gzip.open(path, "rt") as f:
+        for line in f:
+            if line.strip():
+                yield json_util.loads(line)
+
+
+def import_data(db: Database, path: str, user_ids: Optional[List[int]] = None, batch_size: int = 1000, resume: bool = False) -> Dict[str, Any]:
+    """Load an export_data file, upserting each document by _id with one unordered bulk_write per batch.
+
+    Re-importing is idempotent. The checkpoint records how many lines have been
+    applied, so `resume` skips straight past them.
+    """
+    checkpoint = read_checkpoint(path, "import") if resume else None
+    skip = checkpoint["lines"] if checkpoint else 0
+    if skip:
+        logger.info("Resuming import of %s after %s lines", path, skip)
+    progress = Progress("Imported")
+    batches: Dict[str, List[ReplaceOne]] = {}
+    applied = 0
+
+    def flush():
+        for name, batch in batches.items():
+            if batch:
+                db.db[name].bulk_write(batch, ordered=False)
+                progress.add(name, len(batch))
+        batches.clear()
+        write_checkpoint(path, {"kind": "import", "lines": applied})
+
+    for line_number, record in enumerate(read_lines(path), 1):
+        if line_number <= skip:
+            continue
+        name, document = record["collection"], record["document"]
+        if name not in EXPORT_COLLECTIONS:
+            raise ValueError(f"Unknown collection '{name}' on line {line_number}")
+        applied = line_number
+        if user_ids and document.get(EXPORT_COLLECTIONS[name]) not in user_ids:
+            continue
+        batches.setdefault(name, []).append(ReplaceOne({"_id": document["_id"]}, document, upsert=True))
+        if sum(len(batch) for batch in batches.values()) >= batch_size:
+            flush()
+    flush()
+
+    clear_checkpoint(path)
+    return progress.result()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export or import user data as gzip-compressed NDJSON")
+    parser.add_argument("action", choices=["export", "import"])
+    parser.add_argument("path", help="file to write or read, e.g. users.ndjson.gz")
+    parser.add_argument("--user", type=int, action="append", dest="user_ids", help="only this user id (repeatable)")
+    parser.add_argument("--batch-size", type=int, default=1000, help="documents per cursor batch, gzip member and bulk_write")
+    parser.add_argument("--resume", action="store_true", help="continue from the checkpoint of an interrupted run")
+    args = parser.parse_args()
+
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO)
+    run = export_data if args.action == "export" else import_data
+    print(json.dumps(run(Database(), args.path, args.user_ids, args.batch_size, args.resume)))
@@ -0,0 +1,67 @@
+import json
+from datetime import datetime, timezone
+
+import progression
+import timezones
+from agent import build_chat_messages, parse_workout_plan
+from conftest import PLAN
+from exercises import INDEX
+from workout_log import basic_verdict, parse_performance, parse_workout_log
+
+LONG_RESPONSE = ("Keep your core braced and drive through your heels. " * 80).strip()
+
+
+def bench_should_send_reminder(benchmark, agent):
+    benchmark(agent.should_send_reminder, 1)
+
+
+def bench_build_chat_messages(benchmark, user_data):
+    benchmark(build_chat_messages, user_data, "How should I warm up for heavy squats?")
+
+
+def bench_history_summary(benchmark, user_data):
+    benchmark(progression.history_summary, user_data["exercise_history"])
+
+
+def bench_progression_evaluate(benchmark, user_data):
+    history = user_data["exercise_history"]["Barbell Bench Press"]
+    benchmark(progression.evaluate, PLAN["exercises"][1], "3x10 @135lb", history)
+
+
+def bench_format_workout_plan(benchmark, cog):
+    benchmark(cog.format_workout_plan, PLAN)
+
+
+def bench_truncate_message(benchmark, cog):
+    benchmark(cog.truncate_message, LONG_RESPONSE)
+
+
+def bench_timezone_from_offset(benchmark):
+    now = datetime(2026, 7, 1, 12, 0, tzinfo=timezone.utc)
+    benchmark(timezones.resolve, "UTC+5:30", now)
+
+
+def bench_timezone_from_message(benchmark):
+    benchmark(timezones.find_timezone, "Check in at 8pm please, I'm in new york")
+
+
+def bench_fallback_parser(benchmark):
+    def parse_and_judge():
+        return basic_verdict(parse_performance("3x10 @20lb feeling tired"), PLAN["exercises"][1])
+
+    benchmark(parse_and_judge)
+
+
+def bench_parse_workout_log(benchmark):
+    text = "\n".join(f"{exercise['name']}: 3x10 @100lb" for exercise in PLAN["exercises"])
+    benchmark(parse_workout_log, text, PLAN["exercises"])
+
+
+def bench_parse_workout_plan(benchmark):
+    text = "```json\n" + json.dumps(PLAN) + "\n```"
+    benchmark(parse_workout_plan, text)
+
+
+def bench_exercise_index_lookup(benchmark):
+    # Uncached trigram path; canonical_name's lru_cache serves repeats
+    benchmark(INDEX.lookup, "Skul Crushers")
@@ -0,0 +1,92 @@
+import os
+import sys
+from datetime import datetime, timedelta
+
+import mongomock
+import pytest
+
+# bot.py builds its agent at import time; point it at local stand-ins
+os.environ.setdefault("MONGODB_URI", "mongodb://localhost:27017")
+os.environ.setdefault("LLM_BACKEND", "local")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Database  # noqa: E402
+
+HISTORY_SIZES = [10, 100, 1_000, 10_000]
+
+PLAN = {
+    "warmup": "5 minutes light treadmill, arm circles, leg swings",
+    "exercises": [
+        {"name": "Barbell Back Squat", "sets": 3, "reps": "8-10", "weight": "185lb", "form_cues": "Brace core, knees track over toes"},
+        {"name": "Barbell Bench Press", "sets": 3, "reps": "8-10", "weight": "135lb", "form_cues": "Retract shoulder blades, feet planted"},
+        {"name": "Romanian Deadlift", "sets": 3, "reps": "10", "weight": "135lb", "form_cues": "Hinge at the hips, soft knees"},
+        {"name": "Dumbbell Row", "sets": 3, "reps": "10-12", "weight": "50lb", "form_cues": "Flat back, pull elbow to hip"},
+        {"name": "Push-ups", "sets": 3, "reps": "15", "weight": "bodyweight", "form_cues": "Core tight, elbows at 45 degrees"},
+        {"name": "Plank", "sets": 3, "reps": "45", "weight": "bodyweight", "form_cues": "Squeeze glutes, neutral neck"},
+    ],
+    "cooldown": "5 minutes stretching focusing on worked muscle groups",
+}
+
+
+def make_user(user_id: int, history_size: int) -> dict:
+    """An onboarded user with `history_size` conversation turns, progress entries and bench press sessions"""
+    today = datetime(2026, 1, 1)
+    dates = [(today - timedelta(days=history_size - i)).strftime("%Y-%m-%d") for i in range(history_size)]
+    return {
+        "_id": user_id,
+        "onboarded": True,
+        "fitness_goal": "Bench 225lb and lose 10 pounds",
+        "experience_level": "intermediate",
+        "limitations": "",
+        "milestones": "1. Bench 185lb\n2. Bench 205lb\n3. Bench 225lb",
+        "last_check_in": "2000-01-01",
+        "last_reminder_sent": "2100-01-01",
+        "reminder_time": "20:00",
+        "timezone": "America/New_York",
+        "current_streak": 12,
+        "longest_streak": 30,
+        "conversation_history": [
+            {"role": "user" if i % 2 == 0 else "assistant", "content": f"Message number {i} about training and recovery", "date": date}
+            for i, date in enumerate(dates)
+        ],
+        "progress_log": {
+            date: {"message": "Great workout", "completed": True, "timestamp": f"{date}T20:00:00"}
+            for date in dates
+        },
+        "exercise_history": {
+            "Barbell Bench Press": [
+                {"date": date, "planned": PLAN["exercises"][1], "actual": f"3x{8 + i % 3} @{115 + (i % 20) * 5}lb", "evaluation": "maintain"}
+                for i, date in enumerate(dates)
+            ]
+        },
+        "current_workout": None,
+        "workout_sessions": [],
+    }
+
+
+@pytest.fixture(params=HISTORY_SIZES, ids=lambda size: f"history={size}")
+def history_size(request):
+    return request.param
+
+
+@pytest.fixture
+def user_data(history_size):
+    return make_user(1, history_size)
+
+
+@pytest.fixture
+def agent(user_data):
+    """A MistralAgent backed by an in-memory database holding `user_data`"""
+    from agent import MistralAgent
+
+    agent = MistralAgent()
+    agent.db = Database(client=mongomock.MongoClient())
+    agent.db.users.insert_one(user_data)
+    return agent
+
+
+@pytest.fixture(scope="session")
+def cog():
+    from bot import FitnessTracking
+
+    return FitnessTracking(bot=None)
@@ -2,14 +2,26 @@ import os
 import discord
 import logging
 import asyncio
-from datetime import datetime, timezone, timedelta
-from zoneinfo import ZoneInfo
+import time
+from datetime import datetime, timezone, time as dt_time
 from mistralai.models.sdkerror import SDKError
 
 from discord.ext import commands, tasks
 from dotenv import load_dotenv
-from agent import MistralAgent
-from database import Database
+from agent import MistralAgent, COMPLETION_ANALYZER_PROMPT, user_timezone
+from jobs import QueuedAgent
+from database import DEFAULT_TIMEZONE, SCHEMA_VERSION
+import migrations
+from workout_log import parse_performance, parse_workout_log, basic_verdict
+from progression import planned_sets, session_stats
+import metrics
+import tracing
+from log_config import setup_logging
+import sharding
+from reminders import PREGENERATE_HOUR, ReminderDispatcher, pregenerate_reminders
+import retention
+import archive
+import timezones
 
 PREFIX = "!"
 
@@ -24,21 +36,41 @@ MAX_MESSAGE_LENGTH = 2000
 # Create the bot with all intents
 # The message content and members intent must be enabled in the Discord Developer Portal for the bot to work.
 intents = discord.Intents.all()
-bot = commands.Bot(command_prefix=PREFIX, intents=intents)
-
-# Import the Mistral agent from the agent.py file
+# Set SHARD_COUNT/SHARD_IDS (or BOT_SHARDED=1) to run shards of a larger deployment; see sharding.py
+shard_options = sharding.shard_options()
+if shard_options is None:
+    bot = commands.Bot(command_prefix=PREFIX, intents=intents)
+else:
+    bot = commands.AutoShardedBot(command_prefix=PREFIX, intents=intents, **shard_options)
+
+# Import the Mistral agent from the agent.py file. With AGENT_MODE=queue its LLM work
+# runs on worker.py processes and this process only handles Discord I/O.
 agent = MistralAgent()
+if os.getenv("AGENT_MODE", "local").lower() == "queue":
+    agent = QueuedAgent(agent)
 
 # Get the token from the environment variables
 token = os.getenv("DISCORD_TOKEN")
 
+# Shares reminder work with any other replicas through leases in MongoDB
+reminder_dispatcher = ReminderDispatcher(agent.db)
+REMINDER_CONCURRENCY = int(os.getenv("REMINDER_CONCURRENCY", "10"))
+
+# Startup durations are measured from here; importing this module opens no connections
+STARTED = time.monotonic()
+ready_seconds = None
+
 class FitnessTracking(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.agent = agent  # Use the global agent instance
 
-    @commands.command(name="start_workout", help="Start an interactive workout session", brief="Start workout")
-    async def start_workout(self, ctx):
+    @commands.command(
+        name="start_workout",
+        help="Start an interactive workout session. Use `!start_workout quick` to log several exercises per message instead of one at a time",
+        brief="Start workout"
+    )
+    async def start_workout(self, ctx, mode: str = "guided"):
         """Start an interactive workout session."""
         user_id = ctx.author.id
         user_data = self.agent.db.get_user_data(user_id)
@@ -61,28 +93,36 @@ class FitnessTracking(commands.Cog):
                     await ctx.send("😔 Sorry! The AI is a bit overwhelmed right now. Please wait a minute and try again!")
                     return
                 raise e
+            except asyncio.TimeoutError:
+                await ctx.send("⏳ Sorry! Generating your workout took too long. Please try again in a minute!")
+                return
 
             if not workout_plan or "exercises" not in workout_plan:
                 raise ValueError("Invalid workout plan generated")
 
-            logger.info(f"workout_plan: {workout_plan}")    
+            logger.debug("workout_plan: %s", workout_plan)
             plan_display = self.format_workout_plan(workout_plan)
-            logger.info(f"plan_display: {plan_display}") 
+            logger.debug("plan_display: %s", plan_display)
             await ctx.send(f"Here's your workout plan for today:\n\n{plan_display}")
             
             # Start workout immediately
-            await self.start_interactive_workout(ctx, workout_plan)
+            if mode.lower() in ("quick", "batch", "log"):
+                await self.start_batch_workout(ctx, workout_plan)
+            else:
+                await self.start_interactive_workout(ctx, workout_plan)
                 
         except Exception as e:
-            logger.error(f"Failed to start workout for user {user_id}: {str(e)}")
+            logger.error("Failed to start workout for user %s: %s", user_id, str(e))
             await ctx.send("❌ Something went wrong while setting up your workout. Please try again. If the problem persists, try resetting your fitness profile with `!reset`.")
 
+    @tracing.traced("workout.interactive")
     async def start_interactive_workout(self, ctx, workout_plan):
         """Handle the interactive workout session."""
         user_id = ctx.author.id
         session_results = {
             "date": datetime.now().strftime("%Y-%m-%d"),
             "exercises": [],
+            "sets_planned": planned_sets(workout_plan["exercises"]),
             "status": "in_progress"
         }
         
@@ -119,7 +159,8 @@ Need to stop early? Use `!end_workout` to end your session and save your progres
                     return m.author == ctx.author and m.channel == ctx.channel
                     
                 try:
-                    msg = await self.bot.wait_for('message', check=check, timeout=1800)  # 30 min timeout
+                    with tracing.span("discord.wait_for", exercise=exercise["name"]):
+                        msg = await self.bot.wait_for('message', check=check, timeout=1800)  # 30 min timeout
                     
                     # If we get here and the workout was ended, stop processing
                     user_data = self.agent.db.get_user_data(user_id)
@@ -132,36 +173,27 @@ Need to stop early? Use `!end_workout` to end your session and save your progres
                             exercise,
                             msg.content
                         )
-                    except SDKError as e:
-                        if "rate limit" in str(e).lower():
+                    except (SDKError, asyncio.TimeoutError) as e:
+                        if isinstance(e, asyncio.TimeoutError) or "rate limit" in str(e).lower():
                             await ctx.send("😔 Sorry! The AI is a bit overwhelmed right now. Let me try to evaluate your performance based on basic metrics...")
                             
                             # Basic performance evaluation logic
                             try:
                                 # Parse the response in format "SxR @W"
-                                parts = msg.content.lower().split('@')
-                                sets_reps = parts[0].strip().split('x')
-                                completed_sets = int(sets_reps[0])
-                                completed_reps = int(sets_reps[1])
-                                
-                                target_sets = exercise['sets']
-                                target_reps = int(exercise['reps'].split('-')[0] if '-' in exercise['reps'] else exercise['reps'])
-                                
-                                # Simple completion percentage calculation
-                                completion_percentage = (completed_sets * completed_reps) / (target_sets * target_reps) * 100
+                                parsed = parse_performance(msg.content)
+                                if not parsed:
+                                    raise ValueError(f"No sets/reps found in '{msg.content}'")
+                                performance = basic_verdict(parsed, exercise)
                                 
-                                if completion_percentage < 70:
-                                    performance = "decrease"
+                                if performance == "decrease":
                                     await ctx.send("Based on the numbers, this seems challenging. We'll adjust the weight down next time to help you maintain good form.")
-                                elif completion_percentage > 90:
-                                    performance = "increase"
+                                elif performance == "increase":
                                     await ctx.send("Looks like you completed this exercise strong! We'll try increasing the weight next time.")
                                 else:
-                                    performance = "maintain"
                                     await ctx.send("Solid work! We'll maintain this weight to ensure good form and consistent progress.")
                                     
                             except Exception as parse_error:
-                                logger.error(f"Failed to parse exercise performance: {parse_error}")
+                                logger.error("Failed to parse exercise performance: %s", parse_error)
                                 performance = "maintain"
                                 await ctx.send("I couldn't quite understand the format of your response. We'll maintain the current weight to be safe. Remember to use the format: sets x reps @ weight (e.g., '3x10 @20lb')")
                         else:
@@ -190,20 +222,135 @@ Need to stop early? Use `!end_workout` to end your session and save your progres
             session_results["status"] = "completed"
             self.agent.db.complete_workout_session(user_id, session_results)
             
+            await self._send_workout_summary(ctx, session_results)
+            
+        except Exception as e:
+            logger.error("Failed to complete workout for user %s: %s", user_id, str(e))
+            await ctx.send("❌ Something went wrong while completing your workout. Please try again later.")
+
+    @tracing.traced("workout.batch")
+    async def start_batch_workout(self, ctx, workout_plan):
+        """Let the user log the workout in as few messages as they like, then evaluate and save it in one go."""
+        user_id = ctx.author.id
+        planned_exercises = workout_plan["exercises"]
+        planned_by_name = {exercise["name"]: exercise for exercise in planned_exercises}
+        logged = {}
+        
+        await ctx.send("""
+📝 Log your exercises as you go - or all at once at the end. Put one exercise per line:
+```
+Bench Press: 3x10 @135lb
+Squats: 3x8 @185lb felt heavy
+```
+You can also use the plan order, e.g. `2. 3x8 @185lb`. Send `done` when you're finished.
+
+Need to stop early? Use `!end_workout` to end your session.
+""")
+        
+        def check(m):
+            # Return False if message is !end_workout (to break out of wait_for)
+            if m.content.lower() == "!end_workout":
+                return False
+            # Otherwise check if message is from the same user and channel
+            return m.author == ctx.author and m.channel == ctx.channel
+        
+        try:
+            while len(logged) < len(planned_exercises):
+                try:
+                    msg = await self.bot.wait_for('message', check=check, timeout=1800)  # 30 min timeout
+                except asyncio.TimeoutError:
+                    if logged:
+                        # Save whatever was logged before the user went quiet
+                        break
+                    await ctx.send("Workout session timed out. I'll end this session for you.")
+                    await self._end_workout_session(user_id)
+                    return
+                
+                # If we get here and the workout was ended, stop processing
+                user_data = self.agent.db.get_user_data(user_id)
+                if not user_data.get("current_workout"):
+                    return
+                
+                if msg.content.strip().lower() == "done":
+                    break
+                
+                entries = parse_workout_log(msg.content, planned_exercises)
+                if not entries:
+                    await ctx.send("I couldn't match that to an exercise in your plan. Use one line per exercise, e.g. `Bench Press: 3x10 @135lb`")
+                    continue
+                
+                logged.update(entries)
+                remaining = [exercise["name"] for exercise in planned_exercises if exercise["name"] not in logged]
+                reply = f"✅ Logged: {', '.join(entries)}"
+                if remaining:
+                    reply += f"\nStill to go: {', '.join(remaining)}"
+                await ctx.send(reply)
+            
+            if not logged:
+                await ctx.send("No exercises were logged, so there's nothing to save. Use `!start_workout` when you're ready to try again!")
+                await self._end_workout_session(user_id, force=True)
+                return
+            
             try:
-                summary = await self.agent.generate_workout_summary(session_results)
-            except SDKError as e:
-                if "rate limit" in str(e).lower():
-                    summary = "Great work completing your workout! 💪"
+                async with ctx.typing():
+                    evaluations = await self.agent.evaluate_workout_batch(user_id, planned_exercises, logged)
+            except (SDKError, asyncio.TimeoutError) as e:
+                if isinstance(e, asyncio.TimeoutError) or "rate limit" in str(e).lower():
+                    await ctx.send("😔 Sorry! The AI is a bit overwhelmed right now. Let me evaluate your performance based on basic metrics...")
+                    evaluations = {
+                        name: basic_verdict(performance, planned_by_name[name])
+                        for name, performance in logged.items()
+                    }
                 else:
                     raise e
-                    
-            await ctx.send(f"🎉 Workout complete!\n\n{summary}")
+            
+            session_results = {
+                "date": datetime.now().strftime("%Y-%m-%d"),
+                "exercises": [],
+                "sets_planned": planned_sets(planned_exercises),
+                "status": "completed"
+            }
+            exercise_performances = {}
+            for name, performance in logged.items():
+                session_results["exercises"].append({
+                    "exercise": name,
+                    "planned": planned_by_name[name],
+                    "actual": performance["actual"],
+                    "evaluation": evaluations[name]
+                })
+                exercise_performances[name] = {
+                    "planned": planned_by_name[name],
+                    "actual": performance["actual"],
+                    "evaluation": evaluations[name],
+                    "next_weight": performance["decision"]["next_weight"] if performance.get("decision") else None
+                }
+            
+            # Session and per-exercise history go to the database in a single write
+            self.agent.db.complete_workout_session(user_id, session_results, exercise_performances)
+            
+            await self._send_workout_summary(ctx, session_results)
             
         except Exception as e:
-            logger.error(f"Failed to complete workout for user {user_id}: {str(e)}")
+            logger.error("Failed to complete workout for user %s: %s", user_id, str(e))
             await ctx.send("❌ Something went wrong while completing your workout. Please try again later.")
 
+    async def _send_workout_summary(self, ctx, session_results):
+        """Send the locally computed recap right away, then an optional short note from the AI."""
+        user_data = self.agent.db.get_user_data(ctx.author.id)
+        stats = session_stats(session_results, user_data)
+        await ctx.send(f"🎉 Workout complete!\n\n{self.agent.format_workout_summary(stats)}")
+        
+        if not self.agent.summary_flourish:
+            return
+        try:
+            note = await self.agent.generate_workout_summary(stats)
+        except (SDKError, asyncio.TimeoutError) as e:
+            if isinstance(e, asyncio.TimeoutError) or "rate limit" in str(e).lower():
+                # The stats are already out; the note is a nice-to-have
+                return
+            raise e
+        await ctx.send(note)
+
     def format_workout_plan(self, plan):
         """Format the workout plan for display"""
         output = "**Today's Workout Plan**\n\n"
@@ -299,11 +446,7 @@ Need to stop early? Use `!end_workout` to end your session and save your progres
             return
 
         # Get user's timezone and current date
-        timezone_str = user_data.get("timezone", "America/Los_Angeles")
-        try:
-            user_tz = ZoneInfo(timezone_str)
-        except Exception:
-            user_tz = ZoneInfo("America/Los_Angeles")
+        user_tz = user_timezone(user_data)
         
         current_date = datetime.now(user_tz).strftime("%Y-%m-%d")
         
@@ -334,11 +477,7 @@ Need to stop early? Use `!end_workout` to end your session and save your progres
             return
 
         # Get user's timezone and current date
-        timezone_str = user_data.get("timezone", "America/Los_Angeles")
-        try:
-            user_tz = ZoneInfo(timezone_str)
-        except Exception:
-            user_tz = ZoneInfo("America/Los_Angeles")
+        user_tz = user_timezone(user_data)
         
         current_time = datetime.now(user_tz)
         current_date = current_time.strftime("%Y-%m-%d")
@@ -351,10 +490,7 @@ Need to stop early? Use `!end_workout` to end your session and save your progres
                 {"role": "user", "content": message}
             ]
             
-            completion_response = await self.agent.client.chat.complete_async(
-                model=MISTRAL_MODEL,
-                messages=completion_check_messages,
-            )
+            completion_response = await self.agent.complete("completion_check", completion_check_messages)
             
             completion_result = completion_response.choices[0].message.content.strip().lower()
             
@@ -381,68 +517,11 @@ Need to stop early? Use `!end_workout` to end your session and save your progres
                 await ctx.send("Progress has been updated, but marked as incomplete.")
                 
         except Exception as e:
-            logger.error(f"Error adding progress: {e}")
+            logger.error("Error adding progress: %s", e)
             await ctx.send("❌ Something went wrong while updating your progress. Please try again.")
 
-    def _get_timezone_from_offset(self, offset_hours, current_time):
-        """Convert UTC offset to closest timezone name, considering DST."""
-        # Common timezone mappings (offset -> [possible_timezones])
-        offset_to_timezone = {
-            -12: ["Pacific/Wake"],
-            -11: ["Pacific/Pago_Pago"],
-            -10: ["Pacific/Honolulu", "America/Adak"],  # Adak observes DST
-            -9.5: ["Pacific/Marquesas"],
-            -9: ["America/Anchorage", "America/Juneau"],
-            -8: ["America/Los_Angeles", "America/Vancouver", "America/Tijuana"],
-            -7: ["America/Denver", "America/Phoenix", "America/Edmonton"],  # Phoenix doesn't observe DST
-            -6: ["America/Chicago", "America/Mexico_City", "America/Regina"],  # Regina doesn't observe DST
-            -5: ["America/New_York", "America/Toronto", "America/Bogota"],  # Bogota doesn't observe DST
-            -4: ["America/Halifax", "America/Puerto_Rico"],  # Puerto Rico doesn't observe DST
-            -3.5: ["America/St_Johns"],
-            -3: ["America/Sao_Paulo", "America/Argentina/Buenos_Aires"],
-            -2: ["Atlantic/South_Georgia"],
-            -1: ["Atlantic/Azores", "Atlantic/Cape_Verde"],  # Cape Verde doesn't observe DST
-            0: ["Europe/London", "UTC"],
-            1: ["Europe/Paris", "Europe/Berlin", "Africa/Lagos"],  # Lagos doesn't observe DST
-            2: ["Europe/Helsinki", "Europe/Kiev", "Africa/Cairo"],
-            3: ["Europe/Moscow", "Asia/Baghdad"],
-            3.5: ["Asia/Tehran"],
-            4: ["Asia/Dubai", "Asia/Baku"],  # Dubai doesn't observe DST
-            4.5: ["Asia/Kabul"],
-            5: ["Asia/Karachi", "Asia/Tashkent"],
-            5.5: ["Asia/Kolkata", "Asia/Colombo"],
-            5.75: ["Asia/Kathmandu"],
-            6: ["Asia/Dhaka", "Asia/Almaty"],
-            6.5: ["Asia/Yangon"],
-            7: ["Asia/Bangkok", "Asia/Ho_Chi_Minh"],
-            8: ["Asia/Singapore", "Asia/Shanghai", "Australia/Perth"],
-            8.75: ["Australia/Eucla"],
-            9: ["Asia/Tokyo", "Asia/Seoul"],
-            9.5: ["Australia/Darwin", "Australia/Adelaide"],  # Adelaide observes DST
-            10: ["Australia/Sydney", "Australia/Melbourne", "Australia/Brisbane"],  # Brisbane doesn't observe DST
-            10.5: ["Australia/Adelaide", "Australia/Lord_Howe"],
-            11: ["Pacific/Noumea", "Pacific/Guadalcanal"],
-            12: ["Pacific/Auckland", "Pacific/Fiji"],
-            13: ["Pacific/Apia", "Pacific/Tongatapu"],
-            14: ["Pacific/Kiritimati"]
-        }
-
-        # Try each timezone and find the one that matches the current offset
-        for tz_name in possible_timezones:
-            try:
-                tz = ZoneInfo(tz_name)
-                # Check if this timezone's current offset matches our target offset
-                tz_offset = current_time.astimezone(tz).utcoffset().total_seconds() / 3600
-                if abs(tz_offset - offset_hours) < 0.5:  # Allow for small differences
-                    return tz_name
-            except Exception:
-                continue
-
-        # If no matching timezone found, return UTC
-        return "UTC"
-
     @commands.command(name="timezone", help="Set your timezone (defaults to PST)", brief="Set timezone")
-    async def set_timezone(self, ctx, timezone: str = None):
+    async def set_timezone(self, ctx, *, timezone: str = None):
         """Set the user's timezone. If no timezone provided, default to US Pacific Time."""
         user_id = ctx.author.id
         user_data = self.agent.db.get_user_data(user_id)
@@ -454,200 +533,21 @@ Need to stop early? Use `!end_workout` to end your session and save your progres
         try:
             if timezone is None:
                 # Default to US Pacific Time
-                timezone = "America/Los_Angeles"
-                await ctx.send("ℹ️ Setting your timezone to PST (US Pacific Time). You can change it by using common abbreviations like `!timezone EST` or full names like `!timezone America/New_York`")
+                timezone = DEFAULT_TIMEZONE
+                await ctx.send("ℹ️ Setting your timezone to PST (US Pacific Time). You can change it with an abbreviation like `!timezone EST`, a city like `!timezone new york`, an offset like `!timezone UTC+5:30` or a full name like `!timezone America/New_York`")
             else:
-                # Common abbreviation mappings
-                abbreviations = {
-                    # North America
-                    "PST": "America/Los_Angeles",
-                    "PDT": "America/Los_Angeles",
-                    "MST": "America/Denver",
-                    "MDT": "America/Denver",
-                    "CST": "America/Chicago",
-                    "CDT": "America/Chicago",
-                    "EST": "America/New_York",
-                    "EDT": "America/New_York",
-                    "AST": "America/Halifax",
-                    "ADT": "America/Halifax",
-                    "NST": "America/St_Johns",
-                    "NDT": "America/St_Johns",
-                    "AKST": "America/Anchorage",
-                    "AKDT": "America/Anchorage",
-                    "HST": "Pacific/Honolulu",
-                    
-                    # Europe
-                    "GMT": "UTC",
-                    "UTC": "UTC",
-                    "WET": "Europe/London",
-                    "BST": "Europe/London",
-                    "CET": "Europe/Paris",
-                    "CEST": "Europe/Paris",
-                    "EET": "Europe/Helsinki",
-                    "EEST": "Europe/Helsinki",
-                    
-                    # Asia
-                    "MSK": "Europe/Moscow",
-                    "IST": "Asia/Kolkata",
-                    "GST": "Asia/Dubai",
-                    "PKT": "Asia/Karachi",
-                    "BST": "Asia/Dhaka",
-                    "ICT": "Asia/Bangkok",
-                    "CST": "Asia/Shanghai",
-                    "HKT": "Asia/Hong_Kong",
-                    "JST": "Asia/Tokyo",
-                    "KST": "Asia/Seoul",
-                    
-                    # Australia/Pacific
-                    "AWST": "Australia/Perth",
-                    "ACST": "Australia/Adelaide",
-                    "ACDT": "Australia/Adelaide",
-                    "AEST": "Australia/Sydney",
-                    "AEDT": "Australia/Sydney",
-                    "NZST": "Pacific/Auckland",
-                    "NZDT": "Pacific/Auckland",
-                    
-                    # South America
-                    "ART": "America/Argentina/Buenos_Aires",
-                    "BRT": "America/Sao_Paulo",
-                    "BRST": "America/Sao_Paulo",
-                    "CLT": "America/Santiago",
-                    "CLST": "America/Santiago",
-                    
-                    # Africa
-                    "WAT": "Africa/Lagos",
-                    "CAT": "Africa/Maputo",
-                    "EAT": "Africa/Nairobi",
-                    "SAST": "Africa/Johannesburg",
-                    
-                    # Middle East
-                    "TRT": "Europe/Istanbul",
-                    "IRST": "Asia/Tehran",
-                    "IRDT": "Asia/Tehran",
-                    
-                    "ChST": "Pacific/Guam",  # Chamorro Standard Time
-                    "SST": "Pacific/Samoa",   # Samoa Standard Time
-                }
-
-                # Convert common abbreviations to canonical names
-                timezone = abbreviations.get(timezone.upper(), timezone)
-
-                # Validate timezone
-                try:
-                    ZoneInfo(timezone)
-                except Exception:
-                    await ctx.send("❌ Invalid timezone! You can use common abbreviations like `EST`, `PST`, `GMT` or full names like `America/New_York`. See full list here: https://en.wikipedia.org/wiki/List_of_tz_database_time_zones")
+                resolved = timezones.resolve(timezone)
+                if resolved is None:
+                    await ctx.send("❌ I couldn't find that timezone! Try an abbreviation like `EST`, a city like `London`, an offset like `UTC+5:30` or a full name like `America/New_York`. See full list here: https://en.wikipedia.org/wiki/List_of_tz_database_time_zones")
                     return
+                timezone = resolved
 
             # Store the timezone
             self.agent.db.update_user_data(user_id, {"timezone": timezone})
-            
-            # Get a friendly display name and timezone info
-            display_name = timezone.split('/')[-1].replace('_', ' ')
-            
-            # Map canonical names to abbreviations and full names
-            timezone_info = {
-                # North America
-                "America/Los_Angeles": ("PST/PDT", "Pacific Time Zone"),
-                "America/Denver": ("MST/MDT", "Mountain Time Zone"),
-                "America/Phoenix": ("MST", "Mountain Time Zone (no DST)"),
-                "America/Chicago": ("CST/CDT", "Central Time Zone"),
-                "America/New_York": ("EST/EDT", "Eastern Time Zone"),
-                "America/Halifax": ("AST/ADT", "Atlantic Time Zone"),
-                "America/St_Johns": ("NST/NDT", "Newfoundland Time Zone"),
-                "America/Anchorage": ("AKST/AKDT", "Alaska Time Zone"),
-                "Pacific/Honolulu": ("HST", "Hawaii Time Zone"),
-                "America/Tijuana": ("PST/PDT", "Pacific Time Zone"),
-                "America/Vancouver": ("PST/PDT", "Pacific Time Zone"),
-                "America/Edmonton": ("MST/MDT", "Mountain Time Zone"),
-                "America/Regina": ("CST", "Central Time Zone (no DST)"),
-                "America/Mexico_City": ("CST/CDT", "Central Time Zone"),
-                "America/Toronto": ("EST/EDT", "Eastern Time Zone"),
-                "America/Puerto_Rico": ("AST", "Atlantic Time Zone (no DST)"),
-                
-                # Europe
-                "UTC": ("UTC/GMT", "Coordinated Universal Time"),
-                "Europe/London": ("GMT/BST", "British Time Zone"),
-                "Europe/Paris": ("CET/CEST", "Central European Time Zone"),
-                "Europe/Berlin": ("CET/CEST", "Central European Time Zone"),
-                "Europe/Helsinki": ("EET/EEST", "Eastern European Time Zone"),
-                "Europe/Kiev": ("EET/EEST", "Eastern European Time Zone"),
-                "Europe/Moscow": ("MSK", "Moscow Time Zone"),
-                
-                # Asia
-                "Asia/Dubai": ("GST", "Gulf Standard Time"),
-                "Asia/Baghdad": ("AST", "Arabia Standard Time"),
-                "Asia/Tehran": ("IRST/IRDT", "Iran Time Zone"),
-                "Asia/Kabul": ("AFT", "Afghanistan Time Zone"),
-                "Asia/Karachi": ("PKT", "Pakistan Time Zone"),
-                "Asia/Tashkent": ("UZT", "Uzbekistan Time Zone"),
-                "Asia/Kolkata": ("IST", "India Time Zone"),
-                "Asia/Colombo": ("IST", "India Time Zone"),
-                "Asia/Kathmandu": ("NPT", "Nepal Time Zone"),
-                "Asia/Dhaka": ("BST", "Bangladesh Time Zone"),
-                "Asia/Yangon": ("MMT", "Myanmar Time Zone"),
-                "Asia/Bangkok": ("ICT", "Indochina Time Zone"),
-                "Asia/Ho_Chi_Minh": ("ICT", "Indochina Time Zone"),
-                "Asia/Singapore": ("SGT", "Singapore Time Zone"),
-                "Asia/Shanghai": ("CST", "China Time Zone"),
-                "Asia/Hong_Kong": ("HKT", "Hong Kong Time Zone"),
-                "Asia/Tokyo": ("JST", "Japan Time Zone"),
-                "Asia/Seoul": ("KST", "Korea Time Zone"),
-                
-                # Australia/Pacific
-                "Australia/Perth": ("AWST", "Australian Western Time Zone"),
-                "Australia/Darwin": ("ACST", "Australian Central Time Zone (no DST)"),
-                "Australia/Adelaide": ("ACST/ACDT", "Australian Central Time Zone"),
-                "Australia/Sydney": ("AEST/AEDT", "Australian Eastern Time Zone"),
-                "Australia/Melbourne": ("AEST/AEDT", "Australian Eastern Time Zone"),
-                "Australia/Brisbane": ("AEST", "Australian Eastern Time Zone (no DST)"),
-                "Pacific/Auckland": ("NZST/NZDT", "New Zealand Time Zone"),
-                "Pacific/Fiji": ("FJT/FJST", "Fiji Time Zone"),
-                "Pacific/Guam": ("ChST", "Chamorro Time Zone"),
-                "Pacific/Samoa": ("SST", "Samoa Time Zone"),
-                
-                # South America
-                "America/Argentina/Buenos_Aires": ("ART", "Argentina Time Zone"),
-                "America/Sao_Paulo": ("BRT/BRST", "Brasilia Time Zone"),
-                "America/Santiago": ("CLT/CLST", "Chile Time Zone"),
-                
-                # Africa
-                "Africa/Lagos": ("WAT", "West Africa Time Zone"),
-                "Africa/Cairo": ("EET", "Eastern European Time Zone"),
-                "Africa/Maputo": ("CAT", "Central Africa Time Zone"),
-                "Africa/Nairobi": ("EAT", "East Africa Time Zone"),
-                "Africa/Johannesburg": ("SAST", "South Africa Time Zone"),
-                
-                # Middle East
-                "Europe/Istanbul": ("TRT", "Turkey Time Zone"),
-                "Asia/Baku": ("AZT", "Azerbaijan Time Zone"),
-                
-                # Pacific Islands
-                "Pacific/Wake": ("WAKT", "Wake Island Time Zone"),
-                "Pacific/Pago_Pago": ("SST", "Samoa Time Zone"),
-                "Pacific/Marquesas": ("MART", "Marquesas Time Zone"),
-                "Pacific/Noumea": ("NCT", "New Caledonia Time Zone"),
-                "Pacific/Guadalcanal": ("SBT", "Solomon Islands Time Zone"),
-                "Pacific/Apia": ("WST/WSDT", "West Samoa Time Zone"),
-                "Pacific/Tongatapu": ("TOT", "Tonga Time Zone"),
-                "Pacific/Kiritimati": ("LINT", "Line Islands Time Zone")
-            }
-            
-            if timezone in timezone_info:
-                abbr, full_name = timezone_info[timezone]
-                await ctx.send(f"✅ Your timezone has been set to {display_name} ({abbr}, {full_name})!")
-            else:
-                # For any timezone not in our mapping, try to get the current abbreviation
-                try:
-                    tz = ZoneInfo(timezone)
-                    current_time = datetime.now(tz)
-                    abbr = current_time.strftime("%Z")
-                    await ctx.send(f"✅ Your timezone has been set to {display_name} ({abbr})!")
-                except:
-                    await ctx.send(f"✅ Your timezone has been set to {display_name}!")
+            await ctx.send(f"✅ Your timezone has been set to {timezones.describe(timezone)}!")
             
         except Exception as e:
-            logger.error(f"Failed to set timezone for user {user_id}: {e}")
+            logger.error("Failed to set timezone for user %s: %s", user_id, e)
             await ctx.send("❌ Something went wrong while setting your timezone. Please try again.")
 
     async def _end_workout_session(self, user_id: int, force: bool = False) -> bool:
@@ -664,6 +564,7 @@ Need to stop early? Use `!end_workout` to end your session and save your progres
                 "date": datetime.now().strftime("%Y-%m-%d"),
                 "status": "incomplete",
                 "exercises": [],
+                "sets_planned": planned_sets(user_data["current_workout"].get("exercises", [])),
                 "notes": "Workout ended early"
             }
             self.agent.db.complete_workout_session(user_id, session_results)
@@ -683,7 +584,7 @@ Need to stop early? Use `!end_workout` to end your session and save your progres
             else:
                 await ctx.send("You don't have an active workout session to end.")
         except Exception as e:
-            logger.error(f"Failed to end workout for user {user_id}: {str(e)}")
+            logger.error("Failed to end workout for user %s: %s", user_id, str(e))
             await ctx.send("❌ Something went wrong while ending your workout session.")
 
     @commands.command(name="reset", help="Reset your fitness tracking and start fresh", brief="Reset fitness tracking")
@@ -699,7 +600,7 @@ Need to stop early? Use `!end_workout` to end your session and save your progres
             response = await self.agent.reset_user(user_id)
             await ctx.send(response)
         except Exception as e:
-            logger.error(f"Failed to reset user {user_id}: {e}")
+            logger.error("Failed to reset user %s: %s", user_id, e)
             await ctx.send("❌ Something went wrong while trying to reset your data. Please try again later.")
 
     @commands.command(name="reminder", help="Change your daily check-in time (format: HH:MM)", brief="Set check-in time")
@@ -720,12 +621,8 @@ Need to stop early? Use `!end_workout` to end your session and save your progres
                 await ctx.send("❌ Please use the 24-hour format HH:MM (e.g., 09:00 or 14:30)")
                 return
 
-            # Get user's timezone from database or use default
-            user_timezone = user_data.get("timezone")
-            if not user_timezone:
-                user_timezone = "America/Los_Angeles"  # Default to PST
-                self.agent.db.update_user_data(user_id, {"timezone": user_timezone})
-                await ctx.send("ℹ️ Using PST (US Pacific Time) as your timezone. Use `!timezone` command to change it if needed.")
+            # New users start on DEFAULT_TIMEZONE and migrations fill it in for older ones
+            timezone_name = user_data.get("timezone") or DEFAULT_TIMEZONE
 
             # Store the time in the database
             reminder_time = new_time
@@ -735,11 +632,11 @@ Need to stop early? Use `!end_workout` to end your session and save your progres
             
             # Format time for display (convert to 12-hour format for readability)
             display_time = input_time.strftime("%I:%M %p")
-            display_zone = user_timezone.split('/')[-1].replace('_', ' ')
+            display_zone = timezone_name.split('/')[-1].replace('_', ' ')
             await ctx.send(f"✅ Your daily check-in time has been set to {display_time} {display_zone}!")
             
         except Exception as e:
-            logger.error(f"Failed to set reminder time for user {user_id}: {e}")
+            logger.error("Failed to set reminder time for user %s: %s", user_id, e)
             await ctx.send("❌ Something went wrong while setting your reminder time. Please try again.")
 
 @bot.event
@@ -750,35 +647,139 @@ async def on_ready():
 
     https://discordpy.readthedocs.io/en/latest/api.html#discord.on_ready
     """
-    logger.info(f"{bot.user} has connected to Discord!")
+    logger.info("%s has connected to Discord!", bot.user)
+    global ready_seconds
+    if ready_seconds is None:
+        ready_seconds = time.monotonic() - STARTED
+        metrics.STARTUP_SECONDS.labels("ready").set(ready_seconds)
+        logger.info("Ready in %.2fs", ready_seconds)
+    set_ready(True)
      # If the task is running due to a previous session, stop it first
     if check_reminders.is_running():
         check_reminders.cancel()
     check_reminders.start()
+    if not pregenerate_reminder_texts.is_running():
+        pregenerate_reminder_texts.start()
+    if not compact_history.is_running():
+        compact_history.start()
+
+
+@bot.event
+async def on_disconnect():
+    set_ready(False)
+
+
+def set_ready(ready: bool):
+    """Publish readiness on the fitness_bot_ready gauge and, if READY_FILE is set, as that file existing"""
+    metrics.READY.set(1 if ready else 0)
+    ready_file = os.getenv("READY_FILE")
+    if not ready_file:
+        return
+    if ready:
+        with open(ready_file, "w") as f:
+            f.write(str(os.getpid()))
+    elif os.path.exists(ready_file):
+        os.remove(ready_file)
 
 
 @tasks.loop(minutes=1)  # Check every minute
 async def check_reminders():
     """Check if any users need reminders and send them."""
-    all_users = list(agent.db.get_all_users())  # Convert cursor to list
-    logger.info(f"Checking reminders for {len(all_users)} users...")
-    
-    # Log summary of each user's state
+    with metrics.REMINDER_LOOP_SECONDS.time(), tracing.trace("reminders.check"):
+        await send_due_reminders()
+
+
+@tasks.loop(time=dt_time(hour=PREGENERATE_HOUR, tzinfo=timezone.utc))
+async def pregenerate_reminder_texts():
+    """Write tomorrow's personalized reminders off-peak; one replica does it, the others skip"""
+    if not await asyncio.to_thread(agent.db.acquire_lease, "reminder_texts", reminder_dispatcher.owner, 3600):
+        return
+    with tracing.trace("reminders.pregenerate"):
+        await pregenerate_reminders(agent)
+
+
+@tasks.loop(time=dt_time(hour=retention.RETENTION_HOUR, tzinfo=timezone.utc))
+async def compact_history():
+    """Fold workout history older than RETENTION_DAYS into rollups and archive old conversation turns; one replica does it"""
+    if not await asyncio.to_thread(agent.db.acquire_lease, "retention", reminder_dispatcher.owner, 3600):
+        return
+    with tracing.trace("retention.compact"):
+        await asyncio.to_thread(retention.compact_history, agent.db)
+        await asyncio.to_thread(archive.archive_conversations, agent.db)
+
+
+async def send_due_reminders():
+    partitions = await asyncio.to_thread(reminder_dispatcher.acquire)
+    # The candidate scan and per-user claims are blocking pymongo calls, so they run off the event loop
+    due = await asyncio.to_thread(claim_due_reminders, partitions)
+
+    # Bounded so a burst stays within Discord's global rate limit; per-route 429s are retried by discord.py
+    semaphore = asyncio.Semaphore(REMINDER_CONCURRENCY)
+    await asyncio.gather(*(deliver_reminder(user_data, date, semaphore) for user_data, date in due))
+
+
+def claim_due_reminders(partitions):
+    """Claim today's reminder for every due user in `partitions`; returns (user_data, claimed date) pairs"""
+    all_users = [
+        user_data
+        for partition in partitions
+        for user_data in agent.db.get_reminder_candidates(partition, reminder_dispatcher.partitions)
+    ]
+    logger.info("Checking reminders for %s users in partitions %s...", len(all_users), partitions)
+
+    due = []
     for user_data in all_users:
-        logger.info(f"User {user_data['_id']}: "
-                   f"habit='{user_data.get('habit_goal', 'Not set')}', "
-                   f"reminder_time={user_data.get('reminder_time', 'Not set')}, "
-                   f"last_check_in={user_data.get('last_check_in', 'Never')}, "
-                   f"streak={user_data.get('current_streak', 0)}")
-        
-        user_id = user_data["_id"]
         try:
-            if agent.should_send_reminder(user_id):
-                user = await bot.fetch_user(user_id)
-                if user:
-                    await agent.send_reminder(user_id, user)
+            date = agent.should_send_reminder(user_data["_id"], user_data)
+            if date:
+                due.append((user_data, date))
         except Exception as e:
-            logger.error(f"Failed to process reminder for user {user_id}: {e}")
+            logger.error("Failed to process reminder for user %s: %s", user_data["_id"], e)
+    return due
+
+
+async def reminder_channel(user_data, refresh: bool = False):
+    """The user's DM channel, from the stored id when we have one so sending costs a single API call"""
+    channel_id = user_data.get("dm_channel_id")
+    if channel_id and not refresh:
+        return bot.get_partial_messageable(channel_id, type=discord.ChannelType.private)
+    user_id = user_data["_id"]
+    user = bot.get_user(user_id) or await bot.fetch_user(user_id)
+    channel = user.dm_channel or await user.create_dm()
+    await asyncio.to_thread(agent.db.update_user_data, user_id, {"dm_channel_id": channel.id})
+    return channel
+
+
+async def deliver_reminder(user_data, date: str, semaphore: asyncio.Semaphore):
+    user_id = user_data["_id"]
+    async with semaphore:
+        started = time.perf_counter()
+        try:
+            try:
+                await agent.send_reminder(user_data, await reminder_channel(user_data))
+            except discord.NotFound:
+                if not user_data.get("dm_channel_id"):
+                    raise
+                # The stored channel is gone; look it up again
+                await agent.send_reminder(user_data, await reminder_channel(user_data, refresh=True))
+            metrics.REMINDERS_SENT.inc()
+            metrics.REMINDER_SEND_SECONDS.observe(time.perf_counter() - started)
+        except discord.Forbidden:
+            # The user has DMs from the bot turned off
+            metrics.REMINDER_FAILURES.labels("forbidden").inc()
+            logger.warning("Cannot DM user %s, skipping reminder", user_id)
+        except discord.NotFound:
+            metrics.REMINDER_FAILURES.labels("not_found").inc()
+            logger.warning("User %s not found, skipping reminder", user_id)
+        except Exception as e:
+            metrics.REMINDER_FAILURES.labels("error").inc()
+            logger.error("Failed to send reminder to user %s: %s", user_id, e)
+            # Release today's claim so the next check retries; Forbidden and NotFound above would
+            # fail the same way every minute, so those keep it
+            try:
+                await asyncio.to_thread(agent.db.release_reminder, user_id, date, user_data.get("last_reminder_sent"))
+            except Exception as e:
+                logger.error("Failed to release reminder claim for user %s: %s", user_id, e)
 
 
 @bot.event
@@ -796,20 +797,29 @@ async def on_message(message: discord.Message):
     if message.author.bot or message.content.startswith("!"):
         return
 
+    with tracing.trace("discord.message", user_id=message.author.id, channel_id=message.channel.id):
+        await handle_message(message)
+
+
+async def handle_message(message: discord.Message):
     # Check if user has an active workout session
     user_id = message.author.id
     user_data = agent.db.get_user_data(user_id)
     if user_data and user_data.get("current_workout"):
         # Skip processing if user is in workout mode
         return
+    if user_data and isinstance(message.channel, discord.DMChannel) and user_data.get("dm_channel_id") != message.channel.id:
+        # Remember the DM channel so reminders can be sent without looking the user up
+        agent.db.update_user_data(user_id, {"dm_channel_id": message.channel.id})
 
     # Process the message with the agent
-    logger.info(f"Processing message from {message.author}: {message.content}")
+    logger.info("Processing message from %s: %s", message.author, message.content)
     
     # Show typing indicator to make the bot feel more responsive
     async with message.channel.typing():
         try:
-            response = await agent.run(message)
+            with metrics.MESSAGE_SECONDS.labels("chat").time():
+                response = await agent.run(message)
             # Get the cog instance to use its helper methods
             cog = bot.get_cog("FitnessTracking")
             truncated_response = cog.truncate_message(response)
@@ -819,6 +829,8 @@ async def on_message(message: discord.Message):
                 await message.reply("😔 Sorry! The AI is a bit overwhelmed right now. Please wait a minute and try again!")
                 return
             raise e
+        except asyncio.TimeoutError:
+            await message.reply("⏳ Sorry! That took longer than expected. Please try again in a minute!")
 
 
 # Commands
@@ -829,13 +841,54 @@ async def on_message(message: discord.Message):
 # Feel free to delete this if your project will not need commands.
 
 
-# Add this right before bot.run(token)
+@bot.before_invoke
+async def start_command_timer(ctx: commands.Context):
+    ctx.started = time.perf_counter()
+    ctx.trace = tracing.start_trace(f"command:{ctx.command.qualified_name}", user_id=ctx.author.id)
+
+
+@bot.after_invoke
+async def record_command_time(ctx: commands.Context):
+    metrics.MESSAGE_SECONDS.labels(f"command:{ctx.command.qualified_name}").observe(time.perf_counter() - ctx.started)
+    if ctx.trace:
+        if ctx.command_failed:
+            ctx.trace.error = "CommandError"
+        ctx.trace.end()
+
+
+def warm_database():
+    agent.db.ping()
+    agent.db.ensure_indexes()
+    outdated = migrations.outdated_users(agent.db)
+    if outdated:
+        logger.warning("%s users are below schema version %s; run `python migrations.py`", outdated, SCHEMA_VERSION)
+
+
 async def setup():
+    """Runs once before connecting to the gateway: start instrumentation, warm connections and load the cog"""
+    metrics.start_metrics_server()
+    metrics.instrument_discord_http(bot.http)
+    bot.loop.create_task(metrics.monitor_event_loop_lag())
+    warming = [asyncio.to_thread(warm_database)]
+    if not isinstance(agent, QueuedAgent):
+        # In queue mode the workers make the LLM calls, so only they need a warm connection
+        warming.append(agent.backend.warm())
+    await asyncio.gather(*warming)
+    metrics.STARTUP_SECONDS.labels("setup").set(time.monotonic() - STARTED)
+    logger.info("Connections warmed in %.2fs", time.monotonic() - STARTED)
     await bot.add_cog(FitnessTracking(bot))
 
-# Modify the bot.run line to setup the cog
 bot.setup_hook = setup
 
-print(f"Token: {token}...")  # Print only the first few characters for debugging
-# Start the bot, connecting it to the gateway
-bot.run(token)
+
+def main():
+    """Configure logging and run the bot until interrupted"""
+    setup_logging()
+    if not token:
+        raise SystemExit("DISCORD_TOKEN environment variable not set")
+    # Start the bot, connecting it to the gateway; logging is already configured above
+    bot.run(token, log_handler=None)
+
+
+if __name__ == "__main__":
+    main()
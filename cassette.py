@@ -0,0 +1,156 @@
+import asyncio
+import atexit
+import gzip
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from mistralai.models import ChatCompletionResponse
+
+from llm import LLMBackend
+
+# Setup logging
+logger = logging.getLogger("discord")
+
+# Recorded calls are written to the file in batches of this many (and on exit)
+FLUSH_EVERY = 20
+
+
+class CassetteMiss(LookupError):
+    """Raised in replay mode when a request was never recorded"""
+
+
+def request_key(model: str, messages: List[Dict[str, Any]]) -> str:
+    """Stable hash identifying a chat completion request"""
+    payload = json.dumps({"model": model, "messages": messages}, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()[:32]
+
+
+class CassetteBackend(LLMBackend):
+    """Records LLM calls to a gzipped JSON-lines log, or replays them deterministically.
+
+    In "record" mode every request goes to the wrapped backend and one line is
+    kept per call: request key, model, messages, response and latency. Lines are
+    appended to the file FLUSH_EVERY at a time (off the event loop for async
+    calls), and whatever is left when the process exits.
+    In "replay" mode answers are served from the log by request key, in recorded
+    order for repeated identical requests, with the recorded latency ("original")
+    or none ("zero"). Unrecorded requests raise CassetteMiss.
+    """
+
+    name = "cassette"
+
+    def __init__(self, path: str, mode: str = "replay", inner: Optional[LLMBackend] = None, latency: str = "original"):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown cassette mode '{mode}'")
+        if mode == "record" and inner is None:
+            raise ValueError("Recording needs a backend to record from")
+        if latency not in ("original", "zero"):
+            raise ValueError(f"Unknown cassette latency '{latency}'")
+        self.path = path
+        self.mode = mode
+        self.inner = inner
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.recordings: Dict[str, deque] = defaultdict(deque)
+        self.last_played: Dict[str, Dict[str, Any]] = {}
+        self.unwritten: List[str] = []
+        if mode == "replay":
+            self._load()
+        else:
+            atexit.register(self.flush)
+
+    def _load(self) -> None:
+        count = 0
+        with gzip.open(self.path, "rt", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    self.recordings[record["key"]].append(record)
+                    count += 1
+        logger.info("Loaded %s LLM recordings from %s", count, self.path)
+
+    def _record(self, model: str, messages: List[Dict[str, Any]], response: Dict[str, Any], latency: float) -> bool:
+        """Buffer one call; returns True once enough are buffered to be worth a flush"""
+        line = json.dumps({
+            "key": request_key(model, messages),
+            "model": model,
+            "messages": messages,
+            "response": response,
+            "latency": round(latency, 4),
+        }, separators=(",", ":"), default=str)
+        with self.lock:
+            self.unwritten.append(line + "\n")
+            return len(self.unwritten) >= FLUSH_EVERY
+
+    def flush(self) -> None:
+        """Append the buffered calls to the file as one gzip member"""
+        with self.lock:
+            lines, self.unwritten = self.unwritten, []
+            if not lines:
+                return
+            with gzip.open(self.path, "at", encoding="utf-8") as f:
+                f.writelines(lines)
+
+    def _play(self, model: str, messages: List[Dict[str, Any]]) -> Dict[str, Any]:
+        key = request_key(model, messages)
+        with self.lock:
+            queue = self.recordings.get(key)
+            if queue:
+                self.last_played[key] = queue.popleft()
+            elif key not in self.last_played:
+                raise CassetteMiss(f"No recording for {model} request {key}")
+            # Identical requests beyond what was recorded reuse the last answer
+            return self.last_played[key]
+
+    def _delay(self, record: Dict[str, Any]) -> float:
+        return record["latency"] if self.latency == "original" else 0.0
+
+    def complete(self, model: str, messages: List[Dict[str, Any]]) -> Any:
+        if self.mode == "replay":
+            record = self._play(model, messages)
+            time.sleep(self._delay(record))
+            return ChatCompletionResponse.model_validate(record["response"])
+        started = time.monotonic()
+        response = self.inner.complete(model, messages)
+        if self._record(model, messages, response.model_dump(mode="json"), time.monotonic() - started):
+            self.flush()
+        return response
+
+    async def complete_async(self, model: str, messages: List[Dict[str, Any]]) -> Any:
+        if self.mode == "replay":
+            record = self._play(model, messages)
+            await asyncio.sleep(self._delay(record))
+            return ChatCompletionResponse.model_validate(record["response"])
+        started = time.monotonic()
+        response = await self.inner.complete_async(model, messages)
+        if self._record(model, messages, response.model_dump(mode="json"), time.monotonic() - started):
+            await asyncio.to_thread(self.flush)
+        return response
+
+    async def stream_async(self, model: str, messages: List[Dict[str, Any]]) -> AsyncIterator[str]:
+        if self.mode == "replay":
+            record = self._play(model, messages)
+            await asyncio.sleep(self._delay(record))
+            yield record["response"]["choices"][0]["message"]["content"]
+            return
+        started = time.monotonic()
+        chunks = []
+        async for chunk in self.inner.stream_async(model, messages):
+            chunks.append(chunk)
+            yield chunk
+        content = "".join(chunks)
+        full = self._record(model, messages, {
+            "id": "stream",
+            "object": "chat.completion",
+            "model": model,
+            "created": int(time.time()),
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        }, time.monotonic() - started)
+        if full:
+            await asyncio.to_thread(self.flush)
@@ -1,26 +1,101 @@
-from pymongo import MongoClient
-from datetime import datetime
+from pymongo import IndexModel, MongoClient, ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from datetime import datetime, timedelta, timezone
+from functools import cached_property
 import os
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 import logging
+from exercises import canonical_name
+from metrics import timed_cursor, timed_db
 
 logger = logging.getLogger(__name__)
 
+# Version of the user document layout; migrations.py brings older documents up to it
+SCHEMA_VERSION = 5
+
+DEFAULT_TIMEZONE = "America/Los_Angeles"
+EXPERIENCE_LEVELS = ("beginner", "intermediate", "advanced")
+# Conversation turns the chat prompt uses; the archive job always leaves at least this many in the user document
+CHAT_HISTORY_TURNS = 10
+
+# Projection for the reminder loop, which would otherwise load every user's full history each minute
+REMINDER_FIELDS = {
+    "onboarded": 1, "fitness_goal": 1, "reminder_time": 1, "timezone": 1,
+    "last_check_in": 1, "last_reminder_sent": 1, "dm_channel_id": 1, "reminder_message": 1,
+}
+
+# What the reminder text generator reads: the profile plus the last few workouts
+REMINDER_PROFILE_FIELDS = {
+    **REMINDER_FIELDS,
+    "milestones": 1, "current_streak": 1, "longest_streak": 1,
+    "workout_sessions": {"$slice": -3},
+}
+
 class Database:
-    def __init__(self):
-        # Get MongoDB connection string from environment variable
-        mongodb_uri = os.getenv("MONGODB_URI")
-        if not mongodb_uri:
-            raise ValueError("MONGODB_URI environment variable not set")
-        
-        self.client = MongoClient(mongodb_uri)
-        self.db = self.client.habit_tracker
-        self.users = self.db.users
+    # Secondary indexes per collection, created at startup; users are only looked up by _id
+    INDEXES: Dict[str, List[IndexModel]] = {
+        "users": [],
+        "leases": [IndexModel([("kind", 1), ("expires_at", 1)])],
+        "jobs": [
+            IndexModel([("status", 1), ("created_at", 1)]),
+            # Finished jobs are kept for an hour for debugging, then dropped by MongoDB
+            IndexModel([("finished_at", 1)], expireAfterSeconds=3600),
+        ],
+        "conversation_archive": [IndexModel([("user_id", 1), ("period", 1)])],
+    }
+
+    def __init__(self, client: Optional[MongoClient] = None):
+        self._client = client
+
+    @property
+    def client(self) -> MongoClient:
+        # Connect on first use so importing the bot doesn't open sockets
+        if self._client is None:
+            # Get MongoDB connection string from environment variable
+            mongodb_uri = os.getenv("MONGODB_URI")
+            if not mongodb_uri:
+                raise ValueError("MONGODB_URI environment variable not set")
+            self._client = MongoClient(mongodb_uri)
+        return self._client
+
+    @cached_property
+    def db(self):
+        return self.client.habit_tracker
+
+    @cached_property
+    def users(self):
+        return self.db.users
+
+    @cached_property
+    def leases(self):
+        return self.db.leases
+
+    @cached_property
+    def jobs(self):
+        return self.db.jobs
+
+    @cached_property
+    def conversation_archive(self):
+        return self.db.conversation_archive
+
+    @timed_db
+    def ping(self) -> None:
+        """Open the connection pool and check the server is reachable"""
+        self.client.admin.command("ping")
+
+    @timed_db
+    def ensure_indexes(self) -> None:
+        """Create any missing indexes in INDEXES (a no-op for existing ones)"""
+        for collection, indexes in self.INDEXES.items():
+            if indexes:
+                self.db[collection].create_indexes(indexes)
 
+    @timed_db
     def get_user_data(self, user_id: int) -> Optional[Dict[str, Any]]:
         """Retrieve user data from MongoDB"""
         return self.users.find_one({"_id": user_id})
 
+    @timed_db
     def create_user(self, user_id: int) -> Dict[str, Any]:
         """Create a new user document"""
         current_date = datetime.now().strftime("%Y-%m-%d")
@@ -35,7 +110,7 @@ class Database:
             "last_check_in": current_date,
             "last_reminder_sent": current_date,
             "reminder_time": "20:00",
-            "timezone": None,  # Added timezone field
+            "timezone": DEFAULT_TIMEZONE,  # Replaced during onboarding
             "current_streak": 0,
             "longest_streak": 0,
             "conversation_history": [],
@@ -46,11 +121,13 @@ class Database:
             "current_workout": None,  # Store ongoing workout session
             "workout_sessions": [],  # Store completed workout sessions
             "max_weights": {},  # Track max weights for progressive overload
-            "preferred_exercises": []  # Store exercises that work well for the user
+            "preferred_exercises": [],  # Store exercises that work well for the user
+            "schema_version": SCHEMA_VERSION
         }
         self.users.insert_one(user_data)
         return user_data
 
+    @timed_db
     def update_user_data(self, user_id: int, update_data: Dict[str, Any]) -> None:
         """Update user data in MongoDB"""
         self.users.update_one(
@@ -58,6 +135,7 @@ class Database:
             {"$set": update_data}
         )
 
+    @timed_db
     def update_conversation_history(self, user_id: int, message: Dict[str, Any]) -> None:
         """Append a message to the user's conversation history"""
         self.users.update_one(
@@ -65,61 +143,97 @@ class Database:
             {"$push": {"conversation_history": message}}
         )
 
+    @timed_db
     def update_progress_log(self, user_id: int, date: str, entry: Dict[str, Any]) -> None:
         """Update the progress log for a specific date"""
-        try:
-            # First verify the user exists
-            user = self.users.find_one({"_id": user_id})
-            if not user:
-                logger.error(f"User {user_id} not found when updating progress log")
-                return
-
-            # Ensure progress_log exists
-            if "progress_log" not in user:
-                logger.info(f"Initializing progress_log for user {user_id}")
-                self.users.update_one(
-                    {"_id": user_id},
-                    {"$set": {"progress_log": {}}}
-                )
-
-            # Update the progress log for the specific date
-            result = self.users.update_one(
-                {"_id": user_id},
-                {"$set": {f"progress_log.{date}": entry}}
-            )
-            
-            logger.info(f"Progress log update result - matched: {result.matched_count}, modified: {result.modified_count}")
-            
-            # Verify the update
-            updated_user = self.users.find_one({"_id": user_id})
-            if date in updated_user.get("progress_log", {}):
-                logger.info(f"Successfully verified progress log update for user {user_id} on {date}")
-            else:
-                logger.error(f"Failed to verify progress log update for user {user_id} on {date}")
-                
-        except Exception as e:
-            logger.error(f"Error updating progress log for user {user_id}: {e}")
-            raise
+        result = self.users.update_one(
+            {"_id": user_id},
+            {"$set": {f"progress_log.{date}": entry}}
+        )
+        if not result.matched_count:
+            logger.error("User %s not found when updating progress log", user_id)
 
+    @timed_cursor
     def get_all_users(self):
         """Get all users for reminder checking"""
         return self.users.find({})
 
+    @timed_cursor
+    def get_reminder_candidates(self, partition: int = 0, partitions: int = 1):
+        """Onboarded users in one reminder partition (user id modulo `partitions`), with only the fields reminders need"""
+        query = {"onboarded": True}
+        if partitions > 1:
+            query["_id"] = {"$mod": [partitions, partition]}
+        return self.users.find(query, REMINDER_FIELDS)
+
+    @timed_cursor
+    def get_reminder_profiles(self):
+        """Onboarded users with the fields needed to write their reminder text"""
+        return self.users.find({"onboarded": True}, REMINDER_PROFILE_FIELDS)
+
+    @timed_db
+    def claim_reminder(self, user_id: int, date: str) -> bool:
+        """Atomically mark today's reminder as sent; only one caller per user and date gets True"""
+        claimed = self.users.find_one_and_update(
+            {"_id": user_id, "$or": [
+                {"last_reminder_sent": {"$lt": date}},
+                {"last_reminder_sent": {"$exists": False}},
+            ]},
+            {"$set": {"last_reminder_sent": date}},
+            projection={"_id": 1}
+        )
+        return claimed is not None
+
+    @timed_db
+    def release_reminder(self, user_id: int, date: str, previous: Optional[str]) -> None:
+        """Undo claim_reminder for `date` after a failed send, restoring the previous value"""
+        update = {"$set": {"last_reminder_sent": previous}} if previous else {"$unset": {"last_reminder_sent": ""}}
+        self.users.update_one({"_id": user_id, "last_reminder_sent": date}, update)
+
+    @timed_db
+    def acquire_lease(self, name: str, owner: str, ttl: float, **fields: Any) -> bool:
+        """Take or renew the named lease for `owner` unless another owner holds an unexpired one"""
+        now = datetime.now(timezone.utc)
+        try:
+            self.leases.find_one_and_update(
+                {"_id": name, "$or": [{"owner": owner}, {"expires_at": {"$lt": now}}]},
+                {"$set": {"owner": owner, "expires_at": now + timedelta(seconds=ttl), **fields}},
+                upsert=True
+            )
+        except DuplicateKeyError:
+            # The lease exists and belongs to someone else
+            return False
+        return True
+
+    @timed_db
+    def release_lease(self, name: str, owner: str) -> None:
+        """Give up the named lease if `owner` holds it"""
+        self.leases.delete_one({"_id": name, "owner": owner})
+
+    @timed_db
+    def count_live_leases(self, kind: str) -> int:
+        """Number of unexpired leases of one kind"""
+        return self.leases.count_documents({"kind": kind, "expires_at": {"$gt": datetime.now(timezone.utc)}})
+
+    @timed_db
     def delete_user(self, user_id: int) -> None:
         """Delete a user's data from the database"""
         self.users.delete_one({"_id": user_id})
+        self.conversation_archive.delete_many({"user_id": user_id})
 
+    @timed_db
     def update_exercise_history(self, user_id: int, exercise: str, performance: Dict[str, Any]) -> None:
         """Update the exercise history for a user"""
         date = datetime.now().strftime("%Y-%m-%d")
         self.users.update_one(
             {"_id": user_id},
-            {"$push": {f"exercise_history.{exercise}": {
+            {"$push": {f"exercise_history.{canonical_name(exercise)}": {
                 "date": date,
                 **performance
             }}}
         )
 
+    @timed_db
     def start_workout_session(self, user_id: int, workout_plan: Dict[str, Any]) -> None:
         """Start a new workout session"""
         self.users.update_one(
@@ -127,12 +241,145 @@ class Database:
             {"$set": {"current_workout": workout_plan}}
         )
 
-    def complete_workout_session(self, user_id: int, session_data: Dict[str, Any]) -> None:
-        """Complete a workout session and store the results"""
-        self.users.update_one(
-            {"_id": user_id},
-            {
-                "$push": {"workout_sessions": session_data},
-                "$set": {"current_workout": None}
-            }
-        ) 
\ No newline at end of file
+    @timed_db
+    def complete_workout_session(
+        self, user_id: int, session_data: Dict[str, Any], exercise_performances: Optional[Dict[str, Dict[str, Any]]] = None
+    ) -> None:
+        """Complete a workout session and store the results.
+
+        Any per-exercise performances are appended to exercise_history in the same write.
+        """
+        update = {
+            "$push": {"workout_sessions": session_data},
+            "$set": {"current_workout": None}
+        }
+        if exercise_performances:
+            date = datetime.now().strftime("%Y-%m-%d")
+            for exercise, performance in exercise_performances.items():
+                update["$push"][f"exercise_history.{canonical_name(exercise)}"] = {
+                    "date": date,
+                    **performance
+                }
+        self.users.update_one({"_id": user_id}, update)
+
+    @timed_cursor
+    def get_history_users(self, batch_size: int = 100):
+        """Stream onboarded users' raw history and rollups for the retention job"""
+        return self.users.find(
+            {"onboarded": True},
+            {"exercise_history": 1, "workout_sessions": 1, "exercise_rollups": 1, "workout_rollups": 1},
+            batch_size=batch_size
+        )
+
+    @timed_db
+    def compact_history(
+        self, user_id: int, cutoff: str, exercise_rollups: Dict[str, List[Dict[str, Any]]], workout_rollups: List[Dict[str, Any]]
+    ) -> None:
+        """Replace a user's rollups and drop the raw sessions and exercise entries dated before `cutoff` in one write.
+
+        Entries logged while the job runs are dated today, so pulling by date never loses them.
+        """
+        update = {
+            "$set": {"workout_rollups": workout_rollups},
+            "$pull": {"workout_sessions": {"date": {"$lt": cutoff}}}
+        }
+        for exercise, rollups in exercise_rollups.items():
+            update["$set"][f"exercise_rollups.{exercise}"] = rollups
+            update["$pull"][f"exercise_history.{exercise}"] = {"date": {"$lt": cutoff}}
+        self.users.update_one({"_id": user_id}, update)
+
+    @timed_cursor
+    def get_archive_candidates(self, cutoff: str, batch_size: int = 100):
+        """Stream users whose oldest conversation turn is dated before `cutoff` and who have more than the chat's turns"""
+        return self.users.find(
+            {"conversation_history.0.date": {"$lt": cutoff}, f"conversation_history.{CHAT_HISTORY_TURNS}": {"$exists": True}},
+            {"conversation_history": 1},
+            batch_size=batch_size
+        )
+
+    @timed_db
+    def get_conversation_archives(self, user_id: int, period: Optional[str] = None) -> List[Dict[str, Any]]:
+        """A user's archived conversation blocks, oldest first"""
+        query = {"user_id": user_id}
+        if period:
+            query["period"] = period
+        return list(self.conversation_archive.find(query).sort("period", 1))
+
+    @timed_db
+    def save_conversation_archive(self, user_id: int, period: str, data: bytes, turns: int, through: str) -> None:
+        """Store one user's compressed block for a period, replacing the previous one"""
+        self.conversation_archive.update_one(
+            {"_id": f"{user_id}:{period}"},
+            {"$set": {"user_id": user_id, "period": period, "data": data, "turns": turns, "through": through,
+                      "updated_at": datetime.now(timezone.utc)}},
+            upsert=True
+        )
+
+    @timed_db
+    def trim_conversation_history(self, user_id: int, cutoff: str) -> None:
+        """Drop conversation turns dated before `cutoff` (once they are archived)"""
+        self.users.update_one({"_id": user_id}, {"$pull": {"conversation_history": {"date": {"$lt": cutoff}}}})
+
+    @timed_db
+    def enqueue_job(self, kind: str, payload: Dict[str, Any], ttl: float) -> Any:
+        """Queue a job for the worker processes and return its id; workers drop it after `ttl` seconds"""
+        now = datetime.now(timezone.utc)
+        return self.jobs.insert_one({
+            "kind": kind,
+            "payload": payload,
+            "status": "queued",
+            "attempts": 0,
+            "created_at": now,
+            "expires_at": now + timedelta(seconds=ttl),
+        }).inserted_id
+
+    @timed_db
+    def claim_job(self, worker: str, lease: float, max_attempts: int = 3) -> Optional[Dict[str, Any]]:
+        """Atomically take the oldest queued job, or one whose worker's lease ran out"""
+        now = datetime.now(timezone.utc)
+        # Jobs whose lease ran out on their last attempt won't be retaken; fail them so the gateway stops waiting
+        self.jobs.update_many(
+            {"status": "running", "lease_until": {"$lt": now}, "attempts": {"$gte": max_attempts}},
+            {"$set": {
+                "status": "failed",
+                "result": None,
+                "error": {"type": "timeout", "message": f"Job lease expired after {max_attempts} attempts"},
+                "finished_at": now,
+            }}
+        )
+        return self.jobs.find_one_and_update(
+            {"$or": [
+                {"status": "queued"},
+                {"status": "running", "lease_until": {"$lt": now}, "attempts": {"$lt": max_attempts}},
+            ]},
+            {"$set": {"status": "running", "worker": worker, "lease_until": now + timedelta(seconds=lease)},
+             "$inc": {"attempts": 1}},
+            sort=[("created_at", 1)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    @timed_db
+    def renew_job(self, job_id: Any, worker: str, lease: float) -> None:
+        """Extend the lease on a job `worker` is still running"""
+        self.jobs.update_one(
+            {"_id": job_id, "status": "running", "worker": worker},
+            {"$set": {"lease_until": datetime.now(timezone.utc) + timedelta(seconds=lease)}}
+        )
+
+    @timed_db
+    def finish_job(self, job_id: Any, result: Any = None, error: Optional[Dict[str, Any]] = None) -> None:
+        """Store a job's result (or error) for the gateway to pick up"""
+        self.jobs.update_one({"_id": job_id}, {"$set": {
+            "status": "failed" if error else "done",
+            "result": result,
+            "error": error,
+            "finished_at": datetime.now(timezone.utc),
+        }})
+
+    @timed_db
+    def get_finished_jobs(self, job_ids: List[Any]) -> List[Dict[str, Any]]:
+        """Those of the given jobs that have finished, with their results"""
+        return list(self.jobs.find(
+            {"_id": {"$in": job_ids}, "status": {"$in": ["done", "failed"]}},
+            {"status": 1, "result": 1, "error": 1}
+        ))
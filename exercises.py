@@ -0,0 +1,140 @@
+import re
+from collections import defaultdict
+from functools import lru_cache
+from typing import Dict, List, Optional, Set
+
+# Canonical exercise names and the other names the workout generator uses for them.
+# The canonical name is the key exercise_history is stored under. A name that doesn't
+# say which equipment is used ("Squats", "Bicep Curls") gets its own entry rather than
+# an alias, since at home it is often done with different equipment than in a gym.
+CATALOG: Dict[str, List[str]] = {
+    "Squat": [],
+    "Barbell Back Squat": ["back squat", "barbell squat", "high bar squat", "low bar squat"],
+    "Barbell Front Squat": ["front squat"],
+    "Goblet Squat": ["dumbbell goblet squat", "kettlebell goblet squat"],
+    "Bodyweight Squat": ["air squat", "squat bodyweight"],
+    "Bulgarian Split Squat": ["split squat", "rear foot elevated split squat", "dumbbell bulgarian split squat"],
+    "Leg Press": ["machine leg press", "seated leg press"],
+    "Walking Lunge": ["lunge", "dumbbell lunge", "dumbbell walking lunge", "forward lunge"],
+    "Barbell Deadlift": ["deadlift", "conventional deadlift"],
+    "Sumo Deadlift": ["barbell sumo deadlift"],
+    "Romanian Deadlift": ["rdl", "barbell romanian deadlift", "barbell rdl"],
+    "Dumbbell Romanian Deadlift": ["dumbbell rdl"],
+    "Hip Thrust": ["barbell hip thrust", "glute bridge barbell"],
+    "Glute Bridge": ["bodyweight glute bridge"],
+    "Leg Curl": ["lying leg curl", "seated leg curl", "hamstring curl", "machine leg curl"],
+    "Leg Extension": ["machine leg extension", "quad extension"],
+    "Standing Calf Raise": ["calf raise", "machine calf raise"],
+    "Barbell Bench Press": ["bench press", "bench", "barbell bench"],
+    "Incline Barbell Bench Press": ["incline bench press", "incline bench", "incline barbell press"],
+    "Dumbbell Bench Press": ["dumbbell press", "dumbbell chest press"],
+    "Incline Dumbbell Press": ["incline dumbbell bench press", "incline dumbbell chest press"],
+    "Push-ups": ["push up", "pushup", "press up", "bodyweight push up"],
+    "Dips": ["dip", "parallel bar dip", "chest dip", "tricep dip"],
+    "Cable Fly": ["cable chest fly", "cable crossover", "cable flye"],
+    "Dumbbell Fly": ["dumbbell chest fly", "dumbbell flye", "flat dumbbell fly"],
+    "Overhead Press": ["barbell overhead press", "military press", "standing overhead press", "ohp", "barbell shoulder press"],
+    "Dumbbell Shoulder Press": ["seated dumbbell shoulder press", "dumbbell overhead press", "seated dumbbell press"],
+    "Lateral Raise": ["dumbbell lateral raise", "side lateral raise", "side raise"],
+    "Face Pull": ["cable face pull", "rope face pull"],
+    "Pull-ups": ["pull up", "pullup", "bodyweight pull up"],
+    "Chin-ups": ["chin up", "chinup"],
+    "Lat Pulldown": ["cable lat pulldown", "wide grip lat pulldown", "pulldown", "lat pull down"],
+    "Barbell Row": ["bent over row", "barbell bent over row", "bent over barbell row", "pendlay row"],
+    "Dumbbell Row": ["one arm dumbbell row", "single arm dumbbell row", "dumbbell bent over row"],
+    "Seated Cable Row": ["cable row", "seated row"],
+    "Barbell Curl": ["bicep curl barbell", "standing barbell curl"],
+    "Bicep Curl": ["curl"],
+    "Dumbbell Curl": ["dumbbell bicep curl", "alternating dumbbell curl"],
+    "Hammer Curl": ["dumbbell hammer curl"],
+    "Tricep Pushdown": ["cable tricep pushdown", "rope pushdown", "tricep rope pushdown", "triceps pushdown"],
+    "Skull Crusher": ["lying tricep extension", "barbell skull crusher", "ez bar skull crusher"],
+    "Overhead Tricep Extension": ["dumbbell overhead tricep extension", "overhead triceps extension"],
+    "Plank": ["front plank", "forearm plank"],
+    "Side Plank": [],
+    "Hanging Leg Raise": ["leg raise", "hanging knee raise"],
+    "Crunch": ["crunches", "abdominal crunch"],
+    "Russian Twist": [],
+    "Kettlebell Swing": ["kb swing", "russian kettlebell swing"],
+    "Farmer's Carry": ["farmer carry", "farmers walk", "farmer's walk", "dumbbell farmer carry"],
+}
+
+# Words that change which exercise it is; a fuzzy match must agree on all of them
+QUALIFIERS = frozenset(
+    "barbell dumbbell cable machine kettlebell bodyweight smith incline decline front back sumo romanian "
+    "goblet overhead hammer lateral side split hip leg calf seated lying hanging".split()
+)
+# Words the generator adds that don't change the exercise
+FILLER = frozenset("flat standard regular classic traditional strict the a with".split())
+ABBREVIATIONS = {"db": "dumbbell", "bb": "barbell", "kb": "kettlebell", "bw": "bodyweight", "ez": "ez"}
+
+MIN_SIMILARITY = 0.75
+
+
+def normalize(name: str) -> str:
+    """Lowercase words without punctuation, filler, plurals or abbreviations"""
+    words = []
+    for word in re.findall(r"[a-z0-9']+", name.lower().replace("-", " ")):
+        word = ABBREVIATIONS.get(word, word).replace("'", "")
+        if word in FILLER:
+            continue
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        words.append(word)
+    return " ".join(words)
+
+
+def trigrams(text: str) -> Set[str]:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class ExerciseIndex:
+    """Maps generated exercise names to CATALOG names: exact alias lookup first, then a character-trigram index.
+
+    The trigram match catches small spelling variants ("Skul Crushers", "Face Pul")
+    but only against aliases with the same number of words and the same QUALIFIERS,
+    so a dumbbell variant never lands on the barbell history.
+    """
+
+    def __init__(self, catalog: Dict[str, List[str]]):
+        self.aliases: Dict[str, str] = {}
+        for canonical, aliases in catalog.items():
+            for alias in [canonical] + aliases:
+                self.aliases[normalize(alias)] = canonical
+        self.keys = list(self.aliases)
+        self.key_trigrams = [trigrams(key) for key in self.keys]
+        self.key_qualifiers = [set(key.split()) & QUALIFIERS for key in self.keys]
+        self.key_lengths = [len(key.split()) for key in self.keys]
+        self.postings: Dict[str, List[int]] = defaultdict(list)
+        for i, grams in enumerate(self.key_trigrams):
+            for gram in grams:
+                self.postings[gram].append(i)
+
+    def lookup(self, name: str) -> Optional[str]:
+        key = normalize(name)
+        if key in self.aliases:
+            return self.aliases[key]
+        grams = trigrams(key)
+        shared: Dict[int, int] = defaultdict(int)
+        for gram in grams:
+            for i in self.postings.get(gram, ()):
+                shared[i] += 1
+        words = key.split()
+        qualifiers = set(words) & QUALIFIERS
+        best, best_score = None, MIN_SIMILARITY
+        for i, count in shared.items():
+            # Dice coefficient of the trigram sets; an extra word ("bench dips" vs "bench") is a different exercise
+            score = 2 * count / (len(grams) + len(self.key_trigrams[i]))
+            if score >= best_score and self.key_lengths[i] == len(words) and self.key_qualifiers[i] == qualifiers:
+                best, best_score = self.keys[i], score
+        return self.aliases[best] if best else None
+
+
+INDEX = ExerciseIndex(CATALOG)
+
+
+@lru_cache(maxsize=4096)
+def canonical_name(name: str) -> str:
+    """The catalog name for an exercise, or the name tidied up if it isn't in the catalog"""
+    return INDEX.lookup(name) or " ".join(name.split())
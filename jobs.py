@@ -0,0 +1,157 @@
+import asyncio
+import logging
+import os
+from types import SimpleNamespace
+from typing import Any, Dict, Optional
+
+import httpx
+from mistralai.models import ChatCompletionResponse
+from mistralai.models.sdkerror import SDKError
+
+import metrics
+import tracing
+
+# Setup logging
+logger = logging.getLogger("discord")
+
+# MistralAgent methods that run on the worker processes in AGENT_MODE=queue
+QUEUED_METHODS = (
+    "run", "complete", "generate_workout", "evaluate_exercise_performance", "evaluate_workout_batch",
+    "generate_workout_summary", "generate_reminder_text"
+)
+
+# How long the gateway waits for a job before treating it like an LLM timeout
+JOB_TIMEOUT = float(os.getenv("JOB_TIMEOUT", "120"))
+POLL_INTERVAL = 0.05
+
+
+class JobFailed(Exception):
+    """A queued job raised something other than a timeout or an API error"""
+
+
+def message_payload(message) -> Dict[str, Any]:
+    """The parts of a discord.Message that MistralAgent.run reads"""
+    return {"author_id": message.author.id, "content": message.content}
+
+
+def job_message(payload: Dict[str, Any]) -> SimpleNamespace:
+    return SimpleNamespace(author=SimpleNamespace(id=payload["author_id"]), content=payload["content"])
+
+
+def error_payload(e: Exception) -> Dict[str, Any]:
+    if isinstance(e, asyncio.TimeoutError):
+        return {"type": "timeout", "message": str(e)}
+    if isinstance(e, SDKError):
+        return {"type": "sdk", "message": str(e), "status": e.raw_response.status_code, "body": e.body}
+    return {"type": type(e).__name__, "message": str(e)}
+
+
+def raise_error(error: Dict[str, Any]) -> None:
+    """Re-raise a worker's error as the exception bot.py already handles"""
+    if error["type"] == "timeout":
+        raise asyncio.TimeoutError(error["message"])
+    if error["type"] == "sdk":
+        body = error.get("body") or ""
+        raise SDKError(error["message"], raw_response=httpx.Response(error["status"], text=body), body=body)
+    raise JobFailed(f"{error['type']}: {error['message']}")
+
+
+async def run_job(agent, kind: str, payload: Dict[str, Any]) -> Any:
+    """Execute one job on the worker side and return a BSON-friendly result"""
+    if kind not in QUEUED_METHODS:
+        raise ValueError(f"Unknown job kind '{kind}'")
+    if kind == "run":
+        return await agent.run(job_message(payload))
+    result = await getattr(agent, kind)(**payload)
+    if kind == "complete":
+        return result.model_dump(mode="json")
+    if kind == "evaluate_workout_batch":
+        # Local decisions are added to `logged` in place; ship them back with the verdicts
+        decisions = {name: p["decision"] for name, p in payload["logged"].items() if p.get("decision")}
+        return {"evaluations": result, "decisions": decisions}
+    return result
+
+
+class QueuedAgent:
+    """Stand-in for MistralAgent on the gateway process.
+
+    The LLM-bound methods in QUEUED_METHODS are enqueued in the jobs collection
+    and executed by worker.py processes; everything else (database access,
+    formatting helpers) goes to the local agent. One poller task collects all
+    finished jobs, so waiting costs one query per interval however many
+    requests are in flight.
+    """
+
+    def __init__(self, agent):
+        self.agent = agent
+        self.pending: Dict[Any, asyncio.Future] = {}
+        self.poller: Optional[asyncio.Task] = None
+
+    @property
+    def db(self):
+        return self.agent.db
+
+    @db.setter
+    def db(self, db):
+        self.agent.db = db
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.agent, name)
+
+    async def submit(self, kind: str, payload: Dict[str, Any]) -> Any:
+        with tracing.span(f"job.{kind}"):
+            job_id = await asyncio.to_thread(self.db.enqueue_job, kind, payload, JOB_TIMEOUT)
+            future = asyncio.get_running_loop().create_future()
+            self.pending[job_id] = future
+            if self.poller is None or self.poller.done():
+                self.poller = asyncio.create_task(self._poll())
+            try:
+                job = await asyncio.wait_for(future, timeout=JOB_TIMEOUT)
+            finally:
+                self.pending.pop(job_id, None)
+        metrics.JOBS.labels(kind, job["status"]).inc()
+        if job["status"] == "failed":
+            raise_error(job["error"])
+        return job["result"]
+
+    async def _poll(self) -> None:
+        while self.pending:
+            try:
+                finished = await asyncio.to_thread(self.db.get_finished_jobs, list(self.pending))
+            except Exception as e:
+                logger.error("Failed to poll job results: %s", e)
+                finished = []
+            for job in finished:
+                future = self.pending.get(job["_id"])
+                if future and not future.done():
+                    future.set_result(job)
+            await asyncio.sleep(POLL_INTERVAL)
+
+    async def run(self, message) -> str:
+        return await self.submit("run", message_payload(message))
+
+    async def complete(self, purpose: str, messages) -> Any:
+        result = await self.submit("complete", {"purpose": purpose, "messages": messages})
+        return ChatCompletionResponse.model_validate(result)
+
+    async def generate_workout(self, user_id: int) -> Dict[str, Any]:
+        return await self.submit("generate_workout", {"user_id": user_id})
+
+    async def evaluate_exercise_performance(self, user_id: int, planned_exercise: Dict[str, Any], actual_performance: str) -> str:
+        return await self.submit("evaluate_exercise_performance", {
+            "user_id": user_id, "planned_exercise": planned_exercise, "actual_performance": actual_performance
+        })
+
+    async def evaluate_workout_batch(self, user_id: int, planned_exercises, logged) -> Dict[str, str]:
+        result = await self.submit("evaluate_workout_batch", {
+            "user_id": user_id, "planned_exercises": planned_exercises, "logged": logged
+        })
+        for name, decision in result["decisions"].items():
+            logged[name]["decision"] = decision
+        return result["evaluations"]
+
+    async def generate_workout_summary(self, stats: Dict[str, Any]) -> str:
+        return await self.submit("generate_workout_summary", {"stats": stats})
+
+    async def generate_reminder_text(self, user_data: Dict[str, Any]) -> str:
+        return await self.submit("generate_reminder_text", {"user_data": user_data})
@@ -0,0 +1,338 @@
+import asyncio
+import logging
+import os
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+import httpx
+from mistralai import Mistral
+from mistralai.models import NoResponseError
+from mistralai.models.sdkerror import SDKError
+import metrics
+import tracing
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+# Setup logging
+logger = logging.getLogger("discord")
+
+# Model tiers. Each tier gets a latency target; a call that misses it (or errors)
+# is retried on the fallback tier within the call's overall deadline.
+MODEL_TIERS = {
+    "small": {
+        "model": os.getenv("MISTRAL_SMALL_MODEL", "mistral-small-latest"),
+        "latency_target": 4.0,
+        "fallback": "large",
+    },
+    "large": {
+        "model": os.getenv("MISTRAL_LARGE_MODEL", "mistral-large-latest"),
+        "latency_target": 30.0,
+        "fallback": None,
+    },
+}
+
+# Model tier used by each call site in MistralAgent
+CALL_ROUTES = {
+    "time_extraction": "small",
+    "profile_extraction": "small",
+    "completion_check": "small",
+    "exercise_evaluation": "small",
+    "batch_evaluation": "small",
+    "workout_summary": "small",
+    "reminder_text": "small",
+    "milestones": "large",
+    "chat": "large",
+    "faq": "large",
+    "workout_generation": "large",
+}
+
+# Hard deadline (seconds) for each kind of LLM call
+CALL_DEADLINES = {
+    "classification": 15.0,
+    "chat": 45.0,
+    "generation": 90.0,
+}
+
+# Kind of call made at each call site in MistralAgent
+CALL_TYPES = {
+    "time_extraction": "classification",
+    "profile_extraction": "classification",
+    "completion_check": "classification",
+    "exercise_evaluation": "classification",
+    "batch_evaluation": "classification",
+    "milestones": "chat",
+    "chat": "chat",
+    "faq": "chat",
+    "workout_summary": "chat",
+    "workout_generation": "generation",
+    "reminder_text": "generation",
+}
+
+# Only the interactive paths are worth paying for a duplicate request
+HEDGED_CALL_TYPES = {"classification", "chat"}
+
+# Don't hedge until we have seen enough calls to trust the p95
+HEDGE_MIN_SAMPLES = 20
+HEDGE_MIN_DELAY = 0.25
+
+
+class LLMBackend(ABC):
+    """Chat completion backend used by MistralAgent.
+
+    Responses must look like Mistral's ChatCompletionResponse: `choices[0].message.content`
+    and `usage`. Errors that should be treated as rate limits must mention "rate limit".
+    """
+
+    name = "base"
+
+    @abstractmethod
+    def complete(self, model: str, messages: List[Dict[str, Any]]) -> Any:
+        """Return the whole response"""
+
+    @abstractmethod
+    async def complete_async(self, model: str, messages: List[Dict[str, Any]]) -> Any:
+        """Return the whole response without blocking the event loop"""
+
+    @abstractmethod
+    def stream_async(self, model: str, messages: List[Dict[str, Any]]) -> AsyncIterator[str]:
+        """Yield the response text in chunks as it is generated (implemented as an async generator)"""
+
+    async def warm(self) -> None:
+        """Open connections ahead of the first request; optional"""
+
+
+class MistralBackend(LLMBackend):
+    """The real Mistral API (or anything speaking its HTTP protocol, via server_url)"""
+
+    name = "mistral"
+
+    def __init__(self, api_key: Optional[str] = None, server_url: Optional[str] = None):
+        self.api_key = api_key
+        self.server_url = server_url
+        self._client: Optional[Mistral] = None
+
+    @property
+    def client(self) -> Mistral:
+        # Built on first use so importing and constructing the agent stays cheap
+        if self._client is None:
+            self._client = Mistral(api_key=self.api_key, server_url=self.server_url)
+        return self._client
+
+    async def warm(self) -> None:
+        try:
+            await self.client.models.list_async()
+        except Exception as e:
+            logger.warning("Could not pre-warm the Mistral connection: %s", e)
+
+    def complete(self, model: str, messages: List[Dict[str, Any]]) -> Any:
+        return self.client.chat.complete(model=model, messages=messages)
+
+    async def complete_async(self, model: str, messages: List[Dict[str, Any]]) -> Any:
+        return await self.client.chat.complete_async(model=model, messages=messages)
+
+    async def stream_async(self, model: str, messages: List[Dict[str, Any]]) -> AsyncIterator[str]:
+        stream = await self.client.chat.stream_async(model=model, messages=messages)
+        async for event in stream:
+            content = event.data.choices[0].delta.content if event.data.choices else None
+            if content:
+                yield content
+
+
+def create_backend() -> LLMBackend:
+    """Build the backend selected by LLM_BACKEND ("mistral" by default, or "local").
+
+    With LLM_CASSETTE set, calls are recorded to (LLM_CASSETTE_MODE=record) or
+    replayed from (LLM_CASSETTE_MODE=replay) that file instead.
+    """
+    cassette_path = os.getenv("LLM_CASSETTE")
+    cassette_mode = os.getenv("LLM_CASSETTE_MODE", "replay").lower()
+    if cassette_path and cassette_mode == "replay":
+        from cassette import CassetteBackend
+
+        return CassetteBackend(cassette_path, mode="replay", latency=os.getenv("LLM_CASSETTE_LATENCY", "original"))
+
+    backend = os.getenv("LLM_BACKEND", "mistral").lower()
+    if backend == "local":
+        from local_llm import LocalBackend
+
+        inner = LocalBackend.from_env()
+    elif backend == "mistral":
+        inner = MistralBackend(
+            api_key=os.getenv("MISTRAL_API_KEY"),
+            server_url=os.getenv("MISTRAL_SERVER_URL") or None
+        )
+    else:
+        raise ValueError(f"Unknown LLM_BACKEND '{backend}'")
+
+    if cassette_path:
+        from cassette import CassetteBackend
+
+        return CassetteBackend(cassette_path, mode=cassette_mode, inner=inner)
+    return inner
+
+
+def should_fall_back(e: BaseException) -> bool:
+    """Whether a failed call is worth retrying on the fallback tier.
+
+    Only slowness and server-side failures are: auth, validation and rate-limit
+    errors (4xx) would fail on the larger model too, and rate limits mean the
+    API wants less traffic, not more.
+    """
+    if isinstance(e, (asyncio.TimeoutError, httpx.TransportError, ConnectionError, NoResponseError)):
+        return True
+    if isinstance(e, SDKError):
+        return e.raw_response.status_code >= 500
+    return False
+
+
+class LatencyTracker:
+    """Rolling window of successful call latencies"""
+
+    def __init__(self, window: int = 200):
+        self.samples = deque(maxlen=window)
+
+    def record(self, seconds: float) -> None:
+        self.samples.append(seconds)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        """Return the given percentile, or None if there isn't enough data yet"""
+        if len(self.samples) < HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+
+class LLMCaller:
+    """Routes LLM requests to a model tier under a per-call-type deadline, optionally hedging slow ones.
+
+    When hedging is enabled, a second identical request is fired once the first
+    has been outstanding for longer than the observed p95 latency, and whichever
+    answers first wins. The loser is cancelled.
+    """
+
+    def __init__(self, hedging: bool = False):
+        self.hedging = hedging
+        self.latencies: Dict[Tuple[str, str], LatencyTracker] = {}
+        self.stats: Dict[str, Dict[str, int]] = {
+            call_type: {"calls": 0, "timeouts": 0, "hedged": 0, "hedge_wins": 0}
+            for call_type in CALL_DEADLINES
+        }
+        self.tier_stats: Dict[str, Dict[str, int]] = {
+            tier: {"attempts": 0, "fallbacks": 0}
+            for tier in MODEL_TIERS
+        }
+
+    def latency(self, call_type: str, tier: str) -> LatencyTracker:
+        key = (call_type, tier)
+        if key not in self.latencies:
+            self.latencies[key] = LatencyTracker()
+        return self.latencies[key]
+
+    def hedge_delay(self, call_type: str, tier: str) -> Optional[float]:
+        """Seconds to wait before hedging, or None if this call should not be hedged"""
+        if not self.hedging or call_type not in HEDGED_CALL_TYPES:
+            return None
+        p95 = self.latency(call_type, tier).percentile(95)
+        if p95 is None:
+            return None
+        return max(p95, HEDGE_MIN_DELAY)
+
+    def hedge_rate(self, call_type: str) -> float:
+        stats = self.stats[call_type]
+        return stats["hedged"] / stats["calls"] if stats["calls"] else 0.0
+
+    def hedge_win_rate(self, call_type: str) -> float:
+        stats = self.stats[call_type]
+        return stats["hedge_wins"] / stats["hedged"] if stats["hedged"] else 0.0
+
+    async def call(self, purpose: str, make_request: Callable[[str], Awaitable[Any]]) -> Any:
+        """Run make_request(model) for the given call site.
+
+        Raises asyncio.TimeoutError if no answer arrives before the deadline.
+        """
+        call_type = CALL_TYPES[purpose]
+        self.stats[call_type]["calls"] += 1
+        try:
+            with tracing.span("llm.call", purpose=purpose):
+                return await asyncio.wait_for(
+                    self._route(purpose, call_type, make_request),
+                    timeout=CALL_DEADLINES[call_type]
+                )
+        except asyncio.TimeoutError:
+            self.stats[call_type]["timeouts"] += 1
+            metrics.LLM_TIMEOUTS.labels(purpose).inc()
+            logger.warning("LLM %s call exceeded its %ss deadline", purpose, CALL_DEADLINES[call_type])
+            raise
+
+    async def _route(self, purpose: str, call_type: str, make_request: Callable[[str], Awaitable[Any]]) -> Any:
+        tier = CALL_ROUTES[purpose]
+        while True:
+            config = MODEL_TIERS[tier]
+            self.tier_stats[tier]["attempts"] += 1
+            attempt = self._hedged(purpose, call_type, tier, config["model"], make_request)
+            if config["fallback"] is None:
+                return await attempt
+            try:
+                return await asyncio.wait_for(attempt, timeout=config["latency_target"])
+            except Exception as e:
+                if not should_fall_back(e):
+                    raise
+                self.tier_stats[tier]["fallbacks"] += 1
+                metrics.LLM_FALLBACKS.labels(tier).inc()
+                logger.warning("LLM %s call on %s failed (%s), falling back to %s tier", purpose, config['model'], type(e).__name__, config['fallback'])
+                tier = config["fallback"]
+
+    async def _observed(self, purpose: str, model: str, make_request: Callable[[str], Awaitable[Any]]) -> Any:
+        """Run one request, recording its latency, outcome and token usage"""
+        started = time.perf_counter()
+        outcome, response = "error", None
+        try:
+            with tracing.span("llm.request", purpose=purpose, model=model):
+                response = await make_request(model)
+            outcome = "ok"
+            return response
+        except asyncio.CancelledError:
+            outcome = "cancelled"
+            raise
+        finally:
+            metrics.observe_llm(purpose, model, outcome, time.perf_counter() - started, response)
+
+    async def _hedged(
+        self, purpose: str, call_type: str, tier: str, model: str, make_request: Callable[[str], Awaitable[Any]]
+    ) -> Any:
+        started = {}
+
+        def launch() -> asyncio.Task:
+            task = asyncio.ensure_future(self._observed(purpose, model, make_request))
+            started[task] = time.monotonic()
+            return task
+
+        primary = launch()
+        pending = {primary}
+        try:
+            delay = self.hedge_delay(call_type, tier)
+            if delay is not None:
+                done, _ = await asyncio.wait(pending, timeout=delay)
+                if not done:
+                    self.stats[call_type]["hedged"] += 1
+                    metrics.LLM_HEDGES.labels(call_type).inc()
+                    logger.info("Hedging %s call after %.2fs", call_type, delay)
+                    pending.add(launch())
+
+            first_error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is not None:
+                        first_error = first_error or task.exception()
+                        continue
+                    self.latency(call_type, tier).record(time.monotonic() - started[task])
+                    if task is not primary:
+                        self.stats[call_type]["hedge_wins"] += 1
+                        metrics.LLM_HEDGE_WINS.labels(call_type).inc()
+                    return task.result()
+            raise first_error
+        finally:
+            for task in started:
+                if not task.done():
+                    task.cancel()
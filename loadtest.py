@@ -0,0 +1,412 @@
+import argparse
+import asyncio
+import collections
+import logging
+import os
+import random
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Dict, List
+
+import numpy as np
+
+# Setup logging
+logger = logging.getLogger("loadtest")
+
+SCENARIOS = ("checkin", "chat", "workout", "quick_workout", "progress")
+
+CHECKIN_MESSAGES = [
+    "Great workout today, hit legs hard",
+    "decent session, mostly upper body",
+    "Rest day today, feeling a bit sore",
+    "I skipped the gym today, too tired",
+]
+CHAT_MESSAGES = [
+    "how do I do a proper squat?",
+    "is soreness normal after two days?",
+    "what should I eat before a workout?",
+    "how many rest days should I take per week?",
+]
+ONBOARDING_MESSAGE = "I want to build muscle. 80kg, 180cm, intermediate lifter, no injuries. Check in at 8pm EST please"
+
+
+class CountingCollection:
+    """Proxy around a pymongo/mongomock collection that counts every method call"""
+
+    def __init__(self, collection, counter: collections.Counter):
+        self._collection = collection
+        self._counter = counter
+
+    def __getattr__(self, name):
+        attr = getattr(self._collection, name)
+        if not callable(attr):
+            return attr
+
+        def counted(*args, **kwargs):
+            self._counter[name] += 1
+            return attr(*args, **kwargs)
+        return counted
+
+
+class FakeUser:
+    def __init__(self, user_id: int):
+        self.id = user_id
+        self.name = f"loadtest-{user_id}"
+        self.bot = False
+        self.mention = f"<@{user_id}>"
+
+    def __str__(self):
+        return self.name
+
+
+class FakeChannel:
+    """DM channel that records what the bot sends and times replies to inbound messages"""
+
+    def __init__(self, channel_id: int, stats: "Stats"):
+        self.id = channel_id
+        self.stats = stats
+        self.sent: List[str] = []
+        self.pending: collections.deque = collections.deque()
+        self.new_message = asyncio.Condition()
+
+    async def send(self, content: str = "", **kwargs):
+        await self.stats.discord_call()
+        self.sent.append(content)
+        if self.pending:
+            self.stats.latencies.append(time.perf_counter() - self.pending.popleft())
+        async with self.new_message:
+            self.new_message.notify_all()
+
+    @asynccontextmanager
+    async def typing(self):
+        await self.stats.discord_call()
+        yield
+
+    async def wait_for_text(self, text: str, since: int, timeout: float = 120) -> int:
+        """Wait until the bot has sent a message containing `text` after index `since`"""
+        async with self.new_message:
+            await asyncio.wait_for(self.new_message.wait_for(lambda: any(text in m for m in self.sent[since:])), timeout)
+        return len(self.sent)
+
+
+class FakeMessage:
+    def __init__(self, author: FakeUser, channel: FakeChannel, content: str):
+        self.author = author
+        self.channel = channel
+        self.content = content
+
+    async def reply(self, content: str, **kwargs):
+        await self.channel.send(content)
+
+
+class FakeContext:
+    def __init__(self, message: FakeMessage, bot: "FakeBot"):
+        self.message = message
+        self.author = message.author
+        self.channel = message.channel
+        self.bot = bot
+
+    async def send(self, content: str = "", **kwargs):
+        await self.channel.send(content)
+
+    def typing(self):
+        return self.channel.typing()
+
+
+class FakeBot:
+    """Just enough of commands.Bot for on_message and the FitnessTracking cog"""
+
+    def __init__(self):
+        self.cog = None
+        self.waiters: List[Dict[str, Any]] = []
+
+    def get_cog(self, name: str):
+        return self.cog
+
+    async def wait_for(self, event: str, check: Callable = None, timeout: float = None):
+        future = asyncio.get_running_loop().create_future()
+        waiter = {"future": future, "check": check}
+        self.waiters.append(waiter)
+        try:
+            return await asyncio.wait_for(future, timeout)
+        finally:
+            if waiter in self.waiters:
+                self.waiters.remove(waiter)
+
+    def resolve_waiters(self, message: FakeMessage) -> None:
+        for waiter in list(self.waiters):
+            if not waiter["future"].done() and (waiter["check"] is None or waiter["check"](message)):
+                waiter["future"].set_result(message)
+                self.waiters.remove(waiter)
+
+    async def process_commands(self, message: FakeMessage) -> None:
+        if not message.content.startswith("!"):
+            return
+        name, _, rest = message.content[1:].partition(" ")
+        command = getattr(type(self.cog), name, None)
+        if command is None or not hasattr(command, "callback"):
+            return
+        ctx = FakeContext(message, self)
+        if name == "add_progress":
+            await command.callback(self.cog, ctx, message=rest)
+        elif name == "progress":
+            await command.callback(self.cog, ctx, int(rest) if rest else 7)
+        elif rest:
+            await command.callback(self.cog, ctx, rest)
+        else:
+            await command.callback(self.cog, ctx)
+
+
+class Stats:
+    def __init__(self, discord_latency: float):
+        self.discord_latency = discord_latency
+        self.messages = 0
+        self.discord_calls = 0
+        self.errors = 0
+        self.latencies: List[float] = []
+        self.loop_lag: List[float] = []
+        self.scenarios = collections.Counter()
+        self.db_ops = collections.Counter()
+
+    async def discord_call(self) -> None:
+        self.discord_calls += 1
+        if self.discord_latency:
+            await asyncio.sleep(self.discord_latency)
+
+
+class Harness:
+    def __init__(self, bot_module, stats: Stats, think_time: float, rng: random.Random):
+        self.bot_module = bot_module
+        self.stats = stats
+        self.think_time = think_time
+        self.rng = rng
+        self.fake_bot = FakeBot()
+        self.fake_bot.cog = bot_module.FitnessTracking(self.fake_bot)
+        # on_message looks the bot up as a module global
+        bot_module.bot = self.fake_bot
+        self.tasks = set()
+
+    async def send(self, user: FakeUser, channel: FakeChannel, content: str) -> None:
+        """Deliver a message the way discord.py would: to wait_for listeners and to on_message"""
+        self.stats.messages += 1
+        channel.pending.append(time.perf_counter())
+        message = FakeMessage(user, channel, content)
+        self.fake_bot.resolve_waiters(message)
+        task = asyncio.create_task(self._dispatch(message))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def _dispatch(self, message: FakeMessage) -> None:
+        try:
+            await self.bot_module.on_message(message)
+        except Exception as e:
+            self.stats.errors += 1
+            logger.error("on_message failed for %s: %r", message.author, e)
+
+    async def think(self) -> None:
+        await asyncio.sleep(self.rng.expovariate(1 / self.think_time) if self.think_time else 0)
+
+    async def run_user(self, user_id: int, mix: Dict[str, float], deadline: float) -> None:
+        user = FakeUser(user_id)
+        channel = FakeChannel(user_id, self.stats)
+
+        # Onboarding: first message gets the welcome prompt, second one sets up the profile
+        since = len(channel.sent)
+        await self.send(user, channel, "hi")
+        since = await channel.wait_for_text("To get started", since)
+        await self.think()
+        await self.send(user, channel, ONBOARDING_MESSAGE)
+        await channel.wait_for_text("Thank you for sharing", since)
+        self.stats.scenarios["onboarding"] += 1
+
+        names, weights = zip(*mix.items())
+        while time.monotonic() < deadline:
+            await self.think()
+            scenario = self.rng.choices(names, weights)[0]
+            try:
+                await getattr(self, f"scenario_{scenario}")(user, channel)
+                self.stats.scenarios[scenario] += 1
+            except asyncio.TimeoutError:
+                self.stats.errors += 1
+                logger.error("User %s timed out in %s", user_id, scenario)
+
+    async def scenario_checkin(self, user: FakeUser, channel: FakeChannel) -> None:
+        since = len(channel.sent)
+        await self.send(user, channel, self.rng.choice(CHECKIN_MESSAGES))
+        await channel.wait_for_text("", since)
+
+    async def scenario_chat(self, user: FakeUser, channel: FakeChannel) -> None:
+        since = len(channel.sent)
+        await self.send(user, channel, self.rng.choice(CHAT_MESSAGES))
+        await channel.wait_for_text("", since)
+
+    async def scenario_progress(self, user: FakeUser, channel: FakeChannel) -> None:
+        since = len(channel.sent)
+        await self.send(user, channel, "!progress")
+        await channel.wait_for_text("", since)
+
+    async def scenario_workout(self, user: FakeUser, channel: FakeChannel) -> None:
+        since = len(channel.sent)
+        await self.send(user, channel, "!start_workout")
+        while True:
+            since = await channel.wait_for_text("", since)
+            latest = channel.sent[-1]
+            if "Workout complete" in latest or "Something went wrong" in latest or "ongoing workout" in latest:
+                return
+            if "Next exercise" in latest:
+                await self.think()
+                await self.send(user, channel, f"{self.rng.randint(2, 3)}x{self.rng.randint(6, 12)} @{self.rng.choice([45, 95, 135])}lb")
+
+    async def scenario_quick_workout(self, user: FakeUser, channel: FakeChannel) -> None:
+        since = len(channel.sent)
+        await self.send(user, channel, "!start_workout quick")
+        since = await channel.wait_for_text("Send `done`", since)
+        await self.think()
+        await self.send(user, channel, "1. 3x10 @95lb\n2. 3x8 @75lb\n3. 3x12 @25lb")
+        since = await channel.wait_for_text("Logged", since)
+        await self.send(user, channel, "done")
+        await channel.wait_for_text("Workout complete", since)
+
+
+async def monitor_loop_lag(stats: Stats, interval: float = 0.05) -> None:
+    """Sample how late the event loop wakes us up"""
+    while True:
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        stats.loop_lag.append(max(0.0, time.perf_counter() - started - interval))
+
+
+def percentiles(values: List[float]) -> str:
+    if not values:
+        return "n/a"
+    p50, p95, p99 = np.percentile(np.asarray(values) * 1000, [50, 95, 99])
+    return f"p50={p50:.1f}ms p95={p95:.1f}ms p99={p99:.1f}ms max={max(values) * 1000:.1f}ms"
+
+
+def report(stats: Stats, elapsed: float, agent) -> str:
+    db_total = sum(stats.db_ops.values())
+    llm_calls = sum(s["calls"] for s in agent.llm.stats.values())
+    lines = [
+        f"Duration:           {elapsed:.1f}s",
+        f"Inbound messages:   {stats.messages} ({stats.messages / elapsed:.1f} msg/s)",
+        f"Scenarios:          {dict(stats.scenarios)}",
+        f"Reply latency:      {percentiles(stats.latencies)}",
+        f"Event-loop lag:     {percentiles(stats.loop_lag)}",
+        f"DB ops/message:     {db_total / max(stats.messages, 1):.1f} ({dict(stats.db_ops.most_common())})",
+        f"LLM calls/message:  {llm_calls / max(stats.messages, 1):.2f}",
+        f"Discord calls:      {stats.discord_calls}",
+        f"Errors:             {stats.errors}",
+    ]
+    return "\n".join(lines)
+
+
+def parse_mix(text: str) -> Dict[str, float]:
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name not in SCENARIOS:
+            raise argparse.ArgumentTypeError(f"Unknown scenario '{name}', expected one of {SCENARIOS}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+async def main(args, index: int = 0) -> Dict[str, float]:
+    """Run one load-generating process; `index` offsets its user ids when several run side by side"""
+    # The agent is built when bot.py is imported, so configure it first
+    os.environ["LLM_BACKEND"] = "local"
+    os.environ["LOCAL_LLM_LATENCY_MS"] = str(args.llm_latency_ms)
+    os.environ["LOCAL_LLM_SEED"] = str(args.seed)
+    os.environ.setdefault("MONGODB_URI", args.mongo_uri or "mongodb://localhost:27017")
+    os.environ["AGENT_MODE"] = args.agent_mode
+    import bot as bot_module
+    from database import Database
+
+    stats = Stats(args.discord_latency_ms / 1000)
+    if args.mongo_uri:
+        from pymongo import MongoClient
+        client = MongoClient(args.mongo_uri)
+        if args.processes == 1:
+            client.drop_database("habit_tracker")
+    else:
+        import mongomock
+        client = mongomock.MongoClient()
+    database = Database(client=client)
+    database.users = CountingCollection(database.users, stats.db_ops)
+    bot_module.agent.db = database
+
+    harness = Harness(bot_module, stats, args.think_ms / 1000, random.Random(args.seed))
+    lag_task = asyncio.create_task(monitor_loop_lag(stats))
+    stop_workers = asyncio.Event()
+    workers = []
+    if args.agent_mode == "queue":
+        # In-process workers on the same database; run worker.py separately against --mongo-uri to use other cores
+        import worker
+        workers = [asyncio.create_task(worker.serve(bot_module.agent.agent, 16, stop_workers)) for _ in range(args.workers)]
+
+    started = time.monotonic()
+    deadline = started + args.duration
+    await asyncio.gather(*[
+        harness.run_user(1_000_000 + index * args.users + i, args.mix, deadline)
+        for i in range(args.users)
+    ])
+    elapsed = time.monotonic() - started
+    lag_task.cancel()
+    stop_workers.set()
+    await asyncio.gather(*workers)
+
+    print(report(stats, elapsed, bot_module.agent))
+    return {"messages": stats.messages, "elapsed": elapsed, "errors": stats.errors}
+
+
+def run_process(args, index: int, results) -> None:
+    logging.basicConfig(level=args.log_level)
+    results.put(asyncio.run(main(args, index)))
+
+
+def run_processes(args) -> None:
+    """Run --processes independent bot processes, like one per shard range, and report combined throughput"""
+    import multiprocessing
+
+    if args.mongo_uri:
+        from pymongo import MongoClient
+        MongoClient(args.mongo_uri).drop_database("habit_tracker")
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    processes = [context.Process(target=run_process, args=(args, i, results)) for i in range(args.processes)]
+    for process in processes:
+        process.start()
+    totals = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+
+    messages = sum(t["messages"] for t in totals)
+    elapsed = max(t["elapsed"] for t in totals)
+    print(f"Processes:          {args.processes} ({args.users} users each)")
+    print(f"Combined:           {messages} messages ({messages / elapsed:.1f} msg/s), {sum(t['errors'] for t in totals)} errors")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulate Discord users against bot.py with a local LLM stand-in")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=30, help="seconds to keep generating traffic")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("checkin=3,chat=2,workout=1,quick_workout=1,progress=3"),
+                        help="scenario weights, e.g. checkin=3,workout=1,progress=5")
+    parser.add_argument("--think-ms", type=float, default=200, help="mean pause between a user's messages")
+    parser.add_argument("--llm-latency-ms", type=float, default=300, help="median latency of the LLM stand-in")
+    parser.add_argument("--discord-latency-ms", type=float, default=0, help="simulated latency of each Discord API call")
+    parser.add_argument("--mongo-uri", help="use a real (local) mongod instead of mongomock; the habit_tracker database is dropped first")
+    parser.add_argument("--processes", type=int, default=1,
+                        help="bot processes to run side by side (shared-nothing with mongomock, shared state with --mongo-uri)")
+    parser.add_argument("--agent-mode", choices=("local", "queue"), default="local",
+                        help="run agent work inline, or through the job queue (see worker.py)")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="in-process queue workers for --agent-mode queue; use 0 with external worker.py processes")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--log-level", default="WARNING")
+    args = parser.parse_args()
+
+    if args.processes > 1:
+        run_processes(args)
+    else:
+        logging.basicConfig(level=args.log_level)
+        asyncio.run(main(args))
@@ -0,0 +1,275 @@
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import math
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import httpx
+from mistralai.models import ChatCompletionResponse
+from mistralai.models.sdkerror import SDKError
+
+from llm import LLMBackend
+
+# Setup logging
+logger = logging.getLogger("discord")
+
+CHAT_REPLIES = [
+    "Nice work showing up today! 💪 Consistency beats intensity - keep stacking those sessions and focus on clean form.",
+    "Great question! Keep your core braced, move through a full range of motion and add weight only when every rep looks the same.",
+    "Rest and recovery are part of the plan. Sleep well, hit your protein, and come back strong tomorrow! 🔥",
+    "Progress isn't always linear. Track your lifts, celebrate small wins, and trust the process - you're doing great!",
+]
+
+MILESTONES_REPLY = """1. Complete 3 workouts per week for the next 4 weeks
+2. Add 10% to your main lifts within 6 weeks
+3. Hit a 30-day check-in streak"""
+
+WORKOUT_PLAN = {
+    "warmup": "5 minutes light cardio, arm circles, leg swings",
+    "exercises": [
+        {"name": "Barbell Back Squat", "sets": 3, "reps": "8-10", "weight": "95lb", "form_cues": "Brace core, knees track over toes, hit depth"},
+        {"name": "Barbell Bench Press", "sets": 3, "reps": "8-10", "weight": "75lb", "form_cues": "Retract shoulder blades, feet planted, control the descent"},
+        {"name": "Dumbbell Row", "sets": 3, "reps": "10-12", "weight": "25lb", "form_cues": "Flat back, pull elbow to hip"},
+        {"name": "Push-ups", "sets": 3, "reps": "10", "weight": "bodyweight", "form_cues": "Keep core tight, elbows at 45 degrees"},
+        {"name": "Plank", "sets": 3, "reps": "30", "weight": "bodyweight", "form_cues": "Squeeze glutes, neutral neck"},
+    ],
+    "cooldown": "5 minutes stretching focusing on worked muscle groups",
+}
+
+SKIPPED_PATTERN = re.compile(r"\b(skip\w*|missed|didn'?t|did not|no workout|couldn'?t)\b", re.IGNORECASE)
+
+
+REMINDER_REPLY = "Hey! 💪 You're one workout closer to your goal. How did today's session go? Reply here or type `!start_workout` to get going."
+
+
+def canned_response(messages: List[Dict[str, Any]]) -> str:
+    """Deterministic answer shaped like what each MistralAgent prompt expects"""
+    system = "\n".join(m["content"] for m in messages if m["role"] == "system")
+    last_user = next((m["content"] for m in reversed(messages) if m["role"] == "user"), "")
+
+    if "TIME|TIMEZONE" in system:
+        return "20:00|America/Los_Angeles"
+    if "EXPERIENCE|LIMITATIONS" in system:
+        return "beginner|none"
+    if "'completed' or 'incomplete'" in system:
+        return "incomplete" if SKIPPED_PATTERN.search(last_user) else "completed"
+    if "JSON object mapping each exercise name" in system:
+        names = [line.split(" | ")[0] for line in system.splitlines() if line.count(" | ") == 3]
+        return json.dumps({name: "maintain" for name in names})
+    if "'decrease', 'maintain', or 'increase'" in system:
+        return "maintain"
+    if "workout plan" in system and "JSON" in system:
+        return json.dumps(WORKOUT_PLAN)
+    if "check-in reminder" in system:
+        return REMINDER_REPLY
+    if "achievable milestones" in last_user:
+        return MILESTONES_REPLY
+    digest = hashlib.sha256(last_user.encode()).digest()
+    return CHAT_REPLIES[digest[0] % len(CHAT_REPLIES)]
+
+
+def response_dict(model: str, messages: List[Dict[str, Any]], content: str) -> Dict[str, Any]:
+    """A chat.completion response body in the Mistral API format"""
+    prompt_tokens = sum(len(m["content"]) for m in messages) // 4
+    completion_tokens = max(1, len(content) // 4)
+    return {
+        "id": uuid.uuid4().hex,
+        "object": "chat.completion",
+        "model": model,
+        "created": int(time.time()),
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        },
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop",
+        }],
+    }
+
+
+def chunk_dict(model: str, completion_id: str, content: Optional[str], finish_reason: Optional[str] = None) -> Dict[str, Any]:
+    """A chat.completion.chunk stream event in the Mistral API format"""
+    delta = {"role": "assistant", "content": content} if content is not None else {}
+    return {
+        "id": completion_id,
+        "object": "chat.completion.chunk",
+        "model": model,
+        "created": int(time.time()),
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+    }
+
+
+class RateLimited(Exception):
+    pass
+
+
+class LocalBackend(LLMBackend):
+    """Offline, deterministic stand-in for the Mistral API.
+
+    Answers come from canned_response(); latencies are drawn from a seeded
+    log-normal distribution; requests beyond `rps` (token bucket) or a random
+    `error_rate` fraction fail with a 429 rate-limit SDKError, like the real API.
+    """
+
+    name = "local"
+
+    def __init__(self, latency_ms: float = 800, sigma: float = 0.5, error_rate: float = 0.0, rps: float = 0.0, seed: int = 0):
+        self.latency_ms = latency_ms
+        self.sigma = sigma
+        self.error_rate = error_rate
+        self.rps = rps
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.tokens = rps
+        self.last_refill = time.monotonic()
+
+    @classmethod
+    def from_env(cls) -> "LocalBackend":
+        return cls(
+            latency_ms=float(os.getenv("LOCAL_LLM_LATENCY_MS", "800")),
+            sigma=float(os.getenv("LOCAL_LLM_LATENCY_SIGMA", "0.5")),
+            error_rate=float(os.getenv("LOCAL_LLM_ERROR_RATE", "0")),
+            rps=float(os.getenv("LOCAL_LLM_RPS", "0")),
+            seed=int(os.getenv("LOCAL_LLM_SEED", "0")),
+        )
+
+    def next_latency(self) -> float:
+        """Seconds this request should take"""
+        if self.latency_ms <= 0:
+            return 0.0
+        with self.lock:
+            return self.rng.lognormvariate(math.log(self.latency_ms / 1000), self.sigma)
+
+    def admit(self) -> None:
+        """Raise RateLimited if this request should be rejected"""
+        with self.lock:
+            if self.error_rate and self.rng.random() < self.error_rate:
+                raise RateLimited()
+            if self.rps:
+                now = time.monotonic()
+                self.tokens = min(self.rps, self.tokens + (now - self.last_refill) * self.rps)
+                self.last_refill = now
+                if self.tokens < 1:
+                    raise RateLimited()
+                self.tokens -= 1
+
+    def _admit_or_raise(self) -> None:
+        try:
+            self.admit()
+        except RateLimited:
+            raise SDKError(
+                "API error occurred: Status 429. Requests rate limit exceeded",
+                raw_response=httpx.Response(429, text='{"message":"Requests rate limit exceeded"}'),
+                body='{"message":"Requests rate limit exceeded"}'
+            )
+
+    def complete(self, model: str, messages: List[Dict[str, Any]]) -> Any:
+        self._admit_or_raise()
+        time.sleep(self.next_latency())
+        return ChatCompletionResponse.model_validate(response_dict(model, messages, canned_response(messages)))
+
+    async def complete_async(self, model: str, messages: List[Dict[str, Any]]) -> Any:
+        self._admit_or_raise()
+        await asyncio.sleep(self.next_latency())
+        return ChatCompletionResponse.model_validate(response_dict(model, messages, canned_response(messages)))
+
+    async def stream_async(self, model: str, messages: List[Dict[str, Any]]) -> AsyncIterator[str]:
+        self._admit_or_raise()
+        latency = self.next_latency()
+        words = canned_response(messages).split(" ")
+        # Roughly a third of the time goes to the first token, the rest is spread over the stream
+        await asyncio.sleep(latency * 0.3)
+        for i, word in enumerate(words):
+            yield word if i == 0 else " " + word
+            await asyncio.sleep(latency * 0.7 / len(words))
+
+
+class LocalLLMHandler(BaseHTTPRequestHandler):
+    """Serves POST /v1/chat/completions (plain and streaming) from a LocalBackend"""
+
+    backend: LocalBackend = None
+
+    def do_POST(self):
+        if self.path.rstrip("/") != "/v1/chat/completions":
+            self._send_json(404, {"message": "Not found"})
+            return
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        model = body.get("model", "local")
+        messages = body.get("messages", [])
+
+        try:
+            self.backend.admit()
+        except RateLimited:
+            self._send_json(429, {"message": "Requests rate limit exceeded"})
+            return
+
+        latency = self.backend.next_latency()
+        content = canned_response(messages)
+        if not body.get("stream"):
+            time.sleep(latency)
+            self._send_json(200, response_dict(model, messages, content))
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+        completion_id = uuid.uuid4().hex
+        words = content.split(" ")
+        time.sleep(latency * 0.3)
+        for i, word in enumerate(words):
+            chunk = chunk_dict(model, completion_id, word if i == 0 else " " + word)
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            self.wfile.flush()
+            time.sleep(latency * 0.7 / len(words))
+        self.wfile.write(f"data: {json.dumps(chunk_dict(model, completion_id, None, 'stop'))}\n\n".encode())
+        self.wfile.write(b"data: [DONE]\n\n")
+
+    def _send_json(self, status: int, payload: Dict[str, Any]) -> None:
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+
+def serve(host: str, port: int, backend: LocalBackend) -> ThreadingHTTPServer:
+    """Start the stand-in HTTP server in a background thread"""
+    handler = type("BoundLocalLLMHandler", (LocalLLMHandler,), {"backend": backend})
+    server = ThreadingHTTPServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline stand-in for the Mistral chat API. Point the bot at it with MISTRAL_SERVER_URL=http://HOST:PORT")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8088)
+    parser.add_argument("--latency-ms", type=float, default=800, help="median response latency")
+    parser.add_argument("--sigma", type=float, default=0.5, help="log-normal spread of the latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests rejected with 429")
+    parser.add_argument("--rps", type=float, default=0.0, help="requests per second before returning 429 (0 = unlimited)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    server = serve(args.host, args.port, LocalBackend(args.latency_ms, args.sigma, args.error_rate, args.rps, args.seed))
+    print(f"Local LLM stand-in listening on http://{args.host}:{args.port}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
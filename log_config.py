@@ -0,0 +1,139 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Tuple
+
+import tracing
+
+# Longest string argument kept as-is; containers are summarised rather than formatted
+MAX_ARG_LENGTH = 200
+
+_STANDARD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "trace_id"}
+
+
+def redact(value: Any) -> Any:
+    """Bound the cost of formatting one log argument, whatever the size of the object passed in"""
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    if isinstance(value, dict):
+        return f"<dict with {len(value)} keys>"
+    if isinstance(value, (list, tuple, set)):
+        return f"<{type(value).__name__} of {len(value)}>"
+    text = value if isinstance(value, str) else str(value)
+    if len(text) > MAX_ARG_LENGTH:
+        return f"{text[:MAX_ARG_LENGTH]}…(+{len(text) - MAX_ARG_LENGTH} chars)"
+    return text
+
+
+class RedactFilter(logging.Filter):
+    """Summarise large arguments and stamp the current trace id, on the calling thread"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if isinstance(record.args, dict):
+            record.args = {key: redact(value) for key, value in record.args.items()}
+        elif record.args:
+            record.args = tuple(redact(arg) for arg in record.args)
+        record.trace_id = tracing.current_trace_id()
+        return True
+
+
+class SampleFilter(logging.Filter):
+    """Let through at most `limit` records per message template per `interval` seconds below WARNING"""
+
+    def __init__(self, limit: int, interval: float = 60.0):
+        super().__init__()
+        self.limit = limit
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.windows: Dict[Tuple[str, Any], list] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or not self.limit:
+            return True
+        key = (record.name, record.msg)
+        now = time.monotonic()
+        with self.lock:
+            window = self.windows.get(key)
+            if window is None or now - window[0] >= self.interval:
+                if window is not None and window[2]:
+                    record.suppressed = window[2]
+                self.windows[key] = [now, 1, 0]
+                return True
+            if window[1] < self.limit:
+                window[1] += 1
+                return True
+            window[2] += 1
+            return False
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, carrying the trace id and any `extra` fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        if getattr(record, "trace_id", None):
+            entry["trace_id"] = record.trace_id
+        for key, value in vars(record).items():
+            if key not in _STANDARD_ATTRS:
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that leaves message formatting to the listener thread"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Arguments were already bounded by RedactFilter; only render the traceback here
+        # since the exception's frames may not outlive this call
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def setup_logging() -> None:
+    """Route all logging through a queue to a background thread.
+
+    LOG_LEVEL (default INFO), LOG_FORMAT ("json" or "text", default text) and
+    LOG_SAMPLE_LIMIT (records per message template per minute below WARNING,
+    default 60, 0 disables sampling) configure it.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    output = logging.StreamHandler()
+    if os.getenv("LOG_FORMAT", "text") == "json":
+        output.setFormatter(JsonFormatter())
+    else:
+        output.setFormatter(logging.Formatter("%(asctime)s %(levelname)-8s %(name)s: %(message)s"))
+
+    handler = DeferredQueueHandler(queue.SimpleQueue())
+    handler.addFilter(SampleFilter(int(os.getenv("LOG_SAMPLE_LIMIT", "60"))))
+    handler.addFilter(RedactFilter())
+
+    root = logging.getLogger()
+    root.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+    root.addHandler(handler)
+
+    _listener = logging.handlers.QueueListener(handler.queue, output, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
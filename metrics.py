@@ -0,0 +1,158 @@
+import asyncio
+import functools
+import logging
+import os
+import time
+from typing import Any, Callable
+
+from prometheus_client import Counter, Gauge, Histogram, start_http_server
+
+import tracing
+
+# Setup logging
+logger = logging.getLogger("discord")
+
+# Buckets spanning sub-millisecond DB calls to minute-long LLM generations
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 45, 90)
+
+DB_SECONDS = Histogram(
+    "fitness_bot_db_seconds", "Time spent in Database methods", ["operation"], buckets=LATENCY_BUCKETS
+)
+DB_ERRORS = Counter("fitness_bot_db_errors_total", "Database methods that raised", ["operation"])
+
+LLM_SECONDS = Histogram(
+    "fitness_bot_llm_seconds", "Latency of individual LLM requests", ["purpose", "model", "outcome"], buckets=LATENCY_BUCKETS
+)
+LLM_TOKENS = Counter("fitness_bot_llm_tokens_total", "LLM token usage reported by the API", ["purpose", "model", "kind"])
+LLM_TIMEOUTS = Counter("fitness_bot_llm_timeouts_total", "LLM calls that missed their deadline", ["purpose"])
+LLM_HEDGES = Counter("fitness_bot_llm_hedges_total", "LLM requests that were hedged", ["call_type"])
+LLM_HEDGE_WINS = Counter("fitness_bot_llm_hedge_wins_total", "Hedged LLM requests won by the second request", ["call_type"])
+LLM_FALLBACKS = Counter("fitness_bot_llm_fallbacks_total", "LLM attempts that fell back to the next model tier", ["tier"])
+
+DISCORD_SECONDS = Histogram(
+    "fitness_bot_discord_seconds", "Latency of Discord REST calls", ["method", "route"], buckets=LATENCY_BUCKETS
+)
+DISCORD_ERRORS = Counter("fitness_bot_discord_errors_total", "Discord REST calls that raised", ["method", "route"])
+
+MESSAGE_SECONDS = Histogram(
+    "fitness_bot_message_seconds", "End-to-end handling time of messages and commands", ["kind"], buckets=LATENCY_BUCKETS
+)
+REMINDER_LOOP_SECONDS = Histogram(
+    "fitness_bot_reminder_loop_seconds", "Duration of one check_reminders pass", buckets=LATENCY_BUCKETS
+)
+REMINDERS_SENT = Counter("fitness_bot_reminders_sent_total", "Reminder DMs sent")
+REMINDER_FAILURES = Counter("fitness_bot_reminder_failures_total", "Reminder DMs that could not be delivered", ["reason"])
+REMINDER_SEND_SECONDS = Histogram(
+    "fitness_bot_reminder_send_seconds", "Time to deliver one reminder DM, including channel lookup", buckets=LATENCY_BUCKETS
+)
+JOBS = Counter("fitness_bot_jobs_total", "Agent jobs completed through the worker queue", ["kind", "status"])
+JOB_SECONDS = Histogram(
+    "fitness_bot_job_seconds", "Time a worker spent running an agent job", ["kind"], buckets=LATENCY_BUCKETS
+)
+ANSWER_CACHE_LOOKUPS = Counter("fitness_bot_answer_cache_lookups_total", "General questions looked up in the answer cache", ["result"])
+ANSWER_CACHE_ENTRIES = Gauge("fitness_bot_answer_cache_entries", "Answers currently held in the answer cache")
+READY = Gauge("fitness_bot_ready", "1 once startup has finished and the bot is connected to Discord")
+STARTUP_SECONDS = Gauge("fitness_bot_startup_seconds", "Time from process start to ready", ["stage"])
+EVENT_LOOP_LAG = Histogram(
+    "fitness_bot_event_loop_lag_seconds", "How late the event loop runs a scheduled wake-up", buckets=LATENCY_BUCKETS
+)
+
+
+def timed_db(func: Callable) -> Callable:
+    """Decorator recording latency, errors and a trace span for a Database method"""
+    operation = func.__name__
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            with tracing.span(f"db.{operation}"):
+                return func(*args, **kwargs)
+        except Exception:
+            DB_ERRORS.labels(operation).inc()
+            raise
+        finally:
+            DB_SECONDS.labels(operation).observe(time.perf_counter() - started)
+    return wrapper
+
+
+def timed_cursor(func: Callable) -> Callable:
+    """Decorator for a Database method returning a cursor: records the time spent fetching from it.
+
+    find() itself is lazy, so timing the call would only measure building the
+    cursor. The returned iterator adds up the time spent in each fetch (not in
+    the caller's loop body) and records it once the cursor is exhausted or dropped.
+    """
+    operation = func.__name__
+
+    def fetch_all(cursor):
+        iterator = iter(cursor)
+        fetching = 0.0
+        try:
+            while True:
+                started = time.perf_counter()
+                try:
+                    document = next(iterator)
+                except StopIteration:
+                    return
+                except Exception:
+                    DB_ERRORS.labels(operation).inc()
+                    raise
+                finally:
+                    fetching += time.perf_counter() - started
+                yield document
+        finally:
+            DB_SECONDS.labels(operation).observe(fetching)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with tracing.span(f"db.{operation}"):
+            cursor = func(*args, **kwargs)
+        return fetch_all(cursor)
+    return wrapper
+
+
+def observe_llm(purpose: str, model: str, outcome: str, seconds: float, response: Any = None) -> None:
+    """Record one LLM request, including token usage when the response carries it"""
+    LLM_SECONDS.labels(purpose, model, outcome).observe(seconds)
+    usage = getattr(response, "usage", None)
+    if usage is not None:
+        LLM_TOKENS.labels(purpose, model, "prompt").inc(getattr(usage, "prompt_tokens", 0) or 0)
+        LLM_TOKENS.labels(purpose, model, "completion").inc(getattr(usage, "completion_tokens", 0) or 0)
+
+
+def instrument_discord_http(http_client: Any) -> None:
+    """Time and trace every Discord REST call (sends, edits, fetches, typing) made through the bot's HTTP client"""
+    request = http_client.request
+
+    @functools.wraps(request)
+    async def timed_request(route, **kwargs):
+        started = time.perf_counter()
+        try:
+            with tracing.span(f"discord.{route.method}", route=route.path):
+                return await request(route, **kwargs)
+        except Exception:
+            DISCORD_ERRORS.labels(route.method, route.path).inc()
+            raise
+        finally:
+            DISCORD_SECONDS.labels(route.method, route.path).observe(time.perf_counter() - started)
+
+    http_client.request = timed_request
+
+
+async def monitor_event_loop_lag(interval: float = 0.5) -> None:
+    """Sample how late the event loop wakes up a sleeping task, forever"""
+    while True:
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        EVENT_LOOP_LAG.observe(max(0.0, time.perf_counter() - started - interval))
+
+
+def start_metrics_server() -> None:
+    """Serve /metrics on METRICS_ADDR:METRICS_PORT (127.0.0.1:9108 by default; METRICS_PORT=0 disables it)"""
+    port = int(os.getenv("METRICS_PORT", "9108"))
+    if not port:
+        return
+    addr = os.getenv("METRICS_ADDR", "127.0.0.1")
+    start_http_server(port, addr=addr)
+    logger.info("Serving Prometheus metrics on http://%s:%s/metrics", addr, port)
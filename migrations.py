@@ -0,0 +1,198 @@
+import argparse
+import logging
+import os
+import socket
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+from zoneinfo import ZoneInfo
+
+from pymongo import UpdateOne
+
+from database import DEFAULT_TIMEZONE, EXPERIENCE_LEVELS, SCHEMA_VERSION, Database
+from exercises import canonical_name
+from retention import merge_exercise_rollups
+
+# Setup logging
+logger = logging.getLogger("discord")
+
+Update = Dict[str, Dict[str, Any]]
+
+# Long enough for a full scan of a large collection; the lease is released as soon as the run finishes
+MIGRATION_LEASE_TTL = 6 * 3600
+
+
+class Migration(NamedTuple):
+    """One schema step: `transform(user)` returns the $set/$unset needed to bring a user document up to `version`.
+
+    Transforms must be idempotent and only read `fields`, so a document can be
+    re-processed safely and the scan only loads what the migrations need.
+    """
+    version: int
+    name: str
+    fields: tuple
+    transform: Callable[[Dict[str, Any]], Update]
+
+
+def default_timezone(user: Dict[str, Any]) -> Update:
+    try:
+        ZoneInfo(user.get("timezone") or "")
+        return {}
+    except Exception:
+        return {"$set": {"timezone": DEFAULT_TIMEZONE}}
+
+
+def init_progress_log(user: Dict[str, Any]) -> Update:
+    if isinstance(user.get("progress_log"), dict):
+        return {}
+    return {"$set": {"progress_log": {}}}
+
+
+def normalize_experience_level(user: Dict[str, Any]) -> Update:
+    level = user.get("experience_level") or ""
+    normalized = level.strip().lower()
+    if normalized not in EXPERIENCE_LEVELS:
+        # Users who haven't onboarded yet legitimately have no level
+        normalized = "beginner" if user.get("onboarded") else ""
+    return {"$set": {"experience_level": normalized}} if normalized != level else {}
+
+
+def drop_habit_goal(user: Dict[str, Any]) -> Update:
+    # Left over from the habit-tracker days; nothing reads it any more
+    return {"$unset": {"habit_goal": ""}} if "habit_goal" in user else {}
+
+
+def merge_exercise_names(user: Dict[str, Any]) -> Update:
+    # Histories used to be keyed by whatever name the model produced; fold them under the catalog names.
+    # Only the old keys are rewritten: their entries are pushed onto the catalog name and the key unset, so
+    # workouts logged while the migration runs (always under catalog names) are kept. Rollups are only written
+    # by the retention job, which migrate() keeps from running at the same time.
+    update: Update = {}
+    renamed: Dict[str, List[Dict[str, Any]]] = {}
+    for name, entries in (user.get("exercise_history") or {}).items():
+        canonical = canonical_name(name)
+        if canonical != name:
+            renamed.setdefault(canonical, []).extend(entries)
+            update.setdefault("$unset", {})[f"exercise_history.{name}"] = ""
+    for canonical, entries in renamed.items():
+        update.setdefault("$push", {})[f"exercise_history.{canonical}"] = {"$each": entries, "$sort": {"date": 1}}
+
+    rollups = user.get("exercise_rollups") or {}
+    merged: Dict[str, List[Dict[str, Any]]] = {}
+    for name, exercise_rollups in rollups.items():
+        canonical = canonical_name(name)
+        if canonical != name:
+            merged[canonical] = merge_exercise_rollups(merged.get(canonical, rollups.get(canonical, [])), exercise_rollups)
+            update.setdefault("$unset", {})[f"exercise_rollups.{name}"] = ""
+    for canonical, exercise_rollups in merged.items():
+        update.setdefault("$set", {})[f"exercise_rollups.{canonical}"] = exercise_rollups
+    return update
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(1, "default_timezone", ("timezone",), default_timezone),
+    Migration(2, "init_progress_log", ("progress_log",), init_progress_log),
+    Migration(3, "normalize_experience_level", ("experience_level", "onboarded"), normalize_experience_level),
+    Migration(4, "drop_habit_goal", ("habit_goal",), drop_habit_goal),
+    Migration(5, "merge_exercise_names", ("exercise_history", "exercise_rollups"), merge_exercise_names),
+]
+assert MIGRATIONS[-1].version == SCHEMA_VERSION, "Bump database.SCHEMA_VERSION along with MIGRATIONS"
+
+
+def pending_migrations(version: int, target: int) -> List[Migration]:
+    return [migration for migration in MIGRATIONS if version < migration.version <= target]
+
+
+def plan_update(user: Dict[str, Any], target: int) -> Optional[UpdateOne]:
+    """The single write that applies every pending migration to one user, or None if it is current"""
+    version = user.get("schema_version", 0)
+    migrations = pending_migrations(version, target)
+    if not migrations:
+        return None
+    update: Update = {"$set": {"schema_version": target}}
+    for migration in migrations:
+        for operator, fields in migration.transform(user).items():
+            update.setdefault(operator, {}).update(fields)
+    # Guard on the version we read so a concurrent migration run can't apply twice
+    version_filter = {"$in": [0, None]} if version == 0 else version
+    return UpdateOne({"_id": user["_id"], "schema_version": version_filter}, update)
+
+
+def migrate(db: Database, target: int = SCHEMA_VERSION, batch_size: int = 500, dry_run: bool = False) -> Dict[str, int]:
+    """Stream every outdated user through the migrations, writing one bulk_write per batch.
+
+    Memory stays bounded by `batch_size` however large the collection is. Each
+    migration is recorded in the migrations collection once the scan finishes.
+    The bot can keep running, but the retention job can't: migrate() holds its
+    lease and refuses to start while a compaction holds it.
+    """
+    if not dry_run:
+        owner = f"migrations-{socket.gethostname()}-{os.getpid()}"
+        if not db.acquire_lease("retention", owner, MIGRATION_LEASE_TTL):
+            raise RuntimeError("History compaction holds the retention lease; run the migration once it has expired")
+        try:
+            return _migrate(db, target, batch_size, dry_run)
+        finally:
+            db.release_lease("retention", owner)
+    return _migrate(db, target, batch_size, dry_run)
+
+
+def _migrate(db: Database, target: int, batch_size: int, dry_run: bool) -> Dict[str, int]:
+    fields = {"schema_version": 1}
+    for migration in pending_migrations(0, target):
+        fields.update({field: 1 for field in migration.fields})
+    # Older documents may have been created before schema_version existed
+    query = {"$or": [{"schema_version": {"$lt": target}}, {"schema_version": {"$exists": False}}]}
+
+    counts = {"scanned": 0, "updates": 0, "modified": 0, "batches": 0}
+    started = time.monotonic()
+    batch: List[UpdateOne] = []
+
+    def flush():
+        if not batch:
+            return
+        if not dry_run:
+            result = db.users.bulk_write(batch, ordered=False)
+            counts["modified"] += result.modified_count
+        counts["batches"] += 1
+        batch.clear()
+
+    for user in db.users.find(query, fields, batch_size=batch_size):
+        counts["scanned"] += 1
+        update = plan_update(user, target)
+        if update is not None:
+            counts["updates"] += 1
+            batch.append(update)
+        if len(batch) >= batch_size:
+            flush()
+    flush()
+
+    if not dry_run:
+        now = datetime.now(timezone.utc)
+        for migration in pending_migrations(0, target):
+            db.db.migrations.update_one(
+                {"_id": migration.version},
+                {"$set": {"name": migration.name, "applied_at": now}},
+                upsert=True
+            )
+    logger.info("Migrated users to schema version %s in %.1fs: %s", target, time.monotonic() - started, counts)
+    return counts
+
+
+def outdated_users(db: Database, target: int = SCHEMA_VERSION) -> int:
+    """How many user documents still need migrating (for a startup warning)"""
+    return db.users.count_documents({"$or": [{"schema_version": {"$lt": target}}, {"schema_version": {"$exists": False}}]})
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bring every user document up to the current schema version")
+    parser.add_argument("--target", type=int, default=SCHEMA_VERSION, help="schema version to migrate to")
+    parser.add_argument("--batch-size", type=int, default=500, help="documents per cursor batch and per bulk_write")
+    parser.add_argument("--dry-run", action="store_true", help="scan and count, but write nothing")
+    args = parser.parse_args()
+
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO)
+    print(migrate(Database(), args.target, args.batch_size, args.dry_run))
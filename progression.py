@@ -0,0 +1,331 @@
+import re
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from exercises import canonical_name
+from workout_log import parse_performance, planned_count
+
+LB_PER_KG = 2.20462
+
+# Smallest practical weight jump per unit (a pair of the smallest common plates)
+WEIGHT_STEPS = {"lb": 5.0, "kg": 2.5}
+
+# Relative change applied to the working weight on increase/decrease
+INCREASE_FACTOR = 0.05
+DECREASE_FACTOR = 0.10
+
+# A falling estimated 1RM faster than this (% per week) blocks an increase
+MAX_TREND_DROP = -5.0
+
+# Number of most recent sessions the trend is fitted over
+TREND_WINDOW = 12
+
+# Notes we can't judge from numbers alone - these still go to the LLM
+NEEDS_JUDGEMENT = re.compile(
+    r"\b(pain|hurt|hurts|injur\w*|tweak\w*|sharp|dizzy|form|sloppy|cheat\w*|ego)\b",
+    re.IGNORECASE
+)
+
+WEIGHT_PATTERN = re.compile(
+    r"(?P<amount>\d+(?:\.\d+)?)\s*(?P<unit>lbs?|pounds?|#|kgs?|kilos?|kilograms?)?",
+    re.IGNORECASE
+)
+BODYWEIGHT_PATTERN = re.compile(r"\b(bodyweight|body weight|bw)\b", re.IGNORECASE)
+
+
+def parse_weight(value: Any, default_unit: str = "lb") -> Tuple[Optional[float], Optional[str]]:
+    """Parse a weight like "135lb", "60 kg", 135 or "bodyweight".
+
+    Returns (amount, unit) where unit is "lb", "kg" or "bodyweight";
+    (None, None) when no weight can be found.
+    """
+    if value is None:
+        return None, None
+    if isinstance(value, (int, float)):
+        return float(value), default_unit
+    text = str(value)
+    if BODYWEIGHT_PATTERN.search(text):
+        return 0.0, "bodyweight"
+    match = WEIGHT_PATTERN.search(text)
+    if not match:
+        return None, None
+    unit = (match.group("unit") or "").lower()
+    if unit.startswith("k"):
+        unit = "kg"
+    elif unit:
+        unit = "lb"
+    else:
+        unit = default_unit
+    return float(match.group("amount")), unit
+
+
+def to_kg(amount: float, unit: str) -> float:
+    return amount / LB_PER_KG if unit == "lb" else amount
+
+
+def from_kg(amount: float, unit: str) -> float:
+    return amount * LB_PER_KG if unit == "lb" else amount
+
+
+def format_weight(amount: float, unit: str) -> str:
+    if unit == "bodyweight":
+        return "bodyweight"
+    return f"{amount:g}{unit}"
+
+
+def parse_reps(reps: Any) -> Tuple[Optional[int], Optional[int]]:
+    """Parse a planned rep target like 10, "10" or "8-10" into (low, high)"""
+    numbers = [int(n) for n in re.findall(r"\d+", str(reps))]
+    if not numbers:
+        return None, None
+    return numbers[0], numbers[-1]
+
+
+def estimated_1rm(weight_kg: np.ndarray, reps: np.ndarray) -> np.ndarray:
+    """Epley estimate of the one-rep max"""
+    return weight_kg * (1 + reps / 30.0)
+
+
+def history_arrays(history: List[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+    """Turn exercise_history entries into parallel arrays of the sessions we can parse.
+
+    Each entry's "actual" text is parsed for sets/reps/weight; when the user didn't
+    type a weight, the planned weight for that session is used.
+    """
+    days, sets, reps, weights = [], [], [], []
+    for entry in history:
+        performance = parse_performance(str(entry.get("actual", "")))
+        if not performance:
+            continue
+        planned_amount, planned_unit = parse_weight((entry.get("planned") or {}).get("weight"))
+        amount, unit = parse_weight(performance["weight"], default_unit=planned_unit or "lb")
+        if amount is None:
+            amount, unit = planned_amount, planned_unit
+        if amount is None:
+            continue
+        try:
+            day = datetime.strptime(entry["date"], "%Y-%m-%d").toordinal()
+        except (KeyError, TypeError, ValueError):
+            continue
+        days.append(day)
+        sets.append(performance["sets"])
+        reps.append(performance["reps"])
+        weights.append(to_kg(amount, unit) if unit != "bodyweight" else 0.0)
+
+    arrays = {
+        "days": np.asarray(days, dtype=float),
+        "sets": np.asarray(sets, dtype=float),
+        "reps": np.asarray(reps, dtype=float),
+        "weight_kg": np.asarray(weights, dtype=float),
+    }
+    arrays["e1rm_kg"] = estimated_1rm(arrays["weight_kg"], arrays["reps"])
+    arrays["volume_kg"] = arrays["sets"] * arrays["reps"] * arrays["weight_kg"]
+    return arrays
+
+
+def trend(days: np.ndarray, values: np.ndarray) -> float:
+    """Least-squares slope of values over time, in % of the mean per week"""
+    if len(values) < 3 or np.ptp(days) == 0 or values.mean() == 0:
+        return 0.0
+    slope_per_day = np.polyfit(days, values, 1)[0]
+    return float(slope_per_day * 7 / values.mean() * 100)
+
+
+def rollup_best(rollups: Optional[List[Dict[str, Any]]], key: str) -> float:
+    """Largest value of `key` over an exercise's retention rollups (see retention.py), 0 if none"""
+    return max((rollup.get(key) or 0.0 for rollup in rollups or []), default=0.0)
+
+
+def previous_max(history: List[Dict[str, Any]], unit: str = "lb", rollups: Optional[List[Dict[str, Any]]] = None) -> str:
+    """Heaviest weight previously used for an exercise, formatted in the given unit"""
+    arrays = history_arrays(history)
+    best = max(float(arrays["weight_kg"].max()) if len(arrays["weight_kg"]) else 0.0, rollup_best(rollups, "max_weight_kg"))
+    if best == 0:
+        return "none"
+    return format_weight(round(from_kg(best, unit), 1), unit)
+
+
+def next_weight(amount: float, unit: str, evaluation: str) -> float:
+    """Target weight for next session, rounded to the nearest plate step"""
+    step = WEIGHT_STEPS[unit]
+    if evaluation == "increase":
+        target = amount + max(step, amount * INCREASE_FACTOR)
+    elif evaluation == "decrease":
+        target = amount - max(step, amount * DECREASE_FACTOR)
+    else:
+        target = amount
+    return max(step, round(target / step) * step)
+
+
+def evaluate(
+    planned_exercise: Dict[str, Any], actual_performance: str, history: List[Dict[str, Any]]
+) -> Optional[Dict[str, Any]]:
+    """Decide increase/maintain/decrease for one exercise without an LLM.
+
+    Completion is measured against the top of the planned rep range (double
+    progression), scaled down if the user went lighter than planned. An increase
+    is held back to maintain while the estimated 1RM is trending down over the
+    last TREND_WINDOW sessions.
+
+    Returns None when the numbers alone aren't enough to decide - the report
+    can't be parsed, or it mentions pain or form anywhere.
+    """
+    performance = parse_performance(actual_performance)
+    # The whole report is checked, not just the parsed notes, so no parsing slip can hide an injury
+    if not performance or NEEDS_JUDGEMENT.search(actual_performance):
+        return None
+    _, target_reps = parse_reps(planned_exercise.get("reps"))
+    try:
+        target_sets = int(planned_exercise.get("sets"))
+    except (TypeError, ValueError):
+        return None
+    if not target_reps or not target_sets:
+        return None
+
+    planned_amount, planned_unit = parse_weight(planned_exercise.get("weight"))
+    amount, unit = parse_weight(performance["weight"], default_unit=planned_unit or "lb")
+    if amount is None:
+        amount, unit = planned_amount, planned_unit
+
+    completion = (performance["sets"] * performance["reps"]) / (target_sets * target_reps)
+    if amount and planned_amount and unit == planned_unit and amount < planned_amount:
+        completion *= amount / planned_amount
+
+    if completion < 0.7:
+        evaluation = "decrease"
+    elif completion > 0.9:
+        evaluation = "increase"
+    else:
+        evaluation = "maintain"
+
+    arrays = history_arrays(history[-(TREND_WINDOW - 1):] + [{
+        "date": datetime.now().strftime("%Y-%m-%d"),
+        "actual": actual_performance,
+        "planned": planned_exercise
+    }])
+    e1rm_trend = trend(arrays["days"], arrays["e1rm_kg"])
+    if evaluation == "increase" and e1rm_trend < MAX_TREND_DROP:
+        evaluation = "maintain"
+
+    result = {
+        "evaluation": evaluation,
+        "completion": round(completion, 2),
+        "trend": round(e1rm_trend, 1),
+        "estimated_1rm": None,
+        "volume": None,
+        "next_weight": None,
+    }
+    if amount and unit in WEIGHT_STEPS:
+        result["estimated_1rm"] = format_weight(round(float(amount * (1 + performance["reps"] / 30.0)), 1), unit)
+        result["volume"] = format_weight(round(performance["sets"] * performance["reps"] * amount, 1), unit)
+        result["next_weight"] = format_weight(next_weight(amount, unit, evaluation), unit)
+    elif unit == "bodyweight":
+        result["next_weight"] = "bodyweight"
+    return result
+
+
+def history_summary(
+    exercise_history: Dict[str, List[Dict[str, Any]]], unit: str = "lb", rollups: Optional[Dict[str, List[Dict[str, Any]]]] = None
+) -> str:
+    """One compact line per exercise for the workout generator prompt.
+
+    Exercises only present in the rollups (nothing logged within the retention
+    window) still get their all-time best.
+    """
+    rollups = rollups or {}
+    lines = []
+    for name, history in exercise_history.items():
+        arrays = history_arrays(history)
+        if not len(arrays["days"]):
+            continue
+        last = history[-1]
+        _, last_unit = parse_weight((last.get("planned") or {}).get("weight"), default_unit=unit)
+        display_unit = last_unit if last_unit in WEIGHT_STEPS else unit
+        line = f"{name}: last {last.get('actual', '?')} ({last.get('evaluation', 'n/a')})"
+        best_kg = max(float(arrays["e1rm_kg"].max()), rollup_best(rollups.get(name), "best_e1rm_kg"))
+        if best_kg > 0:
+            best = round(from_kg(best_kg, display_unit), 1)
+            line += f", best est. 1RM {format_weight(best, display_unit)}, trend {trend(arrays['days'], arrays['e1rm_kg']):+.1f}%/wk"
+        if last.get("next_weight"):
+            line += f", next target {last['next_weight']}"
+        lines.append(line)
+    for name, exercise_rollups in rollups.items():
+        if exercise_history.get(name) or not exercise_rollups:
+            continue
+        best_kg = rollup_best(exercise_rollups, "best_e1rm_kg")
+        line = f"{name}: not done since {exercise_rollups[-1]['period']}"
+        if best_kg > 0:
+            line += f", best est. 1RM {format_weight(round(from_kg(best_kg, unit), 1), unit)}"
+        lines.append(line)
+    return "\n".join(lines) if lines else "none"
+
+
+def planned_sets(exercises: List[Dict[str, Any]]) -> int:
+    """Total sets in a workout plan; exercises without a numeric set count are skipped"""
+    return sum(planned_count(exercise.get("sets")) or 0 for exercise in exercises)
+
+
+def session_stats(session_results: Dict[str, Any], user_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Headline numbers for a finished workout, computed from the session and prior history.
+
+    A PR is an estimated 1RM above every earlier session of that exercise
+    (entries dated before this session, and the rolled-up best of older ones).
+    """
+    date = session_results.get("date") or datetime.now().strftime("%Y-%m-%d")
+    exercise_history = user_data.get("exercise_history", {})
+    exercise_rollups = user_data.get("exercise_rollups", {})
+
+    unit = "lb"
+    for entry in session_results.get("exercises", []):
+        _, planned_unit = parse_weight((entry.get("planned") or {}).get("weight"))
+        if planned_unit in WEIGHT_STEPS:
+            unit = planned_unit
+            break
+
+    # Sessions record the whole plan's set count, so skipped exercises count against adherence;
+    # older sessions only have the logged exercises to go by
+    sets_planned = session_results.get("sets_planned")
+    if sets_planned is None:
+        sets_planned = planned_sets([entry.get("planned") or {} for entry in session_results.get("exercises", [])])
+
+    exercises, prs = [], []
+    sets_done, total_volume_kg = 0, 0.0
+    for entry in session_results.get("exercises", []):
+        name = entry.get("exercise", "?")
+        planned = entry.get("planned") or {}
+
+        item = {"name": name, "actual": entry.get("actual", ""), "evaluation": entry.get("evaluation", "maintain")}
+        today = history_arrays([{"date": date, "actual": entry.get("actual", ""), "planned": planned}])
+        if len(today["days"]):
+            sets_done += int(today["sets"][0])
+            total_volume_kg += float(today["volume_kg"][0])
+            if today["e1rm_kg"][0] > 0:
+                key = canonical_name(name)
+                earlier = history_arrays([h for h in exercise_history.get(key, []) if h.get("date", "") < date])
+                earlier_best = max(
+                    float(earlier["e1rm_kg"].max()) if len(earlier["days"]) else 0.0,
+                    rollup_best(exercise_rollups.get(key), "best_e1rm_kg")
+                )
+                if (len(earlier["days"]) or exercise_rollups.get(key)) and today["e1rm_kg"][0] > earlier_best:
+                    item["pr"] = format_weight(round(from_kg(float(today["e1rm_kg"][0]), unit)), unit)
+                    prs.append(name)
+        else:
+            performance = parse_performance(str(entry.get("actual", "")))
+            if performance:
+                sets_done += performance["sets"]
+        exercises.append(item)
+
+    progress_today = (user_data.get("progress_log") or {}).get(date) or {}
+    return {
+        "date": date,
+        "status": session_results.get("status", "completed"),
+        "sets_done": sets_done,
+        "sets_planned": sets_planned,
+        "total_volume": format_weight(round(from_kg(total_volume_kg, unit)), unit) if total_volume_kg else None,
+        "prs": prs,
+        "exercises": exercises,
+        "current_streak": user_data.get("current_streak", 0),
+        "checked_in_today": bool(progress_today.get("completed")),
+    }
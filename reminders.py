@@ -0,0 +1,130 @@
+import argparse
+import asyncio
+import collections
+import logging
+import math
+import os
+import secrets
+import socket
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+from zoneinfo import ZoneInfo
+
+from database import DEFAULT_TIMEZONE, Database
+
+# Setup logging
+logger = logging.getLogger("discord")
+
+# A lease outlives two missed passes of the one-minute reminder loop before another replica takes over
+LEASE_TTL = 150
+
+# Reminder texts are written once a day at this UTC hour (the quietest hour for US users by default)
+PREGENERATE_HOUR = int(os.getenv("REMINDER_PREGENERATE_HOUR", "10"))
+PREGENERATE_CONCURRENCY = int(os.getenv("REMINDER_PREGENERATE_CONCURRENCY", "4"))
+
+
+class ReminderDispatcher:
+    """Splits reminder work across bot replicas using leases in MongoDB.
+
+    Users are divided into REMINDER_PARTITIONS partitions by id. Every pass, each
+    replica heartbeats a "replica" lease, works out its fair share of partitions
+    from the number of live replicas, renews the partition leases it already
+    holds up to that share and tries to take free ones. A crashed replica's
+    partitions are picked up once its leases expire. Database.claim_reminder
+    keeps sends exactly-once even while leases change hands.
+    """
+
+    def __init__(self, db: Database, partitions: int = None, lease_ttl: float = LEASE_TTL):
+        self.db = db
+        self.partitions = partitions or int(os.getenv("REMINDER_PARTITIONS", "8"))
+        self.lease_ttl = lease_ttl
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{secrets.token_hex(4)}"
+        self.held: List[int] = []
+
+    def acquire(self) -> List[int]:
+        """Renew and acquire partition leases for this pass; returns the partitions to process"""
+        self.db.acquire_lease(f"replica:{self.owner}", self.owner, self.lease_ttl, kind="replica")
+        replicas = max(1, self.db.count_live_leases("replica"))
+        share = math.ceil(self.partitions / replicas)
+
+        held = []
+        # Start from our own partitions, then the rest from a per-replica offset so replicas don't all race for partition 0
+        offset = int(self.owner.rsplit(":", 1)[1], 16) % self.partitions
+        others = [(offset + i) % self.partitions for i in range(self.partitions)]
+        for partition in self.held + [p for p in others if p not in self.held]:
+            name = f"reminders:{partition}"
+            if len(held) >= share:
+                if partition in self.held:
+                    self.db.release_lease(name, self.owner)
+                continue
+            if self.db.acquire_lease(name, self.owner, self.lease_ttl, kind="reminders"):
+                held.append(partition)
+
+        if held != self.held:
+            logger.info("Reminder partitions for %s: %s of %s (%s live replicas)", self.owner, held, self.partitions, replicas)
+        self.held = held
+        return held
+
+    def release(self) -> None:
+        """Hand back all leases, e.g. on shutdown"""
+        for partition in self.held:
+            self.db.release_lease(f"reminders:{partition}", self.owner)
+        self.db.release_lease(f"replica:{self.owner}", self.owner)
+        self.held = []
+
+
+def next_reminder_date(user_data: Dict[str, Any], now: Optional[datetime] = None) -> str:
+    """The user's local date of their next reminder: today if the reminder time is still ahead, else tomorrow"""
+    try:
+        user_tz = ZoneInfo(user_data.get("timezone") or DEFAULT_TIMEZONE)
+    except Exception:
+        user_tz = ZoneInfo(DEFAULT_TIMEZONE)
+    local_now = (now or datetime.now(user_tz)).astimezone(user_tz)
+    reminder_time = datetime.strptime(user_data.get("reminder_time", "20:00"), "%H:%M").time()
+    date = local_now.date() if local_now.time() < reminder_time else local_now.date() + timedelta(days=1)
+    return date.strftime("%Y-%m-%d")
+
+
+async def pregenerate_reminders(agent, concurrency: int = PREGENERATE_CONCURRENCY) -> Dict[str, int]:
+    """Write each onboarded user's next reminder text ahead of time, at most `concurrency` LLM calls at once.
+
+    Users whose text for their next reminder date already exists are skipped, so
+    the batch can be re-run after a partial failure. Failed users get the
+    template at send time.
+    """
+    counts = collections.Counter()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def generate(user_data):
+        date = next_reminder_date(user_data)
+        if (user_data.get("reminder_message") or {}).get("date") == date:
+            counts["fresh"] += 1
+            return
+        async with semaphore:
+            try:
+                text = await agent.generate_reminder_text(user_data)
+            except Exception as e:
+                counts["failed"] += 1
+                logger.warning("Failed to write reminder text for user %s: %s", user_data["_id"], e)
+                return
+        await asyncio.to_thread(agent.db.update_user_data, user_data["_id"], {"reminder_message": {"date": date, "text": text}})
+        counts["generated"] += 1
+
+    users = await asyncio.to_thread(lambda: list(agent.db.get_reminder_profiles()))
+    await asyncio.gather(*(generate(user_data) for user_data in users))
+    logger.info("Pregenerated reminder texts: %s", dict(counts))
+    return dict(counts)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write every onboarded user's next reminder text now, e.g. from cron")
+    parser.add_argument("--concurrency", type=int, default=PREGENERATE_CONCURRENCY, help="LLM calls in flight at once")
+    args = parser.parse_args()
+
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO)
+    from agent import MistralAgent
+
+    print(asyncio.run(pregenerate_reminders(MistralAgent(), args.concurrency)))
@@ -0,0 +1,129 @@
+import argparse
+import collections
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+import progression
+from database import Database
+
+# Setup logging
+logger = logging.getLogger("discord")
+
+# Raw workout sessions and exercise entries are kept this long, then folded into rollups (0 keeps everything)
+RETENTION_DAYS = int(os.getenv("RETENTION_DAYS", "90"))
+# Compaction runs once a day at this UTC hour, an hour after reminder texts are written
+RETENTION_HOUR = int(os.getenv("RETENTION_HOUR", "11"))
+
+
+def week_of(date: str) -> str:
+    year, week, _ = datetime.strptime(date, "%Y-%m-%d").isocalendar()
+    return f"{year}-W{week:02d}"
+
+
+def month_of(date: str) -> str:
+    return date[:7]
+
+
+def rollup_exercise(entries: List[Dict[str, Any]], rollups: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Fold exercise_history entries into weekly rollups: sessions, volume, best set and verdicts"""
+    by_period = {rollup["period"]: dict(rollup, evaluations=dict(rollup.get("evaluations", {}))) for rollup in rollups}
+    for entry in entries:
+        period = week_of(entry["date"])
+        rollup = by_period.setdefault(period, {
+            "period": period, "sessions": 0, "volume_kg": 0.0, "best_e1rm_kg": 0.0,
+            "max_weight_kg": 0.0, "best_set": None, "evaluations": {}
+        })
+        rollup["sessions"] += 1
+        evaluation = entry.get("evaluation") or "unknown"
+        rollup["evaluations"][evaluation] = rollup["evaluations"].get(evaluation, 0) + 1
+        arrays = progression.history_arrays([entry])
+        if not len(arrays["days"]):
+            continue
+        rollup["volume_kg"] = round(rollup["volume_kg"] + float(arrays["volume_kg"][0]), 1)
+        rollup["max_weight_kg"] = max(rollup["max_weight_kg"], round(float(arrays["weight_kg"][0]), 1))
+        if arrays["e1rm_kg"][0] > rollup["best_e1rm_kg"]:
+            rollup["best_e1rm_kg"] = round(float(arrays["e1rm_kg"][0]), 1)
+            rollup["best_set"] = entry.get("actual")
+    return sorted(by_period.values(), key=lambda rollup: rollup["period"])
+
+
+def merge_exercise_rollups(rollups: List[Dict[str, Any]], other: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Combine two exercises' weekly rollups, e.g. when their histories are merged under one name"""
+    by_period = {rollup["period"]: dict(rollup, evaluations=dict(rollup.get("evaluations", {}))) for rollup in rollups}
+    for rollup in other:
+        merged = by_period.get(rollup["period"])
+        if merged is None:
+            by_period[rollup["period"]] = dict(rollup, evaluations=dict(rollup.get("evaluations", {})))
+            continue
+        merged["sessions"] += rollup["sessions"]
+        merged["volume_kg"] = round(merged["volume_kg"] + rollup["volume_kg"], 1)
+        merged["max_weight_kg"] = max(merged["max_weight_kg"], rollup["max_weight_kg"])
+        if rollup["best_e1rm_kg"] > merged["best_e1rm_kg"]:
+            merged["best_e1rm_kg"], merged["best_set"] = rollup["best_e1rm_kg"], rollup["best_set"]
+        for evaluation, count in rollup.get("evaluations", {}).items():
+            merged["evaluations"][evaluation] = merged["evaluations"].get(evaluation, 0) + count
+    return sorted(by_period.values(), key=lambda rollup: rollup["period"])
+
+
+def rollup_sessions(sessions: List[Dict[str, Any]], rollups: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Fold workout_sessions into monthly adherence rollups: sessions started and completed, sets done vs planned"""
+    by_period = {rollup["period"]: dict(rollup) for rollup in rollups}
+    for session in sessions:
+        period = month_of(session["date"])
+        rollup = by_period.setdefault(period, {"period": period, "sessions": 0, "completed": 0, "sets_done": 0, "sets_planned": 0})
+        stats = progression.session_stats(session, {})
+        rollup["sessions"] += 1
+        rollup["completed"] += stats["status"] == "completed"
+        rollup["sets_done"] += stats["sets_done"]
+        rollup["sets_planned"] += stats["sets_planned"]
+    return sorted(by_period.values(), key=lambda rollup: rollup["period"])
+
+
+def plan_compaction(user: Dict[str, Any], cutoff: str) -> Optional[Tuple[Dict[str, List[Dict[str, Any]]], List[Dict[str, Any]]]]:
+    """New (exercise_rollups, workout_rollups) for the user's entries dated before `cutoff`, or None if there are none"""
+    exercise_rollups = {}
+    for exercise, history in (user.get("exercise_history") or {}).items():
+        old = [entry for entry in history if entry.get("date", cutoff) < cutoff]
+        if old:
+            exercise_rollups[exercise] = rollup_exercise(old, (user.get("exercise_rollups") or {}).get(exercise, []))
+    old_sessions = [session for session in user.get("workout_sessions") or [] if session.get("date", cutoff) < cutoff]
+    if not exercise_rollups and not old_sessions:
+        return None
+    return exercise_rollups, rollup_sessions(old_sessions, user.get("workout_rollups") or [])
+
+
+def compact_history(db: Database, retention_days: int = RETENTION_DAYS, batch_size: int = 100) -> Dict[str, Any]:
+    """Roll up and remove every user's raw history older than `retention_days`, one write per user"""
+    if retention_days <= 0:
+        return {}
+    cutoff = (datetime.now() - timedelta(days=retention_days)).strftime("%Y-%m-%d")
+    counts = collections.Counter()
+    started = time.monotonic()
+    for user in db.get_history_users(batch_size):
+        counts["scanned"] += 1
+        try:
+            plan = plan_compaction(user, cutoff)
+            if plan is None:
+                continue
+            db.compact_history(user["_id"], cutoff, *plan)
+            counts["compacted"] += 1
+        except Exception as e:
+            counts["failed"] += 1
+            logger.error("Failed to compact history for user %s: %s", user["_id"], e)
+    logger.info("Compacted history before %s in %.1fs: %s", cutoff, time.monotonic() - started, dict(counts))
+    return dict(counts)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fold raw workout history older than the retention window into rollups")
+    parser.add_argument("--days", type=int, default=RETENTION_DAYS, help="raw history to keep, in days")
+    args = parser.parse_args()
+
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO)
+    print(compact_history(Database(), args.days))
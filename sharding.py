@@ -0,0 +1,97 @@
+import argparse
+import logging
+import os
+import signal
+import subprocess
+import sys
+from typing import Any, Dict, List, Optional
+
+# Setup logging
+logger = logging.getLogger("discord")
+
+
+def parse_shard_ids(text: str) -> List[int]:
+    """Parse "0-3", "0,2,5" or "0-3,8" into a sorted list of shard ids"""
+    ids = set()
+    for part in text.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        start, _, end = part.partition("-")
+        ids.update(range(int(start), int(end or start) + 1))
+    return sorted(ids)
+
+
+def shard_options() -> Optional[Dict[str, Any]]:
+    """AutoShardedBot keyword arguments from the environment, or None to run unsharded.
+
+    SHARD_COUNT is the total number of shards across all processes and SHARD_IDS the
+    ones this process runs (all of them when unset). BOT_SHARDED=1 alone lets Discord
+    choose the shard count and runs every shard in this process.
+    """
+    count = os.getenv("SHARD_COUNT")
+    ids = os.getenv("SHARD_IDS")
+    if count:
+        options = {"shard_count": int(count)}
+        if ids:
+            options["shard_ids"] = parse_shard_ids(ids)
+        return options
+    if ids:
+        raise ValueError("SHARD_IDS needs SHARD_COUNT")
+    if os.getenv("BOT_SHARDED", "").lower() in ("1", "true", "yes"):
+        return {}
+    return None
+
+
+def split_shards(shard_count: int, processes: int) -> List[List[int]]:
+    """Spread shards as evenly as possible over processes, in contiguous ranges"""
+    base, extra = divmod(shard_count, processes)
+    ranges, start = [], 0
+    for i in range(processes):
+        size = base + (1 if i < extra else 0)
+        ranges.append(list(range(start, start + size)))
+        start += size
+    return [shards for shards in ranges if shards]
+
+
+def launch(shard_count: int, processes: int, metrics_port: int) -> int:
+    """Run one bot.py process per shard range and wait for them; stops them all if any exits"""
+    children = []
+    for i, shards in enumerate(split_shards(shard_count, processes)):
+        env = dict(os.environ)
+        env["SHARD_COUNT"] = str(shard_count)
+        env["SHARD_IDS"] = f"{shards[0]}-{shards[-1]}"
+        # Each process needs its own port; 0 must be passed on explicitly, or every child would take the default
+        env["METRICS_PORT"] = str(metrics_port + i) if metrics_port else "0"
+        logger.info("Starting process %s for shards %s", i, env["SHARD_IDS"])
+        children.append(subprocess.Popen([sys.executable, "bot.py"], env=env, cwd=os.path.dirname(os.path.abspath(__file__))))
+
+    def stop(*_):
+        for child in children:
+            if child.poll() is None:
+                child.terminate()
+
+    signal.signal(signal.SIGTERM, stop)
+    exit_code = 0
+    try:
+        pid, status = os.wait()
+        logger.warning("Process %s exited with status %s, stopping the others", pid, status)
+        exit_code = 1
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop()
+        for child in children:
+            child.wait()
+    return exit_code
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the bot as several processes, each owning a range of shards")
+    parser.add_argument("--shard-count", type=int, required=True, help="total number of shards")
+    parser.add_argument("--processes", type=int, default=os.cpu_count(), help="number of bot processes")
+    parser.add_argument("--metrics-port", type=int, default=9108, help="first process's metrics port; the rest count up (0 disables)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(launch(args.shard_count, args.processes, args.metrics_port))
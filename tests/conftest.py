@@ -0,0 +1,38 @@
+import mongomock
+import pytest
+from pymongo import ReplaceOne
+from pymongo.results import BulkWriteResult
+
+from database import Database
+
+
+def make_db():
+    """A Database on an in-memory mongomock client"""
+    db = Database(client=mongomock.MongoClient())
+    for name in ("users", "conversation_archive"):
+        db.db[name].bulk_write = bulk_write_for(db.db[name])
+    return db
+
+
+@pytest.fixture
+def db():
+    return make_db()
+
+
+@pytest.fixture
+def other_db():
+    """A second, separate database, e.g. to restore a backup into"""
+    return make_db()
+
+
+def bulk_write_for(collection):
+    """mongomock's bulk_write doesn't accept this pymongo's write models, so apply them one at a time"""
+    def bulk_write(requests, ordered=True):
+        bulk_write.calls.append(len(requests))
+        modified = 0
+        for request in requests:
+            write = collection.replace_one if isinstance(request, ReplaceOne) else collection.update_one
+            modified += write(request._filter, request._doc, upsert=request._upsert).modified_count
+        return BulkWriteResult({"nModified": modified}, True)
+    bulk_write.calls = []
+    return bulk_write
@@ -0,0 +1,86 @@
+from types import SimpleNamespace
+
+import pytest
+
+import answer_cache
+from answer_cache import AnswerCache, is_general_question
+
+BENCH_SETS = "How many sets should a beginner do for bench press?"
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = SimpleNamespace(now=1000.0)
+    monkeypatch.setattr(answer_cache, "time", SimpleNamespace(monotonic=lambda: clock.now))
+    return clock
+
+
+@pytest.mark.parametrize("text, expected", [
+    (BENCH_SETS, True),
+    ("what is progressive overload", True),
+    ("Is creatine safe?", True),
+    ("How many sets should I do for my bench press?", False),
+    ("What should I eat today?", False),
+    ("How do I keep my streak going?", False),
+    ("Is 3x10 @ 135lb too heavy?", False),
+    ("Bench press felt great", False),
+    ("What is " + "really " * 40 + "the best split?", False),
+])
+def test_is_general_question(text, expected):
+    assert is_general_question(text) is expected
+
+
+@pytest.mark.parametrize("question, expected", [
+    ("how many sets should a beginner do for bench press", "sets"),
+    ("How many sets should a beginner do on bench press?", "sets"),
+    ("How many reps should a beginner do for bench press?", None),
+    ("What is the best squat stance?", None),
+    ("Is creatine worth it?", None),
+])
+def test_get_needs_a_near_identical_question(clock, question, expected):
+    cache = AnswerCache(capacity=8)
+    cache.put(BENCH_SETS, "sets")
+    cache.put("What is progressive overload?", "overload")
+    cache.put("Is creatine safe?", "creatine")
+    assert cache.get(question) == expected
+
+
+def test_personal_question_never_gets_a_cached_reply(clock):
+    cache = AnswerCache(capacity=8)
+    cache.put(BENCH_SETS, "3 sets of 8-12")
+    personal = "How many sets should I do for my bench press?"
+    # Kept off the cache path, and too far from the cached question even if it got there
+    assert not is_general_question(personal)
+    assert cache.get(personal) is None
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = AnswerCache(capacity=8, ttl=60)
+    cache.put(BENCH_SETS, "sets")
+    clock.now += 59
+    assert cache.get(BENCH_SETS) == "sets"
+    clock.now += 2
+    assert cache.get(BENCH_SETS) is None
+    assert len(cache) == 0
+
+
+def test_least_recently_used_entry_is_evicted(clock):
+    cache = AnswerCache(capacity=2)
+    cache.put(BENCH_SETS, "sets")
+    clock.now += 1
+    cache.put("What is progressive overload?", "overload")
+    clock.now += 1
+    assert cache.get(BENCH_SETS) == "sets"
+    clock.now += 1
+    cache.put("Is creatine safe?", "creatine")
+    assert len(cache) == 2
+    assert cache.get("What is progressive overload?") is None
+    assert cache.get(BENCH_SETS) == "sets"
+    assert cache.get("Is creatine safe?") == "creatine"
+
+
+def test_empty_or_disabled_cache(clock):
+    assert AnswerCache(capacity=8).get(BENCH_SETS) is None
+    disabled = AnswerCache(capacity=0)
+    disabled.put(BENCH_SETS, "sets")
+    assert disabled.get(BENCH_SETS) is None
@@ -0,0 +1,73 @@
+from datetime import datetime, timedelta
+
+import archive
+from database import CHAT_HISTORY_TURNS
+
+
+def turns(*dates):
+    return [{"role": "user" if i % 2 == 0 else "assistant", "content": f"turn {i}", "date": date} for i, date in enumerate(dates)]
+
+
+def test_compress_round_trip():
+    history = turns("2026-01-01", "2026-01-02")
+    assert archive.decompress_turns(archive.compress_turns(history)) == history
+
+
+def test_archive_round_trips_through_load_conversation(db):
+    history = turns(*[f"2026-0{month}-{day:02d}" for month in (1, 2, 3) for day in range(1, 11)])
+    db.users.insert_one({"_id": 1, "conversation_history": history})
+    counts = archive.archive_conversations(db, 30)
+    assert counts == {"turns": 20, "users": 1}
+    assert [block["period"] for block in db.get_conversation_archives(1)] == ["2026-01", "2026-02"]
+    assert archive.load_conversation(db, 1) == history
+    assert archive.load_archived_turns(db, 1, "2026-02") == history[10:20]
+
+
+def test_archive_keeps_the_chat_turns(db):
+    # Everything is old, but the last CHAT_HISTORY_TURNS stay; so do older turns from the same day as the first kept one
+    dates = ["2025-01-01"] * 3 + ["2025-01-02"] * 2 + ["2025-01-03"] * (CHAT_HISTORY_TURNS + 1)
+    history = turns(*dates)
+    db.users.insert_one({"_id": 1, "conversation_history": history})
+    assert archive.archive_user(db, db.users.find_one({"_id": 1}), "2026-01-01") == 5
+    assert db.users.find_one({"_id": 1})["conversation_history"] == history[5:]
+    assert archive.load_conversation(db, 1) == history
+
+
+def test_archive_skips_short_histories(db):
+    history = turns(*["2025-01-01"] * CHAT_HISTORY_TURNS)
+    db.users.insert_one({"_id": 1, "conversation_history": history})
+    assert archive.archive_conversations(db, 30) == {}
+    assert archive.archive_user(db, db.users.find_one({"_id": 1}), "2026-01-01") == 0
+    assert db.users.find_one({"_id": 1})["conversation_history"] == history
+
+
+def test_archive_rerun_after_a_crash_stores_each_turn_once(db):
+    history = turns(*[f"2026-01-{day:02d}" for day in range(1, 21)])
+    db.users.insert_one({"_id": 1, "conversation_history": history})
+    user = db.users.find_one({"_id": 1})
+    assert archive.archive_user(db, user, "2026-02-01") == 10
+    # The trim never happened: the next run sees the same turns again
+    db.users.update_one({"_id": 1}, {"$set": {"conversation_history": history}})
+    assert archive.archive_user(db, db.users.find_one({"_id": 1}), "2026-02-01") == 0
+    [block] = db.get_conversation_archives(1)
+    assert block["turns"] == 10 and block["through"] == "2026-01-10"
+    assert archive.load_conversation(db, 1) == history
+
+
+def test_archive_appends_to_an_existing_block(db):
+    db.users.insert_one({"_id": 1, "conversation_history": turns(*[f"2026-01-{day:02d}" for day in range(1, 21)])})
+    archive.archive_user(db, db.users.find_one({"_id": 1}), "2026-01-05")
+    later = turns(*[f"2026-01-{day:02d}" for day in range(21, 26)])
+    db.users.update_one({"_id": 1}, {"$push": {"conversation_history": {"$each": later}}})
+    assert archive.archive_user(db, db.users.find_one({"_id": 1}), "2026-02-01") == 11
+    [block] = db.get_conversation_archives(1)
+    assert block["turns"] == 15 and block["through"] == "2026-01-15"
+    assert [turn["date"] for turn in archive.load_conversation(db, 1)] == [f"2026-01-{day:02d}" for day in range(1, 26)]
+
+
+def test_archive_conversations_uses_archive_days(db):
+    old = (datetime.now() - timedelta(days=40)).strftime("%Y-%m-%d")
+    recent = datetime.now().strftime("%Y-%m-%d")
+    db.users.insert_one({"_id": 1, "conversation_history": turns(*[old] * 5 + [recent] * CHAT_HISTORY_TURNS)})
+    assert archive.archive_conversations(db, 30) == {"turns": 5, "users": 1}
+    assert archive.archive_conversations(db, 0) == {}
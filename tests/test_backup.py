@@ -0,0 +1,100 @@
+from datetime import datetime
+
+import pytest
+
+import archive
+import backup
+
+
+class Crash(Exception):
+    pass
+
+
+def seed(db, users=5):
+    for user_id in range(1, users + 1):
+        db.users.insert_one({
+            "_id": user_id,
+            "onboarded": True,
+            "created_at": datetime(2026, 1, user_id),
+            "conversation_history": [{"role": "user", "content": "hi", "date": "2026-03-01"}],
+        })
+        db.save_conversation_archive(user_id, "2026-01", archive.compress_turns([{"content": "old", "date": "2026-01-02"}]), 1, "2026-01-02")
+
+
+def snapshot(db):
+    return {name: list(db.db[name].find().sort("_id", 1)) for name in backup.EXPORT_COLLECTIONS}
+
+
+def exported_ids(path):
+    return [(record["collection"], record["document"]["_id"]) for record in backup.read_lines(path)]
+
+
+def crash_on_call(monkeypatch, module, name, call):
+    """Make module.name raise on its `call`-th call, before doing anything"""
+    original = getattr(module, name)
+    calls = []
+
+    def crashing(*args, **kwargs):
+        calls.append(1)
+        if len(calls) == call:
+            raise Crash()
+        return original(*args, **kwargs)
+    monkeypatch.setattr(module, name, crashing)
+
+
+def test_export_import_round_trip(db, other_db, tmp_path):
+    seed(db)
+    path = str(tmp_path / "users.ndjson.gz")
+    assert backup.export_data(db, path, batch_size=2)["users"] == 5
+    target = other_db
+    result = backup.import_data(target, path, batch_size=3)
+    assert result["users"] == 5 and result["conversation_archive"] == 5
+    assert snapshot(target) == snapshot(db)
+    assert archive.load_conversation(target, 3) == archive.load_conversation(db, 3)
+    # Importing again changes nothing
+    backup.import_data(target, path)
+    assert snapshot(target) == snapshot(db)
+
+
+def test_export_only_selected_users(db, tmp_path):
+    seed(db)
+    path = str(tmp_path / "users.ndjson.gz")
+    backup.export_data(db, path, user_ids=[2, 4])
+    assert exported_ids(path) == [("users", 2), ("users", 4), ("conversation_archive", "2:2026-01"), ("conversation_archive", "4:2026-01")]
+
+
+@pytest.mark.parametrize("crash_at", [2, 4, 5])
+def test_resumed_export_neither_duplicates_nor_skips(db, tmp_path, monkeypatch, crash_at):
+    # Checkpoints are written after each batch of 2 and between collections, so the crash lands
+    # after a batch is written but before its checkpoint: mid-users, at the switch, mid-archive
+    seed(db)
+    path = str(tmp_path / "users.ndjson.gz")
+    with monkeypatch.context() as patched:
+        crash_on_call(patched, backup, "write_checkpoint", crash_at)
+        with pytest.raises(Crash):
+            backup.export_data(db, path, batch_size=2)
+    backup.export_data(db, path, batch_size=2, resume=True)
+    ids = exported_ids(path)
+    assert len(ids) == len(set(ids)) == 10
+    assert not (tmp_path / "users.ndjson.gz.checkpoint").exists()
+
+
+def test_resumed_import_neither_duplicates_nor_skips(db, other_db, tmp_path):
+    seed(db)
+    path = str(tmp_path / "users.ndjson.gz")
+    backup.export_data(db, path)
+    target = other_db
+    users = target.users.bulk_write
+
+    def crash_second_batch(requests, ordered=True):
+        if len(users.calls) == 1:
+            raise Crash()
+        return users(requests, ordered)
+    target.users.bulk_write = crash_second_batch
+    with pytest.raises(Crash):
+        backup.import_data(target, path, batch_size=2)
+    target.users.bulk_write = users
+    backup.import_data(target, path, batch_size=2, resume=True)
+    assert users.calls == [2, 2, 1]
+    assert sum(target.conversation_archive.bulk_write.calls) == 5
+    assert snapshot(target) == snapshot(db)
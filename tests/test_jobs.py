@@ -0,0 +1,41 @@
+from datetime import datetime, timedelta, timezone
+
+
+def expire_lease(db, job_id):
+    db.jobs.update_one({"_id": job_id}, {"$set": {"lease_until": datetime.now(timezone.utc) - timedelta(seconds=1)}})
+
+
+def test_claim_job_takes_queued_jobs_once(db):
+    job_id = db.enqueue_job("run", {}, 60)
+    job = db.claim_job("a", 30)
+    assert job["_id"] == job_id and job["attempts"] == 1
+    assert db.claim_job("b", 30) is None
+
+
+def test_claim_job_retakes_an_expired_lease(db):
+    job_id = db.enqueue_job("run", {}, 60)
+    db.claim_job("a", 30)
+    expire_lease(db, job_id)
+    job = db.claim_job("b", 30)
+    assert job["worker"] == "b" and job["attempts"] == 2
+
+
+def test_renew_job_keeps_the_lease(db):
+    job_id = db.enqueue_job("run", {}, 60)
+    db.claim_job("a", 30)
+    expire_lease(db, job_id)
+    db.renew_job(job_id, "a", 30)
+    assert db.claim_job("b", 30) is None
+
+
+def test_claim_job_fails_jobs_out_of_attempts(db):
+    job_id = db.enqueue_job("run", {}, 60)
+    for worker in ("a", "b", "c"):
+        assert db.claim_job(worker, 30)["_id"] == job_id
+        expire_lease(db, job_id)
+    assert db.claim_job("d", 30) is None
+    job = db.jobs.find_one({"_id": job_id})
+    assert job["status"] == "failed"
+    assert job["error"]["type"] == "timeout"
+    assert job["finished_at"] is not None
+    assert db.get_finished_jobs([job_id])[0]["status"] == "failed"
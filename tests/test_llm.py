@@ -0,0 +1,53 @@
+import asyncio
+
+import httpx
+import pytest
+from mistralai.models.sdkerror import SDKError
+
+from llm import LLMCaller, should_fall_back
+
+
+def sdk_error(status: int) -> SDKError:
+    return SDKError(f"API error occurred: Status {status}", raw_response=httpx.Response(status, text=""), body="")
+
+
+@pytest.mark.parametrize("error, expected", [
+    (asyncio.TimeoutError(), True),
+    (httpx.ConnectError("refused"), True),
+    (sdk_error(503), True),
+    (sdk_error(401), False),
+    (sdk_error(422), False),
+    (sdk_error(429), False),
+    (ValueError("bad response"), False),
+])
+def test_should_fall_back(error, expected):
+    assert should_fall_back(error) is expected
+
+
+def route(error: Exception):
+    """Run a small-tier call whose small model fails with `error`; returns the models tried"""
+    models = []
+
+    async def make_request(model):
+        models.append(model)
+        if len(models) == 1:
+            raise error
+        return "ok"
+
+    caller = LLMCaller()
+    try:
+        result = asyncio.run(caller.call("completion_check", make_request))
+    except Exception as e:
+        result = e
+    return models, result
+
+
+def test_server_error_falls_back_to_large_tier():
+    models, result = route(sdk_error(500))
+    assert len(models) == 2 and result == "ok"
+
+
+def test_rate_limit_is_not_retried_on_large_tier():
+    models, result = route(sdk_error(429))
+    assert len(models) == 1
+    assert isinstance(result, SDKError)
@@ -0,0 +1,109 @@
+import pytest
+
+import migrations
+from database import SCHEMA_VERSION
+
+
+def user(_id, **fields):
+    return {"_id": _id, "timezone": "Europe/London", "progress_log": {}, "experience_level": "beginner", "onboarded": True, **fields}
+
+
+def test_plan_update_skips_current_users():
+    assert migrations.plan_update(user(1, schema_version=SCHEMA_VERSION), SCHEMA_VERSION) is None
+
+
+@pytest.mark.parametrize("version, expected", [(0, {"$in": [0, None]}), (3, 3)])
+def test_plan_update_guards_on_the_version_read(version, expected):
+    update = migrations.plan_update(user(1, schema_version=version), SCHEMA_VERSION)
+    assert update._filter == {"_id": 1, "schema_version": expected}
+    assert update._doc["$set"]["schema_version"] == SCHEMA_VERSION
+
+
+def test_plan_update_loses_to_a_concurrent_run(db):
+    db.users.insert_one(user(1, schema_version=3, habit_goal="x"))
+    stale = migrations.plan_update(db.users.find_one({"_id": 1}), SCHEMA_VERSION)
+    db.users.update_one({"_id": 1}, {"$set": {"schema_version": SCHEMA_VERSION, "habit_goal": "kept"}})
+    assert db.users.update_one(stale._filter, stale._doc).modified_count == 0
+    assert db.users.find_one({"_id": 1})["habit_goal"] == "kept"
+
+
+def test_migrate_writes_in_batches(db):
+    db.users.insert_many([user(i) for i in range(5)])
+    counts = migrations.migrate(db, batch_size=2)
+    assert counts == {"scanned": 5, "updates": 5, "modified": 5, "batches": 3}
+    assert db.users.bulk_write.calls == [2, 2, 1]
+    assert db.users.count_documents({"schema_version": SCHEMA_VERSION}) == 5
+
+
+def test_migrate_twice_is_a_no_op(db):
+    db.users.insert_many([user(1, timezone="Nowhere/Town", experience_level=" Advanced"), user(2, habit_goal="x")])
+    migrations.migrate(db)
+    migrated = list(db.users.find())
+    assert migrations.migrate(db) == {"scanned": 0, "updates": 0, "modified": 0, "batches": 0}
+    assert list(db.users.find()) == migrated
+    assert migrated[0]["timezone"] != "Nowhere/Town"
+    assert migrated[0]["experience_level"] == "advanced"
+    assert "habit_goal" not in migrated[1]
+
+
+def test_migrate_resumes_a_partially_migrated_collection(db):
+    db.users.insert_many([
+        user(1, schema_version=SCHEMA_VERSION, habit_goal="kept"),
+        # Already past normalize_experience_level, so only drop_habit_goal and later apply
+        user(2, schema_version=3, experience_level="Unknown", habit_goal="x"),
+        {"_id": 3, "onboarded": False},
+    ])
+    counts = migrations.migrate(db)
+    assert counts["scanned"] == 2 and counts["modified"] == 2
+    assert db.users.find_one({"_id": 1})["habit_goal"] == "kept"
+    second = db.users.find_one({"_id": 2})
+    assert second["experience_level"] == "Unknown" and "habit_goal" not in second
+    third = db.users.find_one({"_id": 3})
+    assert third["schema_version"] == SCHEMA_VERSION
+    assert third["progress_log"] == {} and "experience_level" not in third
+
+
+def test_migrate_refuses_while_compaction_holds_the_lease(db):
+    db.users.insert_one(user(1))
+    db.acquire_lease("retention", "compaction", 3600)
+    with pytest.raises(RuntimeError):
+        migrations.migrate(db)
+    assert migrations.migrate(db, dry_run=True)["updates"] == 1
+    assert "schema_version" not in db.users.find_one({"_id": 1})
+
+
+def rollup(period, sessions, volume, best):
+    return {"period": period, "sessions": sessions, "volume_kg": volume, "max_weight_kg": best,
+            "best_e1rm_kg": best, "best_set": f"1x1 @ {best}kg", "evaluations": {"maintain": sessions}}
+
+
+def test_merge_exercise_names_pushes_old_keys_onto_catalog_names():
+    update = migrations.merge_exercise_names({"exercise_history": {
+        "Flat Bench Press": [{"date": "2026-01-03"}],
+        "Bench Press": [{"date": "2026-01-01"}],
+        "Barbell Bench Press": [{"date": "2026-01-02"}],
+        "Made Up Move": [{"date": "2026-01-01"}],
+    }})
+    assert update["$unset"] == {"exercise_history.Flat Bench Press": "", "exercise_history.Bench Press": ""}
+    assert update["$push"] == {"exercise_history.Barbell Bench Press": {
+        "$each": [{"date": "2026-01-03"}, {"date": "2026-01-01"}], "$sort": {"date": 1}
+    }}
+    assert migrations.merge_exercise_names({"exercise_history": {"Made Up Move": []}}) == {}
+
+
+def test_merge_exercise_names_in_a_migration(db):
+    db.users.insert_one(user(1, schema_version=4, exercise_history={
+        "Flat Bench Press": [{"date": "2026-01-03"}],
+        "Barbell Bench Press": [{"date": "2026-01-02"}],
+    }, exercise_rollups={
+        "Bench Press": [rollup("2025-W01", 1, 100.0, 60.0), rollup("2025-W02", 1, 50.0, 50.0)],
+        "Barbell Bench Press": [rollup("2025-W01", 2, 200.0, 70.0)],
+    }))
+    migrations.migrate(db)
+    migrated = db.users.find_one({"_id": 1})
+    assert migrated["exercise_history"] == {"Barbell Bench Press": [{"date": "2026-01-02"}, {"date": "2026-01-03"}]}
+    merged = migrated["exercise_rollups"]["Barbell Bench Press"]
+    assert list(migrated["exercise_rollups"]) == ["Barbell Bench Press"]
+    assert [r["period"] for r in merged] == ["2025-W01", "2025-W02"]
+    assert merged[0]["sessions"] == 3 and merged[0]["volume_kg"] == 300.0 and merged[0]["best_e1rm_kg"] == 70.0
+    assert merged[0]["evaluations"] == {"maintain": 3}
@@ -0,0 +1,33 @@
+import pytest
+
+import progression
+
+BENCH = {"name": "Barbell Bench Press", "sets": 3, "reps": "8-10", "weight": "135lb"}
+
+
+@pytest.mark.parametrize("report", [
+    "3x10 @135 pain in my shoulder",
+    "3x10 @ 135 hurt my back",
+    "3x10 @135 form broke down",
+    "3x10 @135lb pain in my shoulder",
+    "3x10 @135lb, sharp twinge in the elbow",
+    "pain: 3x10 @135lb",
+    "3x10 @135lb but my form got sloppy",
+])
+def test_pain_or_form_is_left_to_the_llm(report):
+    assert progression.evaluate(BENCH, report, []) is None
+
+
+def test_unparseable_report_is_left_to_the_llm():
+    assert progression.evaluate(BENCH, "did all of it", []) is None
+
+
+def test_clean_report_is_decided_locally():
+    decision = progression.evaluate(BENCH, "3x10 @135 felt strong", [])
+    assert decision["evaluation"] == "increase"
+    assert decision["next_weight"] == "140lb"
+
+
+def test_missed_reps_decrease():
+    decision = progression.evaluate(BENCH, "3x5 @135lb", [])
+    assert decision["evaluation"] == "decrease"
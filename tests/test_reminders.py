@@ -0,0 +1,23 @@
+import pytest
+
+
+def test_claim_reminder_once_per_day(db):
+    db.users.insert_one({"_id": 1, "last_reminder_sent": "2026-07-01"})
+    assert db.claim_reminder(1, "2026-07-02")
+    assert not db.claim_reminder(1, "2026-07-02")
+
+
+@pytest.mark.parametrize("previous", ["2026-07-01", None])
+def test_release_reminder_restores_previous(db, previous):
+    db.users.insert_one({"_id": 1, **({"last_reminder_sent": previous} if previous else {})})
+    assert db.claim_reminder(1, "2026-07-02")
+    db.release_reminder(1, "2026-07-02", previous)
+    assert db.users.find_one({"_id": 1}).get("last_reminder_sent") == previous
+    # Released, so the next check can claim it again
+    assert db.claim_reminder(1, "2026-07-02")
+
+
+def test_release_reminder_keeps_a_later_claim(db):
+    db.users.insert_one({"_id": 1, "last_reminder_sent": "2026-07-03"})
+    db.release_reminder(1, "2026-07-02", "2026-07-01")
+    assert db.users.find_one({"_id": 1})["last_reminder_sent"] == "2026-07-03"
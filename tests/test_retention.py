@@ -0,0 +1,65 @@
+from datetime import datetime, timedelta
+
+import retention
+
+
+def days_ago(days):
+    return (datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d")
+
+
+def history_user(_id=1, onboarded=True):
+    return {
+        "_id": _id,
+        "onboarded": onboarded,
+        "exercise_history": {"Barbell Bench Press": [
+            {"date": days_ago(91), "actual": "3x10 @ 100kg", "evaluation": "increase"},
+            {"date": days_ago(90), "actual": "3x10 @ 100kg", "evaluation": "maintain"},
+            {"date": days_ago(0), "actual": "3x8 @ 105kg", "evaluation": "maintain"},
+        ]},
+        "workout_sessions": [
+            {"date": days_ago(91), "exercises": []},
+            {"date": days_ago(90), "exercises": []},
+        ],
+    }
+
+
+def test_compact_history_folds_entries_before_the_cutoff(db):
+    db.users.insert_one(history_user())
+    assert retention.compact_history(db, 90) == {"scanned": 1, "compacted": 1}
+    user = db.users.find_one({"_id": 1})
+    # The entry dated on the cutoff itself is kept raw
+    assert [entry["date"] for entry in user["exercise_history"]["Barbell Bench Press"]] == [days_ago(90), days_ago(0)]
+    assert [session["date"] for session in user["workout_sessions"]] == [days_ago(90)]
+    [rollup] = user["exercise_rollups"]["Barbell Bench Press"]
+    assert rollup["period"] == retention.week_of(days_ago(91))
+    assert rollup["sessions"] == 1 and rollup["volume_kg"] == 3000.0 and rollup["evaluations"] == {"increase": 1}
+    assert [(rollup["period"], rollup["sessions"]) for rollup in user["workout_rollups"]] == [(days_ago(91)[:7], 1)]
+
+
+def test_compact_history_twice_does_not_count_twice(db):
+    db.users.insert_one(history_user())
+    retention.compact_history(db, 90)
+    compacted = db.users.find_one({"_id": 1})
+    assert retention.compact_history(db, 90) == {"scanned": 1}
+    assert db.users.find_one({"_id": 1}) == compacted
+
+
+def test_compact_history_adds_to_existing_rollups():
+    user = history_user()
+    period = retention.week_of(days_ago(91))
+    user["exercise_rollups"] = {"Barbell Bench Press": [retention.rollup_exercise(user["exercise_history"]["Barbell Bench Press"][:1], [])[0]]}
+    exercise_rollups, _ = retention.plan_compaction(user, days_ago(90))
+    [rollup] = exercise_rollups["Barbell Bench Press"]
+    assert rollup["period"] == period and rollup["sessions"] == 2 and rollup["volume_kg"] == 6000.0
+
+
+def test_compact_history_skips_recent_and_non_onboarded_users(db):
+    db.users.insert_many([history_user(1, onboarded=False), {"_id": 2, "onboarded": True, "workout_sessions": [{"date": days_ago(0)}]}])
+    assert retention.compact_history(db, 90) == {"scanned": 1}
+    assert db.users.find_one({"_id": 1}) == history_user(1, onboarded=False)
+
+
+def test_compact_history_disabled(db):
+    db.users.insert_one(history_user())
+    assert retention.compact_history(db, 0) == {}
+    assert db.users.find_one({"_id": 1}) == history_user()
@@ -0,0 +1,112 @@
+from datetime import datetime, timezone
+
+import pytest
+
+import timezones
+
+SUMMER = datetime(2026, 7, 1, 12, 0, tzinfo=timezone.utc)
+WINTER = datetime(2026, 1, 15, 12, 0, tzinfo=timezone.utc)
+
+
+@pytest.mark.parametrize("text, zone", [
+    ("EST", "America/New_York"),
+    ("EAT", "Africa/Nairobi"),
+    ("new york", "America/New_York"),
+    ("sydney", "Australia/Sydney"),
+    ("Asia/Tokyo", "Asia/Tokyo"),
+    ("UTC+5:30", "Asia/Kolkata"),
+    ("londn", "Europe/London"),
+])
+def test_resolve(text, zone):
+    assert timezones.resolve(text, SUMMER) == zone
+
+
+@pytest.mark.parametrize("text, zone", [
+    ("UTC+1", "Etc/GMT-1"),
+    ("UTC-3", "Etc/GMT+3"),
+    ("GMT-5", "Etc/GMT+5"),
+    ("UTC-12", "Etc/GMT+12"),
+    ("UTC+14", "Etc/GMT-14"),
+    ("UTC+0", "UTC"),
+    ("UTC+5:30", "Asia/Kolkata"),
+    ("UTC+5:45", "Asia/Kathmandu"),
+    ("UTC+9:30", "Australia/Darwin"),
+    ("UTC+15", None),
+])
+@pytest.mark.parametrize("now", [SUMMER, WINTER])
+def test_offsets_resolve_to_zones_without_daylight_saving(text, zone, now):
+    assert timezones.resolve(text, now) == zone
+
+
+def test_offset_only_daylight_saving_zones_have():
+    assert timezones.resolve("UTC-3:30", WINTER) == "America/St_Johns"
+
+
+@pytest.mark.parametrize("zone, description", [
+    ("Etc/GMT-5", "UTC+5 (fixed offset, no daylight saving)"),
+    ("Etc/GMT+12", "UTC-12 (fixed offset, no daylight saving)"),
+    ("Australia/Sydney", "Sydney (AEST/AEDT, Australian Eastern Time Zone)"),
+])
+def test_describe(zone, description):
+    assert timezones.describe(zone) == description
+
+
+@pytest.mark.parametrize("message, zone", [
+    ("Check in at 8pm EST please", "America/New_York"),
+    ("18:00 works, I'm on UTC+5:30", "Asia/Kolkata"),
+])
+def test_explicit_timezone(message, zone):
+    assert timezones.explicit_timezone(message, SUMMER) == zone
+
+
+@pytest.mark.parametrize("message", [
+    "I train at the fitness center around 7pm",
+    "I want to act on my goals, 8pm",
+    "victoria here",
+    "it gets wet outside",
+    "I do PT twice a week",
+    "I want to EAT healthier, 8pm works",
+    "WEST side gym at 6am",
+    "9pm, I live in new york",
+])
+def test_no_explicit_timezone_in_ordinary_words(message):
+    assert timezones.explicit_timezone(message, SUMMER) is None
+
+
+@pytest.mark.parametrize("message", [
+    "I train at the fitness center around 7pm",
+    "I want to act on my goals, 8pm",
+    "victoria here",
+    "it gets wet outside",
+    "I do PT twice a week",
+    "I want to EAT healthier, 8pm works",
+])
+def test_no_timezone_hint_from_ordinary_words(message):
+    assert timezones.find_timezone(message, SUMMER) is None
+
+
+@pytest.mark.parametrize("message, zone", [
+    ("9pm, I live in new york", "America/New_York"),
+    ("I live in Jersey City", "America/New_York"),
+    ("6 in the morning, Sydney", "Australia/Sydney"),
+])
+def test_timezone_hint_from_place_names(message, zone):
+    assert timezones.find_timezone(message, SUMMER) == zone
+
+
+@pytest.mark.parametrize("message, time", [
+    ("Check in at 8pm EST please", "20:00"),
+    ("8:30 in the evening", "20:30"),
+    ("UTC+5:30 at 18:00", "18:00"),
+    ("8pm, so 20:00", "20:00"),
+    ("I am 180cm, 80kg", None),
+    ("I train from 6 am to 8 am, check in at 9pm", None),
+    ("7 in the morning or 18:30", None),
+])
+def test_find_time(message, time):
+    assert timezones.find_time(message) == time
+
+
+def test_find_times():
+    assert timezones.find_times("I train from 6 am to 8 am, check in at 9pm") == ["06:00", "08:00", "21:00"]
+    assert timezones.find_times("8:30 in the evening, not 20:30 pm") == ["20:30", "20:30"]
@@ -0,0 +1,59 @@
+import pytest
+
+from workout_log import basic_verdict, parse_performance, parse_workout_log
+
+PLAN = [
+    {"name": "Barbell Back Squat", "sets": 3, "reps": "8-10", "weight": "185lb"},
+    {"name": "Barbell Bench Press", "sets": 3, "reps": "10", "weight": "135lb"},
+    {"name": "Plank", "sets": 3, "reps": "30s", "weight": "bodyweight"},
+]
+
+
+@pytest.mark.parametrize("text, weight, notes", [
+    ("3x10 @135lb", "135lb", ""),
+    ("3 x 10 @ 20 kg felt easy", "20 kg", "felt easy"),
+    ("3x10 @135# good", "135#", "good"),
+    ("3x8 @ 100 pounds", "100 pounds", ""),
+    ("3x10 @bw", "bw", ""),
+    ("3x10", None, ""),
+    # A unitless weight must not swallow the next word
+    ("3x10 @135 feeling tired", "135", "feeling tired"),
+    ("3x10 @135 pain in my shoulder", "135", "pain in my shoulder"),
+    ("3x10 @ 135 hurt my back", "135", "hurt my back"),
+    ("3x10 @100 lbsx", "100", "lbsx"),
+])
+def test_parse_performance(text, weight, notes):
+    performance = parse_performance(text)
+    assert performance["sets"] == 3
+    assert performance["weight"] == weight
+    assert performance["notes"] == notes
+
+
+def test_parse_performance_without_sets_and_reps():
+    assert parse_performance("did my squats") is None
+
+
+def test_parse_workout_log_by_name_and_number():
+    logged = parse_workout_log("Squat: 3x8 @185lb\n- bench 3x10 @135 shoulder felt off\n\n3. 3x1 @bw", PLAN)
+    assert set(logged) == {"Barbell Back Squat", "Barbell Bench Press", "Plank"}
+    assert logged["Barbell Back Squat"]["weight"] == "185lb"
+    assert logged["Barbell Bench Press"]["weight"] == "135"
+    assert logged["Barbell Bench Press"]["notes"] == "shoulder felt off"
+
+
+def test_parse_workout_log_skips_unknown_lines():
+    assert parse_workout_log("warmed up for a while\nDeadlift 3x5 @225lb", PLAN) == {}
+
+
+@pytest.mark.parametrize("report, planned, verdict", [
+    ("3x10 @135lb", PLAN[1], "increase"),
+    ("3x7 @135lb", PLAN[1], "maintain"),
+    ("2x6 @135lb", PLAN[1], "decrease"),
+    ("3x8 @185lb", PLAN[0], "increase"),
+    # Targets that aren't counts can't be judged from sets x reps
+    ("3x1 @bw", PLAN[2], "maintain"),
+    ("3x10", {"name": "Push-ups", "sets": 3, "reps": "AMRAP"}, "maintain"),
+    ("3x10", {"name": "Lunge", "sets": 3, "reps": "8-12 each side"}, "increase"),
+])
+def test_basic_verdict(report, planned, verdict):
+    assert basic_verdict(parse_performance(report), planned) == verdict
@@ -0,0 +1,402 @@
+import difflib
+import os
+import re
+from datetime import date, datetime, timezone
+from functools import lru_cache
+from importlib import resources
+from typing import Dict, FrozenSet, List, Optional, Tuple
+from zoneinfo import TZPATH, ZoneInfo, available_timezones
+
+# Abbreviations people actually type. Ambiguous ones go to the North American /
+# British reading, which is what our users mean: CST is Chicago, not Shanghai, and
+# BST is British Summer Time, not Bangladesh.
+ABBREVIATIONS: Dict[str, str] = {
+    # North America
+    "PST": "America/Los_Angeles", "PDT": "America/Los_Angeles", "PT": "America/Los_Angeles",
+    "MST": "America/Denver", "MDT": "America/Denver", "MT": "America/Denver",
+    "CST": "America/Chicago", "CDT": "America/Chicago", "CT": "America/Chicago",
+    "EST": "America/New_York", "EDT": "America/New_York", "ET": "America/New_York",
+    "AST": "America/Halifax", "ADT": "America/Halifax",
+    "NST": "America/St_Johns", "NDT": "America/St_Johns",
+    "AKST": "America/Anchorage", "AKDT": "America/Anchorage",
+    "HST": "Pacific/Honolulu",
+    # Europe
+    "GMT": "UTC", "UTC": "UTC", "Z": "UTC",
+    "WET": "Europe/Lisbon", "WEST": "Europe/Lisbon", "BST": "Europe/London",
+    "CET": "Europe/Paris", "CEST": "Europe/Paris",
+    "EET": "Europe/Helsinki", "EEST": "Europe/Helsinki",
+    "MSK": "Europe/Moscow", "TRT": "Europe/Istanbul",
+    # Asia
+    "IST": "Asia/Kolkata", "GST": "Asia/Dubai", "PKT": "Asia/Karachi", "ICT": "Asia/Bangkok",
+    "SGT": "Asia/Singapore", "HKT": "Asia/Hong_Kong", "JST": "Asia/Tokyo", "KST": "Asia/Seoul",
+    "IRST": "Asia/Tehran", "IRDT": "Asia/Tehran",
+    # Australia / Pacific
+    "AWST": "Australia/Perth", "ACST": "Australia/Adelaide", "ACDT": "Australia/Adelaide",
+    "AEST": "Australia/Sydney", "AEDT": "Australia/Sydney",
+    "NZST": "Pacific/Auckland", "NZDT": "Pacific/Auckland",
+    "CHST": "Pacific/Guam", "SST": "Pacific/Pago_Pago",
+    # South America
+    "ART": "America/Argentina/Buenos_Aires", "BRT": "America/Sao_Paulo", "BRST": "America/Sao_Paulo",
+    "CLT": "America/Santiago", "CLST": "America/Santiago",
+    # Africa
+    "WAT": "Africa/Lagos", "CAT": "Africa/Maputo", "EAT": "Africa/Nairobi", "SAST": "Africa/Johannesburg",
+}
+
+# Abbreviations that are also English words, typed in capitals for emphasis ("I want to EAT better")
+WORD_ABBREVIATIONS = frozenset({"ART", "CAT", "EAT", "WAT", "WET", "WEST", "AST", "SST", "GST"})
+# Never read out of a sentence, only from `!timezone`: those words, and ones too short or too overloaded
+# ("PT" is physical therapy, "CT" a scan)
+SENTENCE_EXCLUDED = WORD_ABBREVIATIONS | frozenset({"PT", "MT", "CT", "ET", "Z"})
+
+# Places and descriptions that aren't the city in a zone's name
+ALIASES: Dict[str, str] = {
+    "pacific": "America/Los_Angeles", "pacific time": "America/Los_Angeles", "west coast": "America/Los_Angeles",
+    "la": "America/Los_Angeles", "sf": "America/Los_Angeles", "san francisco": "America/Los_Angeles",
+    "seattle": "America/Los_Angeles", "portland": "America/Los_Angeles", "san diego": "America/Los_Angeles",
+    "mountain": "America/Denver", "mountain time": "America/Denver", "salt lake city": "America/Denver",
+    "central": "America/Chicago", "central time": "America/Chicago", "dallas": "America/Chicago",
+    "houston": "America/Chicago", "austin": "America/Chicago", "minneapolis": "America/Chicago",
+    "eastern": "America/New_York", "eastern time": "America/New_York", "east coast": "America/New_York",
+    "nyc": "America/New_York", "boston": "America/New_York", "washington": "America/New_York",
+    "dc": "America/New_York", "philadelphia": "America/New_York", "miami": "America/New_York",
+    "atlanta": "America/New_York", "montreal": "America/Toronto", "ottawa": "America/Toronto",
+    "calgary": "America/Edmonton", "hawaii": "Pacific/Honolulu", "alaska": "America/Anchorage",
+    "uk": "Europe/London", "england": "Europe/London", "manchester": "Europe/London", "edinburgh": "Europe/London",
+    "ireland": "Europe/Dublin", "france": "Europe/Paris", "germany": "Europe/Berlin", "munich": "Europe/Berlin",
+    "spain": "Europe/Madrid", "barcelona": "Europe/Madrid", "italy": "Europe/Rome", "milan": "Europe/Rome",
+    "netherlands": "Europe/Amsterdam", "india": "Asia/Kolkata", "mumbai": "Asia/Kolkata", "delhi": "Asia/Kolkata",
+    "new delhi": "Asia/Kolkata", "bangalore": "Asia/Kolkata", "bengaluru": "Asia/Kolkata", "chennai": "Asia/Kolkata",
+    "hyderabad": "Asia/Kolkata", "china": "Asia/Shanghai", "beijing": "Asia/Shanghai", "japan": "Asia/Tokyo",
+    "korea": "Asia/Seoul", "philippines": "Asia/Manila", "vietnam": "Asia/Ho_Chi_Minh", "uae": "Asia/Dubai",
+    "abu dhabi": "Asia/Dubai", "istanbul": "Europe/Istanbul", "nicosia": "Asia/Nicosia",
+    "canberra": "Australia/Sydney", "new zealand": "Pacific/Auckland", "wellington": "Pacific/Auckland",
+    "brazil": "America/Sao_Paulo", "rio": "America/Sao_Paulo", "rio de janeiro": "America/Sao_Paulo",
+    "buenos aires": "America/Argentina/Buenos_Aires", "argentina": "America/Argentina/Buenos_Aires",
+    "indianapolis": "America/Indiana/Indianapolis", "louisville": "America/Kentucky/Louisville",
+    "new jersey": "America/New_York", "jersey city": "America/New_York",
+    "utc": "UTC", "gmt": "UTC", "zulu": "UTC",
+}
+
+# Zone names whose city is also an everyday word or another place's name; never matched inside a sentence
+AMBIGUOUS_CITIES = frozenset({
+    "wake", "midway", "easter", "christmas", "casey", "davis", "palmer", "troll", "central", "eastern", "mountain",
+    "pacific", "west", "east", "north", "south", "general", "universal", "johnston", "faroe", "reunion", "la", "dc",
+    "rio", "mahe", "yap", "truk", "norfolk", "chatham", "cocos", "act", "victoria", "virgin", "jersey", "center",
+    "guernsey", "man", "st helena", "canary", "madeira", "bermuda", "noronha", "santiago",
+})
+
+REGIONS = ("Africa", "America", "Asia", "Atlantic", "Australia", "Europe", "Indian", "Pacific")
+
+# Zones preferred when several share a UTC offset, most populous first
+PREFERRED_ZONES = [
+    "UTC", "America/Los_Angeles", "America/Denver", "America/Phoenix", "America/Chicago", "America/New_York",
+    "America/Halifax", "America/St_Johns", "America/Anchorage", "Pacific/Honolulu", "America/Sao_Paulo",
+    "America/Argentina/Buenos_Aires", "Europe/London", "Europe/Paris", "Europe/Helsinki", "Europe/Moscow",
+    "Asia/Dubai", "Asia/Tehran", "Asia/Kabul", "Asia/Karachi", "Asia/Kolkata", "Asia/Kathmandu", "Asia/Dhaka",
+    "Asia/Yangon", "Asia/Bangkok", "Asia/Shanghai", "Asia/Singapore", "Australia/Perth", "Australia/Eucla",
+    "Asia/Tokyo", "Australia/Darwin", "Australia/Adelaide", "Australia/Brisbane", "Australia/Sydney",
+    "Australia/Lord_Howe", "Pacific/Noumea", "Pacific/Auckland", "Pacific/Fiji", "Pacific/Tongatapu",
+    "Pacific/Kiritimati", "Pacific/Marquesas", "Pacific/Pago_Pago", "Atlantic/Azores", "Atlantic/Cape_Verde",
+    "Atlantic/South_Georgia", "Africa/Lagos", "Africa/Cairo", "Africa/Johannesburg", "Africa/Nairobi",
+]
+
+# Display names for the zones people pick most
+ZONE_NAMES: Dict[str, Tuple[str, str]] = {
+    # North America
+    "America/Los_Angeles": ("PST/PDT", "Pacific Time Zone"),
+    "America/Denver": ("MST/MDT", "Mountain Time Zone"),
+    "America/Phoenix": ("MST", "Mountain Time Zone (no DST)"),
+    "America/Chicago": ("CST/CDT", "Central Time Zone"),
+    "America/New_York": ("EST/EDT", "Eastern Time Zone"),
+    "America/Halifax": ("AST/ADT", "Atlantic Time Zone"),
+    "America/St_Johns": ("NST/NDT", "Newfoundland Time Zone"),
+    "America/Anchorage": ("AKST/AKDT", "Alaska Time Zone"),
+    "Pacific/Honolulu": ("HST", "Hawaii Time Zone"),
+    "America/Tijuana": ("PST/PDT", "Pacific Time Zone"),
+    "America/Vancouver": ("PST/PDT", "Pacific Time Zone"),
+    "America/Edmonton": ("MST/MDT", "Mountain Time Zone"),
+    "America/Regina": ("CST", "Central Time Zone (no DST)"),
+    "America/Mexico_City": ("CST/CDT", "Central Time Zone"),
+    "America/Toronto": ("EST/EDT", "Eastern Time Zone"),
+    "America/Puerto_Rico": ("AST", "Atlantic Time Zone (no DST)"),
+
+    # Europe
+    "UTC": ("UTC/GMT", "Coordinated Universal Time"),
+    "Europe/London": ("GMT/BST", "British Time Zone"),
+    "Europe/Paris": ("CET/CEST", "Central European Time Zone"),
+    "Europe/Berlin": ("CET/CEST", "Central European Time Zone"),
+    "Europe/Helsinki": ("EET/EEST", "Eastern European Time Zone"),
+    "Europe/Kiev": ("EET/EEST", "Eastern European Time Zone"),
+    "Europe/Moscow": ("MSK", "Moscow Time Zone"),
+
+    # Asia
+    "Asia/Dubai": ("GST", "Gulf Standard Time"),
+    "Asia/Baghdad": ("AST", "Arabia Standard Time"),
+    "Asia/Tehran": ("IRST/IRDT", "Iran Time Zone"),
+    "Asia/Kabul": ("AFT", "Afghanistan Time Zone"),
+    "Asia/Karachi": ("PKT", "Pakistan Time Zone"),
+    "Asia/Tashkent": ("UZT", "Uzbekistan Time Zone"),
+    "Asia/Kolkata": ("IST", "India Time Zone"),
+    "Asia/Colombo": ("IST", "India Time Zone"),
+    "Asia/Kathmandu": ("NPT", "Nepal Time Zone"),
+    "Asia/Dhaka": ("BST", "Bangladesh Time Zone"),
+    "Asia/Yangon": ("MMT", "Myanmar Time Zone"),
+    "Asia/Bangkok": ("ICT", "Indochina Time Zone"),
+    "Asia/Ho_Chi_Minh": ("ICT", "Indochina Time Zone"),
+    "Asia/Singapore": ("SGT", "Singapore Time Zone"),
+    "Asia/Shanghai": ("CST", "China Time Zone"),
+    "Asia/Hong_Kong": ("HKT", "Hong Kong Time Zone"),
+    "Asia/Tokyo": ("JST", "Japan Time Zone"),
+    "Asia/Seoul": ("KST", "Korea Time Zone"),
+
+    # Australia/Pacific
+    "Australia/Perth": ("AWST", "Australian Western Time Zone"),
+    "Australia/Darwin": ("ACST", "Australian Central Time Zone (no DST)"),
+    "Australia/Adelaide": ("ACST/ACDT", "Australian Central Time Zone"),
+    "Australia/Sydney": ("AEST/AEDT", "Australian Eastern Time Zone"),
+    "Australia/Melbourne": ("AEST/AEDT", "Australian Eastern Time Zone"),
+    "Australia/Brisbane": ("AEST", "Australian Eastern Time Zone (no DST)"),
+    "Pacific/Auckland": ("NZST/NZDT", "New Zealand Time Zone"),
+    "Pacific/Fiji": ("FJT/FJST", "Fiji Time Zone"),
+    "Pacific/Guam": ("ChST", "Chamorro Time Zone"),
+    "Pacific/Samoa": ("SST", "Samoa Time Zone"),
+
+    # South America
+    "America/Argentina/Buenos_Aires": ("ART", "Argentina Time Zone"),
+    "America/Sao_Paulo": ("BRT/BRST", "Brasilia Time Zone"),
+    "America/Santiago": ("CLT/CLST", "Chile Time Zone"),
+
+    # Africa
+    "Africa/Lagos": ("WAT", "West Africa Time Zone"),
+    "Africa/Cairo": ("EET", "Eastern European Time Zone"),
+    "Africa/Maputo": ("CAT", "Central Africa Time Zone"),
+    "Africa/Nairobi": ("EAT", "East Africa Time Zone"),
+    "Africa/Johannesburg": ("SAST", "South Africa Time Zone"),
+
+    # Middle East
+    "Europe/Istanbul": ("TRT", "Turkey Time Zone"),
+    "Asia/Baku": ("AZT", "Azerbaijan Time Zone"),
+
+    # Pacific Islands
+    "Pacific/Wake": ("WAKT", "Wake Island Time Zone"),
+    "Pacific/Pago_Pago": ("SST", "Samoa Time Zone"),
+    "Pacific/Marquesas": ("MART", "Marquesas Time Zone"),
+    "Pacific/Noumea": ("NCT", "New Caledonia Time Zone"),
+    "Pacific/Guadalcanal": ("SBT", "Solomon Islands Time Zone"),
+    "Pacific/Apia": ("WST/WSDT", "West Samoa Time Zone"),
+    "Pacific/Tongatapu": ("TOT", "Tonga Time Zone"),
+    "Pacific/Kiritimati": ("LINT", "Line Islands Time Zone"),
+}
+
+OFFSET_PATTERN = re.compile(r"\b(?:utc|gmt)\s*(?P<sign>[+-])\s*(?P<hours>\d{1,2})(?::?(?P<minutes>\d{2}))?\b", re.IGNORECASE)
+TIME_PATTERNS = [
+    re.compile(r"\b(?P<hour>\d{1,2})(?::(?P<minute>[0-5]\d))?\s*(?P<meridiem>a\.?m\.?|p\.?m\.?)(?!\w)", re.IGNORECASE),
+    re.compile(r"\b(?P<hour>\d{1,2})(?::(?P<minute>[0-5]\d))?\s*(?:o'?clock\s*)?(?P<part>in the morning|in the afternoon|in the evening|at night|tonight)\b", re.IGNORECASE),
+    re.compile(r"\b(?P<hour>[01]?\d|2[0-3]):(?P<minute>[0-5]\d)\b"),
+]
+WORD_PATTERN = re.compile(r"[a-z]+(?:[ '.-][a-z]+)*", re.IGNORECASE)
+TIME_SUFFIX = re.compile(r"\s+(?:time(?: zone)?|timezone|standard time|daylight time)$")
+
+
+def build_names() -> Dict[str, str]:
+    """Lowercase IANA names, their city parts ("new york", "sydney") and ALIASES, mapped to zone names"""
+    names: Dict[str, str] = {}
+    zones = sorted(available_timezones())
+    for zone in zones:
+        names[zone.lower()] = zone
+    # Canonical zones (more path components, e.g. America/Argentina/Buenos_Aires) win over legacy links
+    for zone in sorted(zones, key=lambda zone: zone.count("/")):
+        region, _, rest = zone.partition("/")
+        if region in REGIONS and rest:
+            names[rest.rsplit("/", 1)[-1].replace("_", " ").lower()] = zone
+    names.update(ALIASES)
+    return names
+
+
+def link_names() -> FrozenSet[str]:
+    """Zone names that are only backward-compatible links ("Australia/ACT", "Asia/Calcutta"), from the tz source file"""
+    for path in TZPATH:
+        source = os.path.join(path, "tzdata.zi")
+        if os.path.exists(source):
+            with open(source) as f:
+                return frozenset(line.split()[2] for line in f if line.startswith("L "))
+    try:
+        text = resources.files("tzdata").joinpath("zoneinfo", "tzdata.zi").read_text()
+    except (ModuleNotFoundError, FileNotFoundError):
+        return frozenset()
+    return frozenset(line.split()[2] for line in text.splitlines() if line.startswith("L "))
+
+
+def build_city_zones() -> Dict[str, str]:
+    """Place names safe to look for inside a sentence: ALIASES and the cities of canonical Region/City zones.
+
+    Links ("Australia/Victoria", "America/Virgin") and sub-region zones ("America/North_Dakota/Center")
+    name states, islands and counties rather than cities, and read as ordinary words in a sentence.
+    """
+    links = link_names()
+    cities: Dict[str, str] = {}
+    for zone in sorted(available_timezones()):
+        region, _, city = zone.partition("/")
+        if region in REGIONS and city and "/" not in city and zone not in links:
+            cities[city.replace("_", " ").lower()] = zone
+    cities.update(ALIASES)
+    return {name: zone for name, zone in cities.items() if name not in AMBIGUOUS_CITIES}
+
+
+NAMES = build_names()
+CITY_NAMES = [name for name in NAMES if "/" not in name]
+CITY_ZONES = build_city_zones()
+
+
+def offset_minutes(zone: str, day: date) -> int:
+    noon = datetime(day.year, day.month, day.day, 12, tzinfo=timezone.utc)
+    return int(noon.astimezone(ZoneInfo(zone)).utcoffset().total_seconds() // 60)
+
+
+@lru_cache(maxsize=8)
+def offset_index(day: date) -> Dict[int, str]:
+    """UTC offset in minutes -> representative zone on `day`; daylight saving moves zones between offsets"""
+    index: Dict[int, str] = {}
+    for zone in PREFERRED_ZONES:
+        index.setdefault(offset_minutes(zone, day), zone)
+    for zone in sorted(set(NAMES.values())):
+        if zone.split("/")[0] in REGIONS:
+            index.setdefault(offset_minutes(zone, day), zone)
+    return index
+
+
+@lru_cache(maxsize=2)
+def fixed_offset_index(year: int) -> Dict[int, str]:
+    """UTC offset in minutes -> representative zone that doesn't observe daylight saving in `year`"""
+    index: Dict[int, str] = {}
+    for zone in PREFERRED_ZONES + sorted(set(NAMES.values())):
+        if zone.split("/")[0] in REGIONS:
+            offset = offset_minutes(zone, date(year, 1, 1))
+            if offset == offset_minutes(zone, date(year, 7, 1)):
+                index.setdefault(offset, zone)
+    return index
+
+
+def zone_for_offset(offset_hours: float, now: Optional[datetime] = None) -> Optional[str]:
+    """A zone that stays `offset_hours` from UTC all year: Etc/GMT-5 for UTC+5, Asia/Kolkata for UTC+5:30.
+
+    A bare offset says nothing about daylight saving, so a zone that observes it is only
+    used when no fixed zone has the offset (UTC-3:30 is only Newfoundland), and then the
+    one at that offset on `now`'s date.
+    """
+    minutes = round(offset_hours * 60)
+    if minutes == 0:
+        return "UTC"
+    if minutes % 60 == 0:
+        # Etc zones count the other way round: Etc/GMT-5 is five hours ahead of UTC
+        return f"Etc/GMT{-minutes // 60:+d}" if -12 * 60 <= minutes <= 14 * 60 else None
+    day = (now or datetime.now(timezone.utc)).astimezone(timezone.utc).date()
+    return fixed_offset_index(day.year).get(minutes) or offset_index(day).get(minutes)
+
+
+def parse_offset(match: re.Match) -> float:
+    hours = int(match.group("hours")) + int(match.group("minutes") or 0) / 60
+    return hours if match.group("sign") == "+" else -hours
+
+
+@lru_cache(maxsize=1024)
+def lookup(text: str) -> Optional[str]:
+    """Resolve an abbreviation, IANA name, city or alias, allowing small typos in city names"""
+    key = " ".join(text.strip().lower().replace("_", " ").split())
+    if text.strip().upper() in ABBREVIATIONS:
+        return ABBREVIATIONS[text.strip().upper()]
+    key = TIME_SUFFIX.sub("", key)
+    zone = NAMES.get(key) or NAMES.get(key.replace(" ", "_")) or NAMES.get(key.replace(" /", "/").replace("/ ", "/"))
+    if zone:
+        return zone
+    close = difflib.get_close_matches(key, CITY_NAMES, n=1, cutoff=0.85)
+    return NAMES[close[0]] if close else None
+
+
+def resolve(text: str, now: Optional[datetime] = None) -> Optional[str]:
+    """Turn what a user typed for `!timezone` ("EST", "new york", "UTC+5:30", "Asia/Tokyo") into a zone name"""
+    match = OFFSET_PATTERN.fullmatch(text.strip())
+    if match:
+        return zone_for_offset(parse_offset(match), now)
+    return lookup(text)
+
+
+def explicit_timezone(message: str, now: Optional[datetime] = None) -> Optional[str]:
+    """A timezone the message states unambiguously: a UTC offset ("UTC+5:30") or an abbreviation in capitals ("EST")"""
+    match = OFFSET_PATTERN.search(message)
+    if match:
+        return zone_for_offset(parse_offset(match), now)
+    for token in re.findall(r"[A-Za-z]+", message):
+        if token in ABBREVIATIONS and token not in SENTENCE_EXCLUDED:
+            return ABBREVIATIONS[token]
+    return None
+
+
+def find_timezone(message: str, now: Optional[datetime] = None) -> Optional[str]:
+    """Best guess at a timezone mentioned in a free-form message, or None.
+
+    Besides explicit_timezone, this reads lowercase abbreviations and place names,
+    which can be wrong ("I train at the Center"), so treat it as a hint to confirm.
+    """
+    zone = explicit_timezone(message, now)
+    if zone:
+        return zone
+    for token in re.findall(r"[A-Za-z]+", message):
+        upper = token.upper()
+        if upper in ABBREVIATIONS and upper not in SENTENCE_EXCLUDED:
+            return ABBREVIATIONS[upper]
+    for phrase in WORD_PATTERN.findall(message):
+        words = phrase.lower().split()
+        # Longest phrases first, so "new york" beats "york"
+        for length in range(min(4, len(words)), 0, -1):
+            for start in range(len(words) - length + 1):
+                candidate = " ".join(words[start:start + length])
+                if candidate in CITY_ZONES:
+                    return CITY_ZONES[candidate]
+    return None
+
+
+def find_times(message: str) -> List[str]:
+    """Every time of day ("8pm", "20:30", "7 in the morning") in a message, as HH:MM in order of appearance"""
+    # "UTC+5:30" is an offset, not half past five
+    message = OFFSET_PATTERN.sub(" ", message)
+    found: List[Tuple[int, int, str]] = []
+    for pattern in TIME_PATTERNS:
+        for match in pattern.finditer(message):
+            # "8:30 in the evening" also contains "8:30"; the more specific pattern already read it
+            if any(match.start() < end and start < match.end() for start, end, _ in found):
+                continue
+            hour, minute = int(match.group("hour")), int(match.group("minute") or 0)
+            marker = (match.groupdict().get("meridiem") or match.groupdict().get("part") or "").lower()
+            if hour > 23 or (marker and hour > 12):
+                continue
+            if marker in ("at night", "tonight") and hour < 5:
+                pass
+            elif marker.startswith("p") or marker in ("in the afternoon", "in the evening", "at night", "tonight"):
+                hour = hour % 12 + 12
+            elif marker.startswith("a") or marker == "in the morning":
+                hour = hour % 12
+            found.append((match.start(), match.end(), f"{hour:02d}:{minute:02d}"))
+    return [time for _, _, time in sorted(found)]
+
+
+def find_time(message: str) -> Optional[str]:
+    """The time of day a message names, as HH:MM, or None when it names none or several different ones.
+
+    "I train from 6 am to 8 am, check in at 9pm" mentions three; which one is the
+    reminder time is for the LLM to read, not the first match.
+    """
+    times = set(find_times(message))
+    return times.pop() if len(times) == 1 else None
+
+
+def describe(zone: str) -> str:
+    """"Sydney (AEST/AEDT, Australian Eastern Time Zone)" for the `!timezone` confirmation"""
+    if zone.startswith("Etc/GMT") and zone[7:]:
+        return f"UTC{-int(zone[7:]):+d} (fixed offset, no daylight saving)"
+    display_name = zone.split("/")[-1].replace("_", " ")
+    if zone in ZONE_NAMES:
+        abbr, full_name = ZONE_NAMES[zone]
+        return f"{display_name} ({abbr}, {full_name})"
+    return f"{display_name} ({datetime.now(ZoneInfo(zone)).strftime('%Z')})"
+
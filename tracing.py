@@ -0,0 +1,144 @@
+import contextvars
+import functools
+import inspect
+import json
+import logging
+import os
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+
+# Setup logging
+logger = logging.getLogger("discord")
+
+_current: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("current_span", default=None)
+
+
+class JsonLinesExporter:
+    """Appends finished spans to a file, one JSON object per line"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+        self.file = open(path, "a", encoding="utf-8")
+
+    def export(self, record: Dict[str, Any], flush: bool = False) -> None:
+        line = json.dumps(record, separators=(",", ":"), default=str)
+        with self.lock:
+            self.file.write(line + "\n")
+            if flush:
+                self.file.flush()
+
+
+def create_exporter() -> Optional[JsonLinesExporter]:
+    """Export to TRACE_FILE when it is set; tracing is a no-op otherwise"""
+    path = os.getenv("TRACE_FILE")
+    if not path:
+        return None
+    logger.info("Writing traces to %s", path)
+    return JsonLinesExporter(path)
+
+
+exporter = create_exporter()
+
+
+class Span:
+    """One timed step of a request; spans sharing a trace_id form its waterfall"""
+
+    def __init__(self, name: str, trace_id: str, parent: Optional["Span"], attributes: Dict[str, Any]):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent.span_id if parent else None
+        self.attributes = attributes
+        self.start = time.time()
+        self.started = time.perf_counter()
+        self.error: Optional[str] = None
+        self.token: Optional[contextvars.Token] = None
+
+    def set(self, **attributes: Any) -> None:
+        self.attributes.update(attributes)
+
+    def end(self) -> None:
+        if self.token is not None:
+            _current.reset(self.token)
+            self.token = None
+        exporter.export({
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": round(self.start, 6),
+            "duration_ms": round((time.perf_counter() - self.started) * 1000, 3),
+            "attributes": self.attributes,
+            "error": self.error,
+        }, flush=self.parent_id is None)
+
+
+def current_trace_id() -> Optional[str]:
+    span = _current.get()
+    return span.trace_id if span else None
+
+
+def start_trace(name: str, **attributes: Any) -> Optional[Span]:
+    """Begin a new trace rooted at this span and make it current; pair with Span.end()"""
+    if exporter is None:
+        return None
+    span = Span(name, secrets.token_hex(16), None, attributes)
+    span.token = _current.set(span)
+    return span
+
+
+@contextmanager
+def trace(name: str, **attributes: Any) -> Iterator[Optional[Span]]:
+    """Root span for one inbound message, command or background job"""
+    span = start_trace(name, **attributes)
+    try:
+        yield span
+    except BaseException as e:
+        if span:
+            span.error = type(e).__name__
+        raise
+    finally:
+        if span:
+            span.end()
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Optional[Span]]:
+    """Child span of the current trace; does nothing outside a trace"""
+    parent = _current.get()
+    if parent is None or exporter is None:
+        yield None
+        return
+    child = Span(name, parent.trace_id, parent, attributes)
+    child.token = _current.set(child)
+    try:
+        yield child
+    except BaseException as e:
+        child.error = type(e).__name__
+        raise
+    finally:
+        child.end()
+
+
+def traced(name: str) -> Callable:
+    """Decorator wrapping a function or coroutine function in a span"""
+
+    def decorator(func: Callable) -> Callable:
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+
+    return decorator
@@ -0,0 +1,115 @@
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import os
+import secrets
+import socket
+import time
+from datetime import datetime, timezone
+
+from dotenv import load_dotenv
+
+import metrics
+import tracing
+from jobs import JOB_TIMEOUT, error_payload, run_job
+from log_config import setup_logging
+
+# Setup logging
+logger = logging.getLogger("discord")
+
+# Another worker may retake a running job once its lease runs out. Workers renew the lease while
+# a job runs, so it only needs to outlast a renewal, and it has to be well under JOB_TIMEOUT for a
+# retry after a crashed worker to finish before the gateway gives up
+JOB_LEASE = JOB_TIMEOUT / 4
+MAX_POLL_INTERVAL = 0.5
+
+
+async def keep_lease(agent, job) -> None:
+    """Renew the job's lease until cancelled"""
+    while True:
+        await asyncio.sleep(JOB_LEASE / 3)
+        try:
+            await asyncio.to_thread(agent.db.renew_job, job["_id"], job["worker"], JOB_LEASE)
+        except Exception as e:
+            logger.error("Failed to renew the lease on job %s: %s", job["_id"], e)
+
+
+async def process_job(agent, job) -> None:
+    kind = job["kind"]
+    expires_at = job.get("expires_at")
+    if expires_at is not None and expires_at.replace(tzinfo=timezone.utc) < datetime.now(timezone.utc):
+        # The gateway has stopped waiting for this one
+        await asyncio.to_thread(agent.db.finish_job, job["_id"], error={"type": "timeout", "message": "Job expired in the queue"})
+        return
+    started = time.perf_counter()
+    lease = asyncio.create_task(keep_lease(agent, job))
+    with tracing.trace(f"job:{kind}", job_id=str(job["_id"]), attempt=job["attempts"]):
+        try:
+            result = await run_job(agent, kind, job["payload"])
+            error = None
+        except Exception as e:
+            logger.error("Job %s (%s) failed: %s", job["_id"], kind, e)
+            result, error = None, error_payload(e)
+        finally:
+            lease.cancel()
+    metrics.JOB_SECONDS.labels(kind).observe(time.perf_counter() - started)
+    await asyncio.to_thread(agent.db.finish_job, job["_id"], result, error)
+
+
+async def serve(agent, concurrency: int, stop: asyncio.Event = None) -> None:
+    """Claim and run jobs until `stop` is set, at most `concurrency` at a time"""
+    worker = f"{socket.gethostname()}:{os.getpid()}:{secrets.token_hex(4)}"
+    slots = asyncio.Semaphore(concurrency)
+    running = set()
+    idle_sleep = 0.01
+    logger.info("Worker %s taking up to %s jobs at a time", worker, concurrency)
+    while stop is None or not stop.is_set():
+        await slots.acquire()
+        try:
+            job = await asyncio.to_thread(agent.db.claim_job, worker, JOB_LEASE)
+        except Exception as e:
+            logger.error("Failed to claim a job: %s", e)
+            job = None
+        if job is None:
+            slots.release()
+            # Back off while the queue is empty
+            await asyncio.sleep(idle_sleep)
+            idle_sleep = min(idle_sleep * 2, MAX_POLL_INTERVAL)
+            continue
+        idle_sleep = 0.01
+        task = asyncio.create_task(process_job(agent, job))
+        running.add(task)
+        task.add_done_callback(running.discard)
+        task.add_done_callback(lambda _: slots.release())
+    await asyncio.gather(*running)
+
+
+def worker_main(concurrency: int, metrics_port: int = 0) -> None:
+    load_dotenv()
+    setup_logging()
+    os.environ["METRICS_PORT"] = str(metrics_port)
+    metrics.start_metrics_server()
+    from agent import MistralAgent
+
+    asyncio.run(serve(MistralAgent(), concurrency))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run MistralAgent jobs queued by bot.py in AGENT_MODE=queue")
+    parser.add_argument("--processes", type=int, default=os.cpu_count(), help="worker processes to start")
+    parser.add_argument("--concurrency", type=int, default=16, help="jobs each process runs at once (LLM-bound, so mostly waiting)")
+    parser.add_argument("--metrics-port", type=int, default=0, help="first process's metrics port; the rest count up (0 disables)")
+    args = parser.parse_args()
+
+    if args.processes == 1:
+        worker_main(args.concurrency, args.metrics_port)
+    else:
+        processes = [
+            multiprocessing.Process(target=worker_main, args=(args.concurrency, args.metrics_port + i if args.metrics_port else 0))
+            for i in range(args.processes)
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
@@ -0,0 +1,119 @@
+import re
+from typing import Any, Dict, List, Optional
+
+# "3x10 @20lb", "3 x 10 @ 20 kg", "2x8" (weight optional). Units are a closed set, so the word
+# after a unitless weight ("@135 pain in my shoulder") stays in the notes
+PERFORMANCE_PATTERN = re.compile(
+    r"(?P<sets>\d+)\s*[x×]\s*(?P<reps>\d+)"
+    r"(?:\s*@\s*(?P<weight>\d+(?:\.\d+)?(?:\s*(?:lbs?|kgs?|pounds?|kilograms?|kilos?)(?![a-z])|\s*#)?|bodyweight|bw))?",
+    re.IGNORECASE
+)
+
+# A planned count: a number or range, not followed by a time unit ("30s", "2 min")
+PLANNED_COUNT_PATTERN = re.compile(r"\s*(\d+)(?:\s*-\s*\d+)?(?!\d|\s*(?:s|sec|secs|seconds?|min|mins|minutes?)\b)")
+
+# Leading list markers such as "1.", "2)", "-" or "•"
+LIST_MARKER_PATTERN = re.compile(r"^\s*(?:\d+[.)]|[-•*])\s*")
+
+
+def parse_performance(text: str) -> Optional[Dict[str, Any]]:
+    """Parse a "<sets>x<reps> @<weight>" performance report.
+
+    Returns None if no sets/reps could be found.
+    """
+    match = PERFORMANCE_PATTERN.search(text)
+    if not match:
+        return None
+    notes = (text[:match.start()] + text[match.end():]).strip(" ,;:-")
+    return {
+        "sets": int(match.group("sets")),
+        "reps": int(match.group("reps")),
+        "weight": match.group("weight").strip() if match.group("weight") else None,
+        "notes": notes
+    }
+
+
+def _tokens(name: str) -> set:
+    return set(re.findall(r"[a-z0-9]+", name.lower()))
+
+
+def _compact(name: str) -> str:
+    return "".join(re.findall(r"[a-z0-9]+", name.lower()))
+
+
+def match_exercise(name: str, planned_exercises: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Find the planned exercise a user-typed name refers to, if any.
+
+    A name matches when every word the user typed appears in the planned name
+    ("bench" -> "Barbell Bench Press"), or when the two names mostly overlap.
+    """
+    wanted = _tokens(name)
+    if not wanted:
+        return None
+    best, best_score = None, (0.0, 0.0)
+    for exercise in planned_exercises:
+        candidate = _tokens(exercise["name"])
+        if not candidate:
+            continue
+        coverage = len(wanted & candidate) / len(wanted)
+        if _compact(name) in _compact(exercise["name"]):
+            coverage = 1.0
+        score = (coverage, len(wanted & candidate) / len(wanted | candidate))
+        if score > best_score:
+            best, best_score = exercise, score
+    coverage, overlap = best_score
+    return best if coverage == 1.0 or overlap >= 0.5 else None
+
+
+def parse_workout_log(text: str, planned_exercises: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Parse a multi-exercise log, one exercise per line.
+
+    Each line looks like "Bench Press: 3x10 @135lb" (the colon is optional).
+    Lines may also be numbered after the plan ("2. 3x8 @185lb").
+    Returns a dict keyed by planned exercise name with the raw text and parsed sets.
+    """
+    logged = {}
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        match = PERFORMANCE_PATTERN.search(line)
+        if not match:
+            continue
+        performance = parse_performance(line[match.start():])
+
+        exercise = None
+        numbered = re.match(r"^\s*(\d+)[.)]\s", line)
+        name_part = LIST_MARKER_PATTERN.sub("", line[:match.start()]).strip(" :-")
+        if name_part:
+            exercise = match_exercise(name_part, planned_exercises)
+        elif numbered and 1 <= int(numbered.group(1)) <= len(planned_exercises):
+            exercise = planned_exercises[int(numbered.group(1)) - 1]
+
+        if exercise:
+            actual = LIST_MARKER_PATTERN.sub("", line).strip()
+            logged[exercise["name"]] = {"actual": actual, **performance}
+    return logged
+
+
+def planned_count(value: Any) -> Optional[int]:
+    """Lower bound of a planned count ("3", "8-12", "8-12 each side"); None for "AMRAP", "30s" and the like"""
+    match = PLANNED_COUNT_PATTERN.match(str(value))
+    return int(match.group(1)) if match and int(match.group(1)) > 0 else None
+
+
+def basic_verdict(performance: Dict[str, Any], planned_exercise: Dict[str, Any]) -> str:
+    """Decide increase/maintain/decrease from completion percentage alone"""
+    target_sets = planned_count(planned_exercise.get('sets'))
+    target_reps = planned_count(planned_exercise.get('reps'))
+    if target_sets is None or target_reps is None:
+        # Timed or open-ended targets can't be compared to sets x reps
+        return "maintain"
+
+    # Simple completion percentage calculation
+    completion_percentage = (performance["sets"] * performance["reps"]) / (target_sets * target_reps) * 100
+
+    if completion_percentage < 70:
+        return "decrease"
+    elif completion_percentage > 90:
+        return "increase"
+    return "maintain"